@@ -3,7 +3,7 @@
 import json
 import os
 # Third-party libraries
-from flask import Flask, redirect, request, url_for, render_template, session
+from flask import Flask, redirect, request, url_for, render_template, session, jsonify
 from flask_login import (
     UserMixin,
     LoginManager,
@@ -22,9 +22,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 
 # Internal imports
+import live_odds
+import metrics
+import predict_service
+import search
+import warmup
 from user import User
-from db import get_df
+from db import get_df, get_cached_df
 from mfl import get_mfl, get_mfl_liveScoring, get_mfl_league
+from lineups import live_scores
+from charts import lineup_chart_data, waiver_page, playoff_page
+from roster_store import get_free_agents
+from serving import offload, gather
 
 # Configuration (These variables are stored as environment variables)
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID", None)
@@ -34,13 +43,29 @@ GOOGLE_DISCOVERY_URL = ("https://accounts.google.com/.well-known/openid-configur
 # Find environment variables
 DATABASE_URL = os.environ.get("DATABASE_URL", None)
 # sqlalchemy deprecated urls which begin with "postgres://"; now it needs to start with "postgresql://"
-if DATABASE_URL.startswith("postgres://"):
+if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
 # Create a new Flask instance
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY")
 
+# Time every request and its phases (see metrics.py); served at /metrics
+untimedEndpoints = [None, 'static', 'metricsEndpoint']
+@app.before_request
+def startTimer():
+    if request.endpoint not in untimedEndpoints:
+        metrics.start_request()
+
+@app.teardown_request
+def recordTimer(error=None):
+    if request.endpoint not in untimedEndpoints:
+        metrics.finish_request(request.endpoint)
+
+@app.route('/metrics')
+def metricsEndpoint():
+    return metrics.export()
+
 # Log in users
 # User session management setup using Flask-Login
 login_manager = LoginManager()
@@ -146,14 +171,8 @@ def getFranchise():
     user_league = session.get("user_league")
 
     # Get Franchises in the league
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=league&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
-    data = []
-    franchises = soup.find_all('franchise')
-    for i in range(len(franchises)):
-        rows = [franchises[i].get("id"), franchises[i].get("name")]
-        data.append(rows)
+    franchises = get_mfl_league(user_league)
+    data = franchises[['franchiseID', 'franchiseName']].values.tolist()
 
     return render_template("getFranchise.html", franchise_list=data)
 
@@ -296,426 +315,91 @@ def compareFranchises():
 def waiverWire():
     user_league = session.get('user_league', None)
     user_franchise = session.get('user_franchise', None)
+    warmup.record_activity(user_league, user_franchise)
 
-    # Get Franchises in the league
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=league&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
-    data = []
-    franchises = soup.find_all('franchise')
-    for i in range(len(franchises)):
-        rows = [franchises[i].get("id"), franchises[i].get("name")]
-        data.append(rows)
-    franchise_df = pd.DataFrame(data)
-    franchise_df.columns=['FranchiseID','FranchiseName']
-    franchise_df = franchise_df.append({"FranchiseID":"FA", "FranchiseName":"Free Agent"}, ignore_index=True)
+    # Table of the user's players and free agents, built or served from the page cache (see charts.py)
+    table, titles = waiver_page(user_league, user_franchise)
 
-    # Get franchise rosters
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=rosters&L={user_league}&FRANCHISE={user_franchise}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
-    data = []
-    franchises = soup.find_all('franchise')
-    for i in range(0,len(franchises)):
-        current_franchise = franchises[i].find_all('player')
-        for j in range(0,len(current_franchise)):
-            rows = [franchises[i].get("id"), franchises[i].get("week"), current_franchise[j].get("id"), current_franchise[j].get("status")]
-            data.append(rows)
-    rosters_df = pd.DataFrame(data)
-
-    # Get Free Agents
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=freeAgents&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
-    data = []
-    freeAgents = soup.find_all('player')
-    for i in range(len(freeAgents)):
-        rows = ["FA", "", freeAgents[i].get("id"), "Free Agent"]
-        data.append(rows)
-    fa_df = pd.DataFrame(data)
-    rosters_df = rosters_df.append(fa_df)
-    rosters_df.columns=['FranchiseID','Week','PlayerID','RosterStatus']
-
-    # Get all players, sharkRank, and ADP
-    player_df = get_df("predictions")
-
-    # Merge all dfs
-    complete = player_df.merge(rosters_df, left_on='id_mfl', how='left', right_on='PlayerID').merge(franchise_df[['FranchiseID', 'FranchiseName']], on='FranchiseID', how='left')
-    complete = complete[complete['FranchiseID'].notna()]
-    complete = complete.sort_values(by=['pred'], ascending=False)
-    complete.reset_index(inplace=True, drop=True)
-    complete = complete[['player', 'age', 'team', 'FranchiseName', 'pos', 'posRank', 'KR', 'PR', 'RES', 'pred', 'sharkAbsolute', 'adpAbsolute']]
-    complete.rename(columns={
-        'player':'Player',
-        'age':'Age',
-        'team':'Team',
-        'pos':'Position',
-        'posRank': 'Rank',
-        'pred': 'ChopBlock Prediction',
-        'sharkAbsolute': 'FantasySharks Prediction',
-        'adpAbsolute': 'ADP-Based Prediction'
-    }, inplace=True)
-    complete.set_index('Player', drop=True, inplace=True)
-
-    return render_template("waiverWire.html", tables=[complete.to_html(classes='data')], titles=complete.columns.values)
+    metrics.phase("render")
+    return render_template("waiverWire.html", tables=[table], titles=titles)
 
 
 @app.route('/compareFranchises2')
 #@login_required
 def compareFranchises2():
     user_league = session.get("user_league")
+    warmup.record_activity(user_league, session.get("user_franchise"))
 
-    # Get Franchises in the league
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=league&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
-    data = []
-    franchises = soup.find_all('franchise')
-    for i in range(len(franchises)):
-        rows = [franchises[i].get("id"), franchises[i].get("name")]
-        data.append(rows)
-    franchise_df = pd.DataFrame(data)
-    franchise_df.columns=['FranchiseID','FranchiseName']
-    franchise_df = franchise_df.append({"FranchiseID":"FA", "FranchiseName":"Free Agent"}, ignore_index=True)
-
-    # Get franchise rosters
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=rosters&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
-    data = []
-    franchises = soup.find_all('franchise')
-    for i in range(0,len(franchises)):
-        current_franchise = franchises[i].find_all('player')
-        for j in range(0,len(current_franchise)):
-            rows = [franchises[i].get("id"), franchises[i].get("week"), current_franchise[j].get("id"), current_franchise[j].get("status")]
-            data.append(rows)
-    rosters_df = pd.DataFrame(data)
-
-    # Get Free Agents
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=freeAgents&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
-    data = []
-    freeAgents = soup.find_all('player')
-    for i in range(len(freeAgents)):
-        rows = ["FA", "", freeAgents[i].get("id"), "Free Agent"]
-        data.append(rows)
-    fa_df = pd.DataFrame(data)
-    rosters_df = rosters_df.append(fa_df)
-    rosters_df.columns=['FranchiseID','Week','PlayerID','RosterStatus']
-
-    # Get all players, sharkRank, and ADP
-    predictions = get_df("predictions")
-
-    # Merge all dfs
-    complete = predictions.merge(rosters_df, left_on='id_mfl', right_on='PlayerID', how='left').merge(franchise_df[['FranchiseID', 'FranchiseName']], on='FranchiseID', how='left')
-    complete['FranchiseID'].fillna("FA", inplace=True)
-    complete['FranchiseName'].fillna("Free Agent", inplace=True)
-    complete['RosterStatus'].fillna("Free Agent", inplace=True)
-
-    # Split complete df by player pos
-    qbs = complete[complete['pos'] == "QB"]
-    qbs.reset_index(inplace=True, drop=True)
-    rbs = complete[complete['pos'] == "RB"]
-    rbs.reset_index(inplace=True, drop=True)
-    wrs = complete[complete['pos'] == "WR"]
-    wrs.reset_index(inplace=True, drop=True)
-    tes = complete[complete['pos'] == "TE"]
-    tes.reset_index(inplace=True, drop=True)
-    pks = complete[complete['pos'] == "PK"]
-    pks.reset_index(inplace=True, drop=True)
-    defs = complete[complete['pos'] == "DF"]
-    defs.reset_index(inplace=True, drop=True)
-
-
-    ### ADP Predictions
-    # Roster Builder logic
-    qbs_top = qbs.sort_values(by='adpAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(1)
-    rbs_top = rbs.sort_values(by='adpAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    wrs_top = wrs.sort_values(by='adpAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(3)
-    tes_top = tes.sort_values(by='adpAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    pks_top = pks.sort_values(by='adpAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    defs_top = defs.sort_values(by='adpAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-
-    qbs_remainder = qbs[~qbs['PlayerID'].isin(qbs_top['PlayerID'])].groupby('FranchiseName').head(1)
-    rbs_remainder = rbs[~rbs['PlayerID'].isin(rbs_top['PlayerID'])].groupby('FranchiseName').head(3)
-    wrs_remainder = wrs[~wrs['PlayerID'].isin(wrs_top['PlayerID'])].groupby('FranchiseName').head(3)
-    tes_remainder = tes[~tes['PlayerID'].isin(tes_top['PlayerID'])].groupby('FranchiseName').head(3)
-
-    remainder = pd.concat([qbs_remainder, rbs_remainder, wrs_remainder, tes_remainder])
-
-    top_remainders = remainder.sort_values(by='adpAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(3)
-
-    players_onthefield = pd.concat([qbs_top, rbs_top, wrs_top, tes_top, pks_top, defs_top, top_remainders])
-    players_onthefield = players_onthefield.sort_values(by='adpAbsolute', ascending=False, ignore_index=True)
-
-    fran_rank = players_onthefield.groupby('FranchiseName').sum().sort_values(by='adpAbsolute', ascending=False)
-
-    sorter = fran_rank.index
-
-    players_onthefield.FranchiseName = players_onthefield.FranchiseName.astype("category")
-    players_onthefield.FranchiseName.cat.set_categories(sorter, inplace=True)
-    players_onthefield.sort_values(["FranchiseName"], inplace=True)
-
-    # remove Free Agents
-    players_onthefield = players_onthefield.loc[players_onthefield.FranchiseID!="FA"]
+    # ADP, FantasySharks and ChopBlock lineups as compact columns, built or served from the page cache (see
+    # charts.py); the template draws the charts in the browser
+    lineupData = lineup_chart_data(user_league)
 
-    # Find the lowest scoring player on the field and set them as the low bar
-    for x in ["QB", "RB", "WR", "TE", "PK", "DF"]:
-        players_onthefield.loc[players_onthefield['pos']==x, 'adpComp'] = players_onthefield.loc[players_onthefield['pos']==x, 'adpAbsolute'].min()
-    players_onthefield['adpRelative'] = players_onthefield['adpAbsolute'] - players_onthefield['adpComp']
+    metrics.phase("render")
+    return render_template('compareFranchises2.html', lineupData=lineupData)
 
-    # Create bar chart
-    figADP = px.bar(players_onthefield, 
-                x="FranchiseName", 
-                y="adpRelative", 
-                color="pos", 
-                text='player', 
-                color_discrete_map={
-                    "QB": "hsla(210, 60%, 25%, 1)", #blue #1033a6 #0c2987 1033a6 062647 #293745 
-                    "RB": "hsla(12, 50%, 45%, 1)", #gold #f5d000 ffa524 a23419 a34e39
-                    "WR": "hsla(267, 40%, 45%, 1)", #purple #4f22bc #643fc1 643fc1 621B74 675280
-                    "TE": "hsla(177, 68%, 36%, 1)", #teal #02687b #038097 1295ad 43B3AE
-                    "PK": "hsla(14, 30%, 40%, 1)", #gold #f5d000 ffa524 664e47
-                    "DF": "hsla(35, 70%, 65%, 1)"}, #gold #f5d000 ffa524 a49375 ffb54d
-                category_orders={
-                    "pos": ["QB", "RB", "WR", "TE", "PK", "DF"]},
-                hover_name="player",
-                hover_data={
-                    'adpRelative':True, 'pred':True, 'sharkAbsolute':True, 'adpAbsolute':True,
-                    'player':False, 'pos':False, 'FranchiseName':False
-                    },
-                labels={
-                    "FranchiseName":"Franchise",
-                    "adpRelative":"Player Value",
-                    "pred":"ChopBlock Prediction",
-                    "sharkAbsolute":"FantasySharks Prediction",
-                    "adpAbsolute":"ADP-Based Prediction"
-                }
-                )
-    figADP.update_layout(
-                barmode='stack', 
-                xaxis={'categoryorder':'total descending'},
-                plot_bgcolor='rgba(0,0,0,0)',
-                title="ADP-Based Predictions",
-                font_family="Skia",
-                showlegend=False
-                )
-
-    graphJSON_adp = json.dumps(figADP, cls=plotly.utils.PlotlyJSONEncoder)
-
-
-    ### Shark Predictions
-    # Roster Builder logic
-    qbs_top = qbs.sort_values(by='sharkAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(1)
-    rbs_top = rbs.sort_values(by='sharkAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    wrs_top = wrs.sort_values(by='sharkAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(3)
-    tes_top = tes.sort_values(by='sharkAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    pks_top = pks.sort_values(by='sharkAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    defs_top = defs.sort_values(by='sharkAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-
-    qbs_remainder = qbs[~qbs['PlayerID'].isin(qbs_top['PlayerID'])].groupby('FranchiseName').head(1)
-    rbs_remainder = rbs[~rbs['PlayerID'].isin(rbs_top['PlayerID'])].groupby('FranchiseName').head(3)
-    wrs_remainder = wrs[~wrs['PlayerID'].isin(wrs_top['PlayerID'])].groupby('FranchiseName').head(3)
-    tes_remainder = tes[~tes['PlayerID'].isin(tes_top['PlayerID'])].groupby('FranchiseName').head(3)
-
-    remainder = pd.concat([qbs_remainder, rbs_remainder, wrs_remainder, tes_remainder])
-
-    top_remainders = remainder.sort_values(by='sharkAbsolute', ascending=False, ignore_index=True).groupby('FranchiseName').head(3)
-
-    players_onthefield = pd.concat([qbs_top, rbs_top, wrs_top, tes_top, pks_top, defs_top, top_remainders])
-    players_onthefield = players_onthefield.sort_values(by='sharkAbsolute', ascending=False, ignore_index=True)
-
-    fran_rank = players_onthefield.groupby('FranchiseName').sum().sort_values(by='sharkAbsolute', ascending=False)
-
-    sorter = fran_rank.index
-
-    players_onthefield.FranchiseName = players_onthefield.FranchiseName.astype("category")
-    players_onthefield.FranchiseName.cat.set_categories(sorter, inplace=True)
-    players_onthefield.sort_values(["FranchiseName"], inplace=True)
-
-    # remove Free Agents
-    players_onthefield = players_onthefield.loc[players_onthefield.FranchiseID!="FA"]
-
-    # Find the lowest scoring player on the field and set them as the low bar
-    for x in ["QB", "RB", "WR", "TE", "PK", "DF"]:
-        players_onthefield.loc[players_onthefield['pos']==x, 'sharkComp'] = players_onthefield.loc[players_onthefield['pos']==x, 'sharkAbsolute'].min()
-    players_onthefield['sharkRelative'] = players_onthefield['sharkAbsolute'] - players_onthefield['sharkComp']
-
-    # Create bar chart
-    figShark = px.bar(players_onthefield, 
-                x="FranchiseName", 
-                y="sharkRelative", 
-                color="pos", 
-                text='player', 
-                color_discrete_map={
-                    "QB": "hsla(210, 60%, 25%, 1)", #blue #1033a6 #0c2987 1033a6 062647 #293745 
-                    "RB": "hsla(12, 50%, 45%, 1)", #gold #f5d000 ffa524 a23419 a34e39
-                    "WR": "hsla(267, 40%, 45%, 1)", #purple #4f22bc #643fc1 643fc1 621B74 675280
-                    "TE": "hsla(177, 68%, 36%, 1)", #teal #02687b #038097 1295ad 43B3AE
-                    "PK": "hsla(14, 30%, 40%, 1)", #gold #f5d000 ffa524 664e47
-                    "DF": "hsla(35, 70%, 65%, 1)"}, #gold #f5d000 ffa524 a49375 ffb54d
-                category_orders={
-                    "pos": ["QB", "RB", "WR", "TE", "PK", "DF"]},
-                hover_name="player",
-                hover_data={
-                    'sharkRelative':True, 'pred':True, 'sharkAbsolute':True, 'adpAbsolute':True,
-                    'player':False, 'pos':False, 'FranchiseName':False
-                    },
-                labels={
-                    "FranchiseName":"Franchise",
-                    "sharkRelative":"Player Value",
-                    "pred":"ChopBlock Prediction",
-                    "sharkAbsolute":"FantasySharks Prediction",
-                    "adpAbsolute":"ADP-Based Prediction"
-                }
-                )
-    figShark.update_layout(
-                barmode='stack', 
-                xaxis={'categoryorder':'total descending'},
-                plot_bgcolor='rgba(0,0,0,0)',
-                title="FantasySharks Predictions",
-                font_family="Skia",
-                showlegend=False
-                )
-
-    graphJSON_shark = json.dumps(figShark, cls=plotly.utils.PlotlyJSONEncoder)
-
-
-
-    ### My predictions
-    # Roster Builder logic
-    qbs_top = qbs.sort_values(by='pred', ascending=False, ignore_index=True).groupby('FranchiseName').head(1)
-    rbs_top = rbs.sort_values(by='pred', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    wrs_top = wrs.sort_values(by='pred', ascending=False, ignore_index=True).groupby('FranchiseName').head(3)
-    tes_top = tes.sort_values(by='pred', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    pks_top = pks.sort_values(by='pred', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-    defs_top = defs.sort_values(by='pred', ascending=False, ignore_index=True).groupby('FranchiseName').head(2)
-
-    qbs_remainder = qbs[~qbs['PlayerID'].isin(qbs_top['PlayerID'])].groupby('FranchiseName').head(1)
-    rbs_remainder = rbs[~rbs['PlayerID'].isin(rbs_top['PlayerID'])].groupby('FranchiseName').head(3)
-    wrs_remainder = wrs[~wrs['PlayerID'].isin(wrs_top['PlayerID'])].groupby('FranchiseName').head(3)
-    tes_remainder = tes[~tes['PlayerID'].isin(tes_top['PlayerID'])].groupby('FranchiseName').head(3)
-
-    remainder = pd.concat([qbs_remainder, rbs_remainder, wrs_remainder, tes_remainder])
-
-    top_remainders = remainder.sort_values(by='pred', ascending=False, ignore_index=True).groupby('FranchiseName').head(3)
-
-    players_onthefield = pd.concat([qbs_top, rbs_top, wrs_top, tes_top, pks_top, defs_top, top_remainders])
-    players_onthefield = players_onthefield.sort_values(by='pred', ascending=False, ignore_index=True)
-
-    fran_rank = players_onthefield.groupby('FranchiseName').sum().sort_values(by='pred', ascending=False)
-
-    sorter = fran_rank.index
-
-    players_onthefield.FranchiseName = players_onthefield.FranchiseName.astype("category")
-    players_onthefield.FranchiseName.cat.set_categories(sorter, inplace=True)
-    players_onthefield.sort_values(["FranchiseName"], inplace=True)
-
-    # remove Free Agents
-    players_onthefield = players_onthefield.loc[players_onthefield.FranchiseID!="FA"]
-
-    # Find the lowest scoring player on the field and set them as the low bar
-    for x in ["QB", "RB", "WR", "TE", "PK", "DF"]:
-        players_onthefield.loc[players_onthefield['pos']==x, 'predComp'] = players_onthefield.loc[players_onthefield['pos']==x, 'pred'].min()
-    players_onthefield['predRelative'] = players_onthefield['pred'] - players_onthefield['predComp']
+# The compareFranchises2 chart data on its own, for the session league only
+@app.route('/api/lineups')
+def lineupChartData():
+    user_league = session.get("user_league")
+    if not user_league:
+        return jsonify({'error': "Choose a league first"}), 400
+    return jsonify(lineup_chart_data(user_league))
+
+# Autocomplete: /api/players/search?q=jal&pos=RB,WR&fa=1 (fa=1 keeps the session league's free agents)
+@app.route('/api/players/search')
+def playerSearch():
+    query = request.args.get("q", "")
+    limit = max(1, min(request.args.get("limit", search.SEARCH_LIMIT, type=int), 50))
+    positions = set(request.args["pos"].upper().split(",")) if request.args.get("pos") else None
+    allowed = None
+    if request.args.get("fa") == "1":
+        user_league = session.get("user_league")
+        if not user_league:
+            return jsonify({'error': "Choose a league first"}), 400
+        allowed = set(get_free_agents(user_league)['id_mfl'])
+    return jsonify(search.search(query, positions, allowed, limit))
+
+# What-if projections: POST {"players": [{"id": "13604", "posRank": "WR1"}]} or {"pos": "WR", "rows": [{...features}]}
+@app.route('/api/predict', methods=['POST'])
+def predict():
+    try:
+        return jsonify(predict_service.predict(request.get_json(silent=True)))
+    except predict_service.PredictError as error:
+        return jsonify({'error': str(error)}), 400
+
+@app.route('/playoffOdds')
+#@login_required
+def playoffOdds():
+    user_league = session.get("user_league")
+    # ?seed= makes the simulation repeatable; only honored in debug mode, so clients cannot force fresh simulations
+    seed = request.args.get("seed", None, type=int) if app.debug else None
 
-    # Create bar chart
-    figPred = px.bar(players_onthefield, 
-                x="FranchiseName", 
-                y="predRelative", 
-                color="pos", 
-                text='player', 
-                color_discrete_map={
-                    "QB": "hsla(210, 60%, 25%, 1)", #blue #1033a6 #0c2987 1033a6 062647 #293745 
-                    "RB": "hsla(12, 50%, 45%, 1)", #gold #f5d000 ffa524 a23419 a34e39
-                    "WR": "hsla(267, 40%, 45%, 1)", #purple #4f22bc #643fc1 643fc1 621B74 675280
-                    "TE": "hsla(177, 68%, 36%, 1)", #teal #02687b #038097 1295ad 43B3AE
-                    "PK": "hsla(14, 30%, 40%, 1)", #gold #f5d000 ffa524 664e47
-                    "DF": "hsla(35, 70%, 65%, 1)"}, #gold #f5d000 ffa524 a49375 ffb54d
-                category_orders={
-                    "pos": ["QB", "RB", "WR", "TE", "PK", "DF"]},
-                hover_name="player",
-                hover_data={
-                    'predRelative':True, 'pred':True, 'sharkAbsolute':True, 'adpAbsolute':True,
-                    'player':False, 'pos':False, 'FranchiseName':False
-                    },
-                labels={
-                    "FranchiseName":"Franchise",
-                    "predRelative":"Player Value",
-                    "pred":"ChopBlock Prediction",
-                    "sharkAbsolute":"FantasySharks Prediction",
-                    "adpAbsolute":"ADP-Based Prediction"
-                }
-                )
-    figPred.update_layout(
-                barmode='stack', 
-                xaxis={'categoryorder':'total descending'},
-                plot_bgcolor='rgba(0,0,0,0)',
-                title="ChopBlock Predictions",
-                font_family="Skia",
-                showlegend=False
-                )
+    # Simulated playoff and title odds, built or served from the page cache (see charts.py)
+    table, titles = playoff_page(user_league, seed)
 
-    graphJSON_pred = json.dumps(figPred, cls=plotly.utils.PlotlyJSONEncoder)
-    return render_template('compareFranchises2.html', graphJSON_pred=graphJSON_pred, graphJSON_adp=graphJSON_adp, graphJSON_shark=graphJSON_shark)
+    metrics.phase("render")
+    return render_template("playoffOdds.html", tables=[table], titles=titles)
 
 @app.route('/liveScoring')
 #@login_required
 def liveScoring():
     user_league = session.get("user_league")
 
-    # Get MFL scoring data
-    liveScores = get_mfl_liveScoring(user_league)
-    # Get Franchises in the league
-    franchises = get_mfl_league(user_league)
+    # Get MFL scoring data and the Franchises in the league
+    metrics.phase("mfl_fetch")
+    liveScores, franchises = gather((get_mfl_liveScoring, user_league), (get_mfl_league, user_league))
     # Get all players, sharkRank, and ADP
-    predictions = get_df("predictions")
-
-    # merge predictions, franchises, and liveScores
-    merged = liveScores.merge(franchises, how='left', on='franchiseID').merge(predictions, how='left', on='id_mfl')
-    # Clean
-    merged['liveScore'] = merged.liveScore.astype('float64')
-    merged['secondsRemaining'] = merged.secondsRemaining.astype('float64')
-
-    # calculate scoreRemaining
-    merged['weeklyPred'] = merged['pred'] / 17
-    def calcScoreRemaining(row):
-        result = ((row['weeklyPred']) * (row['secondsRemaining'] / 3600)) + row['liveScore']
-        return result
-    merged['scoreRemaining'] = merged.apply(calcScoreRemaining, axis=1)
-    # Claculate difference between projection/actual
-    merged['diff'] = merged.scoreRemaining - merged.weeklyPred
-    # Normalize difference
-    merged.loc[merged['diff']>20, 'diff'] = 20
-    merged.loc[merged['diff']<-20, 'diff'] = -20
-    merged['scaled'] = round(merged['diff'] * 255 / 20, 0)
-    merged.dropna(inplace=True)
-    merged['scaled'] = merged['scaled'].astype('int')
-    # Set colors for chart
-    def colorPicker(row):
-        scalar = row['scaled']
-        if scalar >= 0:
-            red = 255 - scalar
-            green = 255
-            blue = 255 - scalar
-        else:
-            red = 255 
-            green = 255 + scalar
-            blue = 255 + scalar
-        color = f'rgb({red},{green},{blue})'
-        return color
-    merged['color'] = merged.apply(colorPicker, axis=1)
-    # chart
-    players_onthefield = merged.loc[merged.status=="starter"]
-    players_onthefield = players_onthefield.sort_values(by='scoreRemaining', ascending=False, ignore_index=True)
-    fran_rank = players_onthefield.groupby('franchiseName').sum().sort_values(by='scoreRemaining', ascending=False)
-    sorter = fran_rank.index
-    players_onthefield.franchiseName = players_onthefield.franchiseName.astype("category")
-    players_onthefield.franchiseName.cat.set_categories(sorter, inplace=True)
-    players_onthefield.sort_values(["franchiseName"], inplace=True)
+    metrics.phase("get_df")
+    predictions = offload(get_cached_df, "predictions")
+
+    # Project each starter's final score
+    metrics.phase("pandas")
+    players_onthefield = offload(live_scores, liveScores, franchises, predictions)
+    # Win probability of each matchup: the background poller's, or updated from this poll
+    odds = offload(live_odds.league_odds, user_league, liveScores, franchises, predictions)
     color_discrete_map = dict(zip(players_onthefield.id_mfl, players_onthefield.color))
     # Create bar chart
+    metrics.phase("figure")
     figLive = px.bar(players_onthefield, 
                 x="franchiseName", 
                 y="scoreRemaining", 
@@ -746,7 +430,8 @@ def liveScoring():
                 showlegend=False
                 )
     graphJSON_live = json.dumps(figLive, cls=plotly.utils.PlotlyJSONEncoder)
-    return render_template('liveScoring.html', graphJSON=graphJSON_live)
+    metrics.phase("render")
+    return render_template('liveScoring.html', graphJSON=graphJSON_live, tables=[odds.to_html(classes='data', index=False)])
 
 
 @app.route("/logout")
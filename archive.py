@@ -0,0 +1,174 @@
+# Import dependencies
+# Standard python libraries
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+from urllib.parse import urlparse
+
+# Internal imports
+import metrics
+import throttle
+
+# Find environment variables
+# Directory that holds the raw response archive
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "archive")
+# Set ARCHIVE_RECORD=1 to write fetched responses to the archive (the scheduler records unless ARCHIVE_RECORD=0)
+ARCHIVE_RECORD = os.environ.get("ARCHIVE_RECORD", "0") == "1"
+# Set ARCHIVE_REPLAY=1 to serve every request from the archive without touching the network
+ARCHIVE_REPLAY = os.environ.get("ARCHIVE_REPLAY", "0") == "1"
+# Optionally replay the archive as it was at a given time, e.g. ARCHIVE_REPLAY_AT=2022-09-08T06:00:00
+ARCHIVE_REPLAY_AT = os.environ.get("ARCHIVE_REPLAY_AT", None)
+
+# The archive is laid out as:
+#   objects/<sha[:2]>/<sha>.gz  gzipped response bodies, named by the sha256 of the body
+#   index/<sha of url>.jsonl    one line per fetch of a url: {"url", "fetched", "sha256"}
+#   validators/<sha of url>.json the newest ETag / Last-Modified and body sha256 of a large export (see get_export)
+# Identical bodies are only stored once no matter how many times or from which url they were fetched.
+
+def _url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+def _object_path(digest):
+    return os.path.join(ARCHIVE_DIR, "objects", digest[:2], digest + ".gz")
+
+def _index_path(url):
+    return os.path.join(ARCHIVE_DIR, "index", _url_key(url) + ".jsonl")
+
+# Write a raw response body to the archive and record when it was fetched
+def save_content(url, content, fetched=None):
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    digest = hashlib.sha256(content).hexdigest()
+    objectPath = _object_path(digest)
+    if not os.path.exists(objectPath):
+        os.makedirs(os.path.dirname(objectPath), exist_ok=True)
+        # Write to a temp file first so a crash never leaves a truncated object behind
+        tmpPath = objectPath + ".tmp"
+        with gzip.open(tmpPath, "wb") as f:
+            f.write(content)
+        os.replace(tmpPath, objectPath)
+    if fetched is None:
+        fetched = datetime.utcnow().isoformat(timespec="seconds")
+    indexPath = _index_path(url)
+    os.makedirs(os.path.dirname(indexPath), exist_ok=True)
+    with open(indexPath, "a") as f:
+        f.write(json.dumps({"url": url, "fetched": fetched, "sha256": digest}) + "\n")
+    return digest
+
+# List every archived fetch of a url, oldest first
+def list_fetches(url):
+    indexPath = _index_path(url)
+    if not os.path.exists(indexPath):
+        return []
+    with open(indexPath) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return sorted(entries, key=lambda entry: entry["fetched"])
+
+# Read the newest archived body for a url (or the newest one fetched at or before `asOf`)
+def load_content(url, asOf=None):
+    entries = list_fetches(url)
+    if asOf is not None:
+        entries = [entry for entry in entries if entry["fetched"] <= asOf]
+    if len(entries) == 0:
+        return None
+    with gzip.open(_object_path(entries[-1]["sha256"]), "rb") as f:
+        return f.read()
+
+# Fetch a url (rate limited and retried, see throttle.py) and archive the body if it was a success; in replay
+# mode, or when the fetch fails, read the body from the archive instead
+def get_content(url):
+    if ARCHIVE_REPLAY:
+        content = load_content(url, ARCHIVE_REPLAY_AT)
+        if content is None:
+            raise LookupError(f"No archived response for {url}")
+        return content
+    try:
+        response = throttle.fetch(url)
+    except throttle.FetchError as error:
+        # The host is down or refusing us: serve the newest archived body if there is one
+        content = load_content(url)
+        if content is None:
+            raise
+        print(f"Serving archived {url}: {error}")
+        metrics.fetch_result(urlparse(url).netloc, "stale")
+        return content
+    # Error pages are never archived, so they are not replayed or served as stale data later
+    if ARCHIVE_RECORD and response.ok:
+        save_content(url, response.content)
+    return response.content
+
+def _validators_path(url):
+    return os.path.join(ARCHIVE_DIR, "validators", _url_key(url) + ".json")
+
+def _read_validators(url):
+    if not os.path.exists(_validators_path(url)):
+        return {}
+    with open(_validators_path(url)) as f:
+        return json.load(f)
+
+def _write_validators(url, validators):
+    path = _validators_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(validators, f)
+    os.replace(path + ".tmp", path)
+
+def _read_object(digest):
+    with gzip.open(_object_path(digest), "rb") as f:
+        return f.read()
+
+# Undo the transfer encoding of a body read with decode_content=False
+def _decode(raw, encoding):
+    if encoding == "gzip":
+        return gzip.decompress(raw)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(raw)
+        except zlib.error:
+            return zlib.decompress(raw, -zlib.MAX_WBITS)
+    return raw
+
+# Fetch a large export compressed and, when the server supports it, conditionally; returns (content, sha256, changed).
+# `changed` is False when the server answered 304 or sent the same body as last time, so callers can keep what
+# they built from it. Conditional headers are only sent while the last body is still in the archive.
+def get_export(url):
+    if ARCHIVE_REPLAY:
+        content = get_content(url)
+        return content, hashlib.sha256(content).hexdigest(), True
+    validators = _read_validators(url)
+    headers = {"Accept-Encoding": "gzip"}
+    if validators.get("sha256") and os.path.exists(_object_path(validators["sha256"])):
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("lastModified"):
+            headers["If-Modified-Since"] = validators["lastModified"]
+    try:
+        response = throttle.fetch(url, headers=headers, stream=True)
+    except throttle.FetchError as error:
+        content = load_content(url)
+        if content is None:
+            raise
+        print(f"Serving archived {url}: {error}")
+        metrics.fetch_result(urlparse(url).netloc, "stale")
+        digest = hashlib.sha256(content).hexdigest()
+        return content, digest, digest != validators.get("sha256")
+    if response.status_code == 304:
+        response.close()
+        print(f"{url}: not modified, 0 bytes transferred")
+        return _read_object(validators["sha256"]), validators["sha256"], False
+    raw = response.raw.read(decode_content=False)
+    response.close()
+    content = _decode(raw, response.headers.get("Content-Encoding", "").lower())
+    digest = hashlib.sha256(content).hexdigest()
+    if not response.ok:
+        print(f"{url}: HTTP {response.status_code}, not archived")
+        return content, digest, True
+    changed = digest != validators.get("sha256")
+    print(f"{url}: {len(raw)} bytes transferred ({len(content)} decoded), {'changed' if changed else 'unchanged'}")
+    if ARCHIVE_RECORD:
+        save_content(url, content)
+    _write_validators(url, {"etag": response.headers.get("ETag"), "lastModified": response.headers.get("Last-Modified"), "sha256": digest})
+    return content, digest, changed
@@ -0,0 +1,199 @@
+# Import dependencies
+# Standard python libraries
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+# Third-party libraries
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+# Internal imports
+import player_index
+from db import get_df
+from features import labels, features, oppFeatures, oppSources, score_predictions
+from module_ffdb import scrape_ffdb_week, clean_ffdb, posMap, statList
+from train import TRAINING_DIR, training_path
+
+# Find environment variables
+# Root of the partitioned weekly stats dataset
+STATS_DIR = os.environ.get("STATS_DIR", "stats")
+DATABASE_URL = os.environ.get("DATABASE_URL", None)
+# sqlalchemy deprecated urls which begin with "postgres://"; now it needs to start with "postgresql://"
+if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+# Completed units are appended to this file, one json line each, so a crash loses at most the units in flight
+CHECKPOINT_FILE = os.path.join(STATS_DIR, "_checkpoint.jsonl")
+
+# Partition path for one unit: stats/season=2021/week=3/position=QB/part.parquet
+def unit_path(position, season, week):
+    return os.path.join(STATS_DIR, f"season={season}", f"week={week}", f"position={posMap.get(position)}", "part.parquet")
+
+def read_checkpoint():
+    if not os.path.exists(CHECKPOINT_FILE):
+        return set()
+    with open(CHECKPOINT_FILE) as f:
+        return {tuple(json.loads(line)) for line in f if line.strip()}
+
+def write_checkpoint(unit):
+    with open(CHECKPOINT_FILE, "a") as f:
+        f.write(json.dumps(list(unit)) + "\n")
+
+# Scrape, clean and write a single (position, season, week) unit
+def run_unit(unit):
+    position, season, week = unit
+    result = scrape_ffdb_week(position, season, week)
+    df = clean_ffdb(result, position)
+    # season/week/position live in the partition path, not in the file
+    df = df.drop(columns=['season', 'week', 'pos'])
+    path = unit_path(position, season, week)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temp file first so a crash never leaves a half-written partition behind
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return unit, len(df)
+
+# Run every unit that is not already in the checkpoint across a process pool
+def backfill(positions, seasons, weeks, workers):
+    os.makedirs(STATS_DIR, exist_ok=True)
+    done = read_checkpoint()
+    units = [(p, s, w) for s in seasons for w in weeks for p in positions if (p, s, w) not in done]
+    print(f"{len(done)} units already complete, {len(units)} to run")
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_unit, unit): unit for unit in units}
+        for future in as_completed(futures):
+            unit = futures[future]
+            try:
+                unit, rows = future.result()
+            except Exception as error:
+                # Keep going; failed units are not checkpointed and will be retried on the next run
+                print(f"{unit} failed: {error}")
+                failed.append(unit)
+                continue
+            write_checkpoint(unit)
+            print(f"{unit} complete: {rows} rows")
+    return failed
+
+# Read the weekly stats for one season from the partitioned dataset
+def read_season(season, columns=None):
+    path = os.path.join(STATS_DIR, f"season={season}")
+    df = pd.read_parquet(path, columns=columns)
+    # Partition columns come back as categoricals
+    if 'position' in df.columns:
+        df['position'] = df['position'].astype(str)
+    return df
+
+# Aggregate a season of weekly stats into a prior-season table, e.g. prior1 for 2021 when predicting 2022
+def build_prior(season, lag):
+    weekly = read_season(season, columns=['player'] + statList)
+    prior = weekly.groupby('player')[statList].sum()
+    prior.insert(0, 'gamesPlayed', weekly.groupby('player').size())
+    prior.reset_index(inplace=True)
+    # Rename all columns in prior
+    prior.columns = ['player'] + [(x + f"_prior{lag}") for x in prior.columns[1:]]
+    return prior
+
+# Rebuild the prior1 and prior2 tables the scheduler reads for a given current season
+def publish_priors(currentSeason):
+    engine = create_engine(DATABASE_URL)
+    for lag in [1, 2]:
+        prior = build_prior(currentSeason - lag, lag)
+        prior.to_sql(f'prior{lag}', engine, if_exists='replace', index=False)
+        print(f"prior{lag}: {len(prior)} players from {currentSeason - lag}")
+
+# Prior-season table for training; seasons that were never backfilled count as no history
+def training_prior(season, lag):
+    if not os.path.exists(os.path.join(STATS_DIR, f"season={season}")):
+        return pd.DataFrame(columns=['player'] + [(x + f"_prior{lag}") for x in ['gamesPlayed'] + statList])
+    return build_prior(season, lag)
+
+# Player ages at the start of a season from the player_dobs table the scheduler keeps; footballdb names are matched
+# to MFL ids the same way as the prior tables
+def player_ages(names, season):
+    players = pd.DataFrame({'player': pd.unique(names)})
+    dobs = get_df('player_dobs')
+    if dobs is None or len(dobs) == 0:
+        return pd.Series(np.nan, index=players['player'])
+    dobs = dobs.astype({'PlayerID': 'int64'}).drop_duplicates(subset=['PlayerID']).set_index('PlayerID')['DOB']
+    born = pd.to_datetime(dobs, errors='coerce').reindex(player_index.resolve(players, 'footballdb', teamCol=None))
+    start = pd.Timestamp(f"{season}-09-01")
+    return pd.Series(((start - born).dt.days / 365.25).values, index=players['player'])
+
+# One training row per player-week of a season: the stats going into the week (curr), the two seasons before (prior1,
+# prior2), the opposing defense's curr and prior1 stats, and that week's actual stat line (labels)
+def training_season(season):
+    weekly = read_season(season)
+    if 'opponent' not in weekly.columns:
+        print(f"{season}: no opponents in the backfilled stats; rerun its backfill to train on it")
+        return None
+    weekly['week'] = weekly['week'].astype('int64')
+    weekly = weekly.loc[weekly['opponent'].notna()].sort_values(['player', 'position', 'week'], ignore_index=True)
+
+    # Season-to-date stats before each week
+    players = weekly.groupby(['player', 'position'])
+    curr = players[statList].cumsum() - weekly[statList]
+    curr.columns = [(x + "_curr") for x in statList]
+    curr['gamesPlayed_curr'] = players.cumcount()
+    df = pd.concat([weekly, curr], axis=1)
+    for lag in [1, 2]:
+        df = df.merge(training_prior(season - lag, lag), how='left', on='player')
+    df.fillna({col: 0 for col in df.columns if col.endswith(('_prior1', '_prior2'))}, inplace=True)
+
+    # The opposing defense's row for the same week
+    defs = df.loc[df['position']=='DF', ['team', 'week'] + oppSources].drop_duplicates(subset=['team', 'week'])
+    defs.columns = ['opponent', 'week'] + oppFeatures
+    df = df.merge(defs, how='inner', on=['opponent', 'week'])
+
+    # No historical depth charts: rank each team's players by points so far this season, then last season
+    df['pos'] = df['position']
+    df['pointsCurr'] = score_predictions(df[[(x + "_curr") for x in statList]].to_numpy(dtype='float64'), df['pos'])
+    df['pointsPrior'] = score_predictions(df[[(x + "_prior1") for x in statList]].to_numpy(dtype='float64'), df['pos'])
+    df.sort_values(['pointsCurr', 'pointsPrior'], ascending=False, inplace=True, ignore_index=True)
+    rank = df.groupby(['team', 'week', 'pos']).cumcount().clip(upper=2) + 1
+    df['posRank'] = df['pos'] + rank.astype(str)
+    df.loc[df['pos']=='DF', 'posRank'] = "DF1"
+
+    # Players without a known birth date get their position's median age
+    df['age'] = df['player'].map(player_ages(df['player'], season))
+    df['age'] = df['age'].fillna(df.groupby('pos')['age'].transform('median')).fillna(0)
+    df['season'] = season
+    return df
+
+# Write one training table per position (TRAINING_DIR/{pos}.parquet) from the backfilled seasons
+def build_training(seasons):
+    frames = [training_season(season) for season in seasons]
+    frames = [df for df in frames if df is not None]
+    if not frames:
+        raise SystemExit("No backfilled seasons with opponents to build training tables from")
+    df = pd.concat(frames, ignore_index=True)
+    os.makedirs(TRAINING_DIR, exist_ok=True)
+    for pos, group in df.groupby('pos'):
+        path = training_path(pos)
+        group[['player', 'team', 'opponent', 'season', 'pos', 'posRank'] + features + labels].to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        print(f"{pos}: {len(group)} player-weeks from {group['season'].nunique()} seasons")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill footballdb weekly stats into partitioned parquet")
+    parser.add_argument('--seasons', nargs=2, type=int, metavar=('FIRST', 'LAST'), help="inclusive season range to backfill")
+    parser.add_argument('--weeks', nargs=2, type=int, metavar=('FIRST', 'LAST'), default=[1, 18], help="inclusive week range")
+    parser.add_argument('--positions', nargs='+', default=list(posMap.keys()), choices=list(posMap.keys()))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--priors', type=int, metavar='SEASON', help="rebuild prior1/prior2 for this current season")
+    parser.add_argument('--training', nargs='+', type=int, metavar='SEASON', help="build the train.py tables from these backfilled seasons")
+    args = parser.parse_args()
+
+    if args.seasons:
+        seasons = range(args.seasons[0], args.seasons[1] + 1)
+        weeks = range(args.weeks[0], args.weeks[1] + 1)
+        failed = backfill(args.positions, seasons, weeks, args.workers)
+        if failed:
+            print(f"{len(failed)} units failed; rerun the same command to resume")
+    if args.priors:
+        publish_priors(args.priors)
+    if args.training:
+        build_training(args.training)
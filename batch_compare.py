@@ -0,0 +1,143 @@
+# Import dependencies
+# Standard python libraries
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+# Third-party libraries
+import pandas as pd
+from sqlalchemy import inspect, text
+
+# Internal imports
+import archive
+import db
+from lineups import merge_rosters, build_lineups
+from mfl import get_mfl_league, get_mfl_rosters, get_mfl_freeAgents
+
+# Computes the compareFranchises2 lineups for many leagues in one run and stores them in the league_lineups
+# table, which /compareFranchises2 serves directly (see charts.py) instead of fetching and building per request.
+# python batch_compare.py 10001 10002 ...   or   python batch_compare.py --active
+
+# Find environment variables
+# MFL requests in flight at once
+BATCH_FETCH_THREADS = int(os.environ.get("BATCH_FETCH_THREADS", "8"))
+# Processes building lineups; defaults to one per CPU
+BATCH_PROCESSES = int(os.environ.get("BATCH_PROCESSES", "0")) or None
+# Stored lineups older than this are rebuilt per request instead, as rosters will have moved
+LINEUP_MAX_AGE_SECONDS = float(os.environ.get("LINEUP_MAX_AGE_SECONDS", "3600"))
+
+# The three valuations compareFranchises2 charts: name -> projection column
+valuations = {"adp": "adpAbsolute", "shark": "sharkAbsolute", "pred": "pred"}
+lineupColumns = ['league', 'valuation', 'row', 'FranchiseID', 'FranchiseName', 'id_mfl', 'player', 'pos',
+    'pred', 'sharkAbsolute', 'adpAbsolute', 'relative', 'computed']
+
+# Predictions, loaded once per run and handed to each worker process when it starts
+predictions = None
+
+def init_worker(predictionsDf):
+    global predictions
+    predictions = predictionsDf
+
+# A league's franchises, rosters and free agents, or None (logged) if MFL could not serve them
+def fetch_league(league):
+    try:
+        return get_mfl_league(league), get_mfl_rosters(league), get_mfl_freeAgents(league)
+    except Exception as error:
+        print(f"League {league}: fetch failed: {error}")
+        return None
+
+# Every valuation's starting lineups for one league, as league_lineups rows
+def league_lineups(league, franchises, rosters, freeAgents):
+    complete = merge_rosters(predictions, franchises, rosters, freeAgents)
+    frames = []
+    for prefix, valueCol in valuations.items():
+        players_onthefield = build_lineups(complete, valueCol, prefix)
+        frame = players_onthefield[['FranchiseID', 'id_mfl', 'player', 'pos', 'pred', 'sharkAbsolute', 'adpAbsolute']].copy()
+        frame['FranchiseName'] = players_onthefield['FranchiseName'].astype(str)
+        frame['relative'] = players_onthefield[f'{prefix}Relative']
+        frame['valuation'] = prefix
+        # Keep the chart's stacking order
+        frame['row'] = range(len(frame))
+        frames.append(frame)
+    result = pd.concat(frames, ignore_index=True)
+    result['league'] = league
+    return result
+
+# Replace the stored lineups of the given leagues
+def write_lineups(lineups, leagues):
+    with db.get_engine().begin() as conn:
+        # A table from before player ids were stored is dropped; the next batch run refills it
+        if inspect(conn).has_table('league_lineups') and 'id_mfl' not in [col['name'] for col in inspect(conn).get_columns('league_lineups')]:
+            conn.execute(text('DROP TABLE league_lineups'))
+        if inspect(conn).has_table('league_lineups'):
+            for league in leagues:
+                conn.execute(text('DELETE FROM league_lineups WHERE league = :league'), {"league": league})
+        lineups.to_sql('league_lineups', conn, if_exists='append', index=False)
+
+# Build and store the lineups of many leagues: one predictions read, concurrent MFL fetches,
+# and the pandas work spread over a process pool. A league that fails is logged and skipped; the rest are
+# still stored. Returns the stored rows.
+def compare_leagues(leagues, processes=BATCH_PROCESSES, write=True):
+    leagues = list(dict.fromkeys(leagues))
+    start = time.time()
+    predictionsDf = db.get_df('predictions')
+    with ThreadPoolExecutor(max_workers=BATCH_FETCH_THREADS) as executor:
+        fetched = dict(zip(leagues, executor.map(fetch_league, leagues)))
+    fetchSeconds = time.time() - start
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker, initargs=(predictionsDf,)) as executor:
+        jobs = {league: executor.submit(league_lineups, league, *fetched[league]) for league in leagues if fetched[league] is not None}
+    built = {}
+    for league, job in jobs.items():
+        try:
+            built[league] = job.result()
+        except Exception as error:
+            print(f"League {league}: building lineups failed: {error}")
+    failed = [league for league in leagues if league not in built]
+    print(f"Built lineups for {len(built)} leagues in {time.time() - start:.1f}s ({fetchSeconds:.1f}s fetching)"
+        + (f", {len(failed)} failed: {', '.join(map(str, failed))}" if failed else ""))
+    if not built:
+        return pd.DataFrame(columns=lineupColumns)
+    lineups = pd.concat(built.values(), ignore_index=True)
+    lineups['computed'] = pd.Timestamp.utcnow().tz_localize(None)
+    lineups = lineups[lineupColumns]
+
+    if write:
+        write_lineups(lineups, list(built))
+    return lineups
+
+# The stored lineups of one league by valuation, or None when there are none fresh enough to serve
+def stored_lineups(league):
+    if archive.ARCHIVE_REPLAY or not db.DATABASE_URL:
+        return None
+    try:
+        lineups = pd.read_sql(text('SELECT * FROM league_lineups WHERE league = :league'), db.get_engine(), params={"league": league})
+    except Exception:
+        # Nothing stored yet
+        return None
+    if len(lineups) == 0 or 'id_mfl' not in lineups.columns:
+        return None
+    computed = pd.to_datetime(lineups['computed']).min()
+    if (pd.Timestamp.utcnow().tz_localize(None) - computed).total_seconds() > LINEUP_MAX_AGE_SECONDS:
+        return None
+    # Lineups built before the latest predictions are stale too
+    published = db.get_predictions_version()
+    if published is not None and computed < pd.Timestamp(published):
+        return None
+    lineups = lineups.sort_values(['valuation', 'row'])
+    return {prefix: frame.rename(columns={'relative': f'{prefix}Relative'}) for prefix, frame in lineups.groupby('valuation')}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and store compareFranchises2 lineups for many leagues")
+    parser.add_argument("leagues", nargs="*", help="MFL league ids")
+    parser.add_argument("--active", action="store_true", help="also include the leagues used recently (see warmup.py)")
+    parser.add_argument("--processes", type=int, default=BATCH_PROCESSES)
+    args = parser.parse_args()
+
+    leagues = list(args.leagues)
+    if args.active:
+        import warmup
+        leagues += [league for league, franchise in warmup.active_leagues()]
+    if not leagues:
+        parser.error("no leagues given")
+    compare_leagues(leagues, args.processes)
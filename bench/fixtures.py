@@ -0,0 +1,261 @@
+# Import dependencies
+# Standard python libraries
+import hashlib
+import os
+import shutil
+from xml.sax.saxutils import quoteattr
+# Third-party libraries
+import numpy as np
+import pandas as pd
+
+# Internal imports
+import archive
+import db
+import depth_chart
+from features import staticFeatures
+
+# The benchmark league: 12 franchises with full rosters drawn from a full-size player universe.
+# Fixtures are written into an archive directory in the same layout the scheduler records, so the
+# benchmarks read them through the normal replay path; a real recorded archive can be used instead.
+LEAGUE = "10001"
+SEED = 2022
+nFranchises = 12
+rosterSize = 28
+starters = 10
+weeks = 17
+regularSeasonWeeks = 14
+# Players per NFL team at each position, plus the positions MFL lists that the scheduler drops
+teamDepth = {'QB':3, 'RB':5, 'WR':7, 'TE':4, 'PK':1, 'Def':1, 'LB':6, 'CB':6, 'S':4, 'DE':5}
+freeAgents = 900
+# Every fixture is archived as fetched at this time
+fixtureTime = "2022-09-08T06:00:00"
+mflTeams = list(depth_chart.teamDict.values())
+ourladsTeams = list(depth_chart.teamDict.keys())
+firstNames = ['James', 'John', 'Robert', 'Michael', 'David', 'Chris', 'Daniel', 'Matthew', 'Anthony', 'Mark',
+    'Josh', 'Justin', 'Tyler', 'Kyle', 'Jalen', 'Deshawn', 'Marcus', 'Tre', 'Amari', 'Cooper']
+lastNames = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Miller', 'Davis', 'Wilson', 'Moore', 'Taylor',
+    'Thomas', 'Jackson', 'White', 'Harris', 'Martin', "O'Neil", 'Amon-Ra', 'Lee', 'Walker', 'Hall']
+
+def _xml(root, elems, attrs=""):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<{root}{attrs}>']
+    lines.extend(elems)
+    lines.append(f'</{root}>')
+    return "\n".join(lines)
+
+def _elem(tag, **attrs):
+    return f'<{tag} ' + " ".join(f'{key}={quoteattr(str(value))}' for key, value in attrs.items()) + '/>'
+
+# Build the player universe; returns a frame with id, first/last name, position and team
+def player_universe(rng):
+    rows = []
+    for team in mflTeams:
+        for pos, count in teamDepth.items():
+            rows.extend([(pos, team)] * count)
+    positions = list(teamDepth)
+    for i in range(freeAgents):
+        rows.append((positions[i % len(positions)], 'FA'))
+    players = pd.DataFrame(rows, columns=['position', 'team'])
+    players['id'] = [str(10000 + i) for i in range(len(players))]
+    # Number the first names so (almost) every name is unique, as in the real universe
+    players['first'] = np.char.add(rng.choice(firstNames, len(players)), np.char.mod('%d', np.arange(len(players)) % 97))
+    players['last'] = rng.choice(lastNames, len(players))
+    return players
+
+def players_xml(players):
+    elems = []
+    for row in players.itertuples():
+        name = f'{row.team}, Def' if row.position == 'Def' else f'{row.last}, {row.first}'
+        elems.append(_elem('player', id=row.id, name=name, position=row.position, team=row.team))
+    return _xml('players', elems)
+
+def ranks_xml(players):
+    ranked = players.loc[players.position.isin(['QB', 'RB', 'WR', 'TE', 'PK', 'Def'])].sample(frac=1, random_state=SEED)
+    elems = [_elem('player', id=pid, rank=i + 1) for i, pid in enumerate(ranked.id)]
+    return _xml('playerRanks', elems)
+
+def adp_xml(players, rng):
+    drafted = players.loc[players.position.isin(['QB', 'RB', 'WR', 'TE', 'PK', 'Def'])].sample(n=300, random_state=SEED)
+    elems = [_elem('player', id=pid, averagePick=f'{i + rng.random():.2f}') for i, pid in enumerate(drafted.id)]
+    return _xml('adp', elems)
+
+# Deal rostered players to the franchises; returns {franchiseID: [player ids]}
+def deal_rosters(players, rng):
+    pool = players.loc[players.position.isin(['QB', 'RB', 'WR', 'TE', 'PK', 'Def']) & (players.team != 'FA')]
+    pool = pool.sample(n=nFranchises * rosterSize, random_state=SEED).id.tolist()
+    return {f'{i + 1:04d}': pool[i::nFranchises] for i in range(nFranchises)}
+
+def league_xml(rosters):
+    elems = ['<franchises count="12">'] + [_elem('franchise', id=fid, name=f'Franchise {fid}') for fid in rosters] + ['</franchises>']
+    return _xml('league', elems, f' id="{LEAGUE}"')
+
+def rosters_xml(rosters):
+    elems = []
+    for fid, ids in rosters.items():
+        elems.append(f'<franchise id="{fid}" week="1">')
+        elems.extend(_elem('player', id=pid, status='ROSTER') for pid in ids)
+        elems.append('</franchise>')
+    return _xml('rosters', elems)
+
+def free_agents_xml(players, rosters):
+    rostered = {pid for ids in rosters.values() for pid in ids}
+    pool = players.loc[players.position.isin(['QB', 'RB', 'WR', 'TE', 'PK', 'Def']) & ~players.id.isin(rostered)]
+    elems = ['<leagueUnit name="LEAGUE">'] + [_elem('player', id=pid, status='') for pid in pool.id] + ['</leagueUnit>']
+    return _xml('freeAgents', elems)
+
+# One transaction of each kind the roster store applies, posted after the rosters export was taken:
+# a free agent pickup, a blind bid ("added,|bid|dropped,"), a one-for-one trade and a move to IR
+def league_transactions(players, rosters):
+    rostered = {pid for ids in rosters.values() for pid in ids}
+    pool = players.loc[players.position.isin(['QB', 'RB', 'WR', 'TE']) & ~players.id.isin(rostered)].id.tolist()
+    fids = list(rosters)
+    start = 1662620400
+    return [
+        {'type': 'FREE_AGENT', 'timestamp': start, 'franchise': fids[0], 'transaction': f'{pool[0]},|{rosters[fids[0]][-1]},'},
+        {'type': 'BBID_WAIVER', 'timestamp': start + 60, 'franchise': fids[1], 'transaction': f'{pool[1]},|1.50|{rosters[fids[1]][-1]},'},
+        {'type': 'TRADE', 'timestamp': start + 120, 'franchise': fids[2], 'franchise2': fids[3],
+            'franchise1_gave_up': f'{rosters[fids[2]][0]},', 'franchise2_gave_up': f'{rosters[fids[3]][0]},'},
+        {'type': 'IR', 'timestamp': start + 180, 'franchise': fids[4], 'transaction': f'|{rosters[fids[4]][1]},'},
+    ]
+
+def transactions_xml(transactions):
+    return _xml('transactions', [_elem('transaction', **transaction) for transaction in transactions])
+
+def live_scoring_xml(rosters, rng):
+    elems = []
+    fids = list(rosters)
+    for home, away in zip(fids[0::2], fids[1::2]):
+        elems.append('<matchup>')
+        for fid in [home, away]:
+            elems.append(f'<franchise id="{fid}"><players>')
+            for i, pid in enumerate(rosters[fid]):
+                elems.append(_elem('player', id=pid, score=f'{rng.random() * 25:.2f}',
+                    gameSecondsRemaining=int(rng.integers(0, 3601)), status='starter' if i < starters else 'nonstarter'))
+            elems.append('</players></franchise>')
+        elems.append('</matchup>')
+    return _xml('liveScoring', elems, ' week="1"')
+
+# Round-robin head-to-head schedule for the regular season, not yet played
+def schedule_xml(rosters):
+    fids = list(rosters)
+    elems = []
+    for week in range(regularSeasonWeeks):
+        elems.append(f'<weeklySchedule week="{week + 1}">')
+        # Circle method: the first franchise stays put and the rest rotate
+        order = [fids[0]] + fids[1:][week % (len(fids) - 1):] + fids[1:][:week % (len(fids) - 1)]
+        for home, away in zip(order[:len(order) // 2], order[::-1][:len(order) // 2]):
+            elems.append('<matchup>' + _elem('franchise', id=home, isHome=1, score='') + _elem('franchise', id=away, isHome=0, score='') + '</matchup>')
+        elems.append('</weeklySchedule>')
+    return _xml('schedule', elems)
+
+# The ourlads depth chart table, as the scheduler reads it from the page
+def depth_chart_html(players):
+    mflToOurlads = dict(zip(mflTeams, ourladsTeams))
+    roles = {'QB':['QB'], 'RB':['RB'], 'WR':['LWR', 'RWR', 'SWR'], 'TE':['TE'], 'PK':['PK']}
+    rows = ['<table id="ctl00_phContent_gvChart"><thead><tr><th>Team</th><th>Pos</th>'
+        + "".join(f'<th>Player {i}</th>' for i in range(1, 6)) + '</tr></thead><tbody>']
+    onTeam = players.loc[players.team != 'FA']
+    for team, group in onTeam.groupby('team'):
+        names = {pos: [f'{row.last}, {row.first} 19/{i + 1}' for i, row in enumerate(group.loc[group.position==pos].itertuples())] for pos in roles}
+        slots = []
+        for pos, posRoles in roles.items():
+            for j, role in enumerate(posRoles):
+                slots.append((role, names[pos][j::len(posRoles)][:5]))
+        slots.append(('KR', names['WR'][-2:] + names['RB'][-1:]))
+        slots.append(('PR', names['WR'][-1:]))
+        slots.append(('RES', names['RB'][-1:]))
+        for role, depth in slots:
+            cells = [f'<td>{name}</td>' for name in depth] + ['<td></td>'] * (5 - len(depth))
+            rows.append(f'<tr><td>{mflToOurlads[team]}</td><td>{role}</td>' + "".join(cells) + '</tr>')
+    rows.append('</tbody></table>')
+    return "\n".join(rows)
+
+# The scheduler's published predictions table for the player universe
+def predictions_table(players, rng):
+    relevant = players.loc[players.position.isin(['QB', 'RB', 'WR', 'TE', 'PK', 'Def'])].reset_index(drop=True)
+    pos = relevant.position.replace('Def', 'DF')
+    pred = pd.DataFrame({
+        'id_mfl': relevant.id,
+        'player': (relevant['first'] + " " + relevant['last']).str.upper(),
+        'age': rng.integers(21, 36, len(relevant)),
+        'team': relevant.team,
+        'pos': pos,
+        'posRank': pos + rng.integers(1, 4, len(relevant)).astype(str),
+        'KR': "NO", 'PR': "NO", 'RES': "NO",
+        'sharkRank': rng.integers(1, 3000, len(relevant)).astype(float),
+        'adp': rng.integers(1, 3000, len(relevant)).astype(float),
+        'pred': rng.gamma(2, 60, len(relevant)),
+        'sharkAbsolute': rng.gamma(2, 60, len(relevant)),
+        'adpAbsolute': rng.gamma(2, 60, len(relevant))
+    })
+    pred.loc[pred.pos=='DF', 'posRank'] = 'DF1'
+    return pred
+
+# Player features in the scheduler's player_df layout (one row per player) and the season schedule
+def feature_frames(predictions, rng):
+    players = predictions[['id_mfl', 'player', 'age', 'team', 'pos', 'posRank', 'KR', 'PR', 'RES', 'sharkRank', 'adp']].copy()
+    players = players.loc[players.team != 'FA'].reset_index(drop=True)
+    stats = pd.DataFrame(rng.gamma(1.5, 10, (len(players), len(staticFeatures) - 1)).astype('float32'), columns=staticFeatures[1:])
+    players = pd.concat([players, stats], axis=1)
+    # Pair the teams off differently every week
+    games = []
+    for week in range(1, weeks + 1):
+        order = rng.permutation(mflTeams)
+        for home, away in zip(order[0::2], order[1::2]):
+            games.extend([(home, week, away), (away, week, home)])
+    schedule = pd.DataFrame(games, columns=['team', 'week', 'opponent'])
+    return players, schedule
+
+def league_url(requestType):
+    return f"https://www54.myfantasyleague.com/2022/export?TYPE={requestType}&L={LEAGUE}"
+
+# Write every fixture into the archive at `directory`
+def build(directory):
+    rng = np.random.default_rng(SEED)
+    archive.ARCHIVE_DIR = directory
+    players = player_universe(rng)
+    rosters = deal_rosters(players, rng)
+    predictions = predictions_table(players, rng)
+    featurePlayers, schedule = feature_frames(predictions, rng)
+    fetched = fixtureTime
+    archive.save_content("https://api.myfantasyleague.com/2022/export?TYPE=players", players_xml(players), fetched)
+    archive.save_content("https://api.myfantasyleague.com/2022/export?TYPE=playerRanks", ranks_xml(players), fetched)
+    archive.save_content("https://api.myfantasyleague.com/2022/export?TYPE=adp", adp_xml(players, rng), fetched)
+    archive.save_content(league_url("league"), league_xml(rosters), fetched)
+    archive.save_content(league_url("rosters"), rosters_xml(rosters), fetched)
+    archive.save_content(league_url("freeAgents"), free_agents_xml(players, rosters), fetched)
+    archive.save_content(league_url("liveScoring"), live_scoring_xml(rosters, rng), fetched)
+    archive.save_content(league_url("schedule"), schedule_xml(rosters), fetched)
+    archive.save_content(league_url("transactions"), transactions_xml(league_transactions(players, rosters)), fetched)
+    archive.save_content("https://www.ourlads.com/nfldepthcharts/depthcharts.aspx", depth_chart_html(players), fetched)
+    archive.save_content("db:predictions", db.frame_bytes(predictions), fetched)
+    archive.save_content("db:bench_player_features", db.frame_bytes(featurePlayers), fetched)
+    archive.save_content("db:schedule", db.frame_bytes(schedule), fetched)
+    with open(version_path(directory), "w") as f:
+        f.write(fixtures_version())
+
+# The fixtures are stamped with a hash of this file, so fixtures written by an older version are rebuilt
+def fixtures_version():
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def version_path(directory):
+    return os.path.join(directory, "fixtures.sha256")
+
+# Fixtures written by build() (stamped or from before the stamp), as opposed to a real recorded archive
+def generated(directory):
+    if os.path.exists(version_path(directory)):
+        return True
+    archive.ARCHIVE_DIR = directory
+    return [entry["fetched"] for entry in archive.list_fetches(league_url("league"))] == [fixtureTime]
+
+# Build the fixtures unless `directory` already holds ones written by this version of the file.
+# A real recorded archive (see BENCH_FIXTURES_DIR) is never replaced.
+def ensure(directory, rebuild=False):
+    if os.path.exists(directory) and not generated(directory) and not rebuild:
+        return
+    if not rebuild and os.path.exists(version_path(directory)):
+        with open(version_path(directory)) as f:
+            if f.read().strip() == fixtures_version():
+                return
+    shutil.rmtree(directory, ignore_errors=True)
+    build(directory)
@@ -0,0 +1,147 @@
+# Import dependencies
+# Standard python libraries
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+# Third-party libraries
+import numpy as np
+import requests
+from sqlalchemy import create_engine
+
+# Internal imports
+import archive
+import db
+import fixtures
+
+# Drives the app's routes with many concurrent sessions. By default it starts bench/mock_mfl.py and the app
+# under gunicorn itself, with predictions served from a local sqlite copy of the fixtures, so no MFL or
+# Postgres traffic leaves the machine. Use --base-url to load an app that is already running.
+
+# Find environment variables
+BENCH_FIXTURES_DIR = os.environ.get("BENCH_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+
+routeList = ['/compareFranchises2', '/waiverWire', '/liveScoring']
+
+# Copy the recorded tables into a sqlite database the app can read through DATABASE_URL
+def build_database(path):
+    archive.ARCHIVE_DIR = BENCH_FIXTURES_DIR
+    engine = create_engine(f"sqlite:///{path}")
+    for table in ['predictions']:
+        db.read_frame(archive.load_content(f"db:{table}")).to_sql(table, engine, if_exists='replace', index=False)
+    engine.dispose()
+
+def wait_for(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=2)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+# Start the mock MFL server and gunicorn; returns the processes to stop afterwards
+def start_servers(args, workDir):
+    fixtures.ensure(BENCH_FIXTURES_DIR)
+    dbPath = os.path.join(workDir, "loadtest.db")
+    build_database(dbPath)
+    mock = subprocess.Popen([sys.executable, os.path.join(repoDir, "bench", "mock_mfl.py"),
+        "--port", str(args.mock_port), "--latency", str(args.latency), "--jitter", str(args.jitter), "--fixtures", BENCH_FIXTURES_DIR])
+    env = dict(os.environ,
+        MFL_HOST=f"http://127.0.0.1:{args.mock_port}",
+        DATABASE_URL=f"sqlite:///{dbPath}",
+        ARCHIVE_RECORD="0",
+        # Measure the app, not the MFL rate limiter
+        FETCH_RATE=os.environ.get("FETCH_RATE", "0"),
+        ARCHIVE_DIR=os.path.join(workDir, "archive"),
+        SECRET_KEY="loadtest")
+    gunicorn = subprocess.Popen(["gunicorn", "app:app", "--bind", f"127.0.0.1:{args.port}",
+        "--workers", str(args.workers), "--timeout", "120"] + args.gunicorn_args, cwd=repoDir, env=env)
+    wait_for(f"http://127.0.0.1:{args.mock_port}/")
+    wait_for(f"http://127.0.0.1:{args.port}/getLeague")
+    return [mock, gunicorn]
+
+# One simulated user: pick the league and franchise, then hit the routes in turn until the deadline
+def session_worker(baseUrl, league, franchise, routes, deadline, results, lock):
+    client = requests.Session()
+    client.post(f"{baseUrl}/getLeague/leagueCallback", data={"user_league": league}, allow_redirects=False)
+    client.post(f"{baseUrl}/getFranchise/franchiseCallback", data={"FranchiseName": franchise}, allow_redirects=False)
+    i = 0
+    while time.time() < deadline:
+        route = routes[i % len(routes)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status = client.get(f"{baseUrl}{route}", timeout=120).status_code
+        except requests.RequestException:
+            status = 0
+        elapsed = time.perf_counter() - start
+        with lock:
+            results.append((route, elapsed, status))
+
+def summarize(results, seconds):
+    summary = {}
+    for route in sorted({result[0] for result in results}):
+        latencies = np.array([elapsed for r, elapsed, status in results if r == route])
+        errors = sum(1 for r, elapsed, status in results if r == route and status != 200)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary[route] = {"requests": len(latencies), "errors": errors, "throughput": len(latencies) / seconds,
+            "p50": p50, "p95": p95, "p99": p99}
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the app's routes with concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent simulated sessions")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--routes", nargs="+", default=routeList)
+    parser.add_argument("--base-url", help="load an already running app instead of starting one")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--gunicorn-args", nargs=argparse.REMAINDER, default=[], help="extra gunicorn arguments")
+    parser.add_argument("--mock-port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.15, help="mock MFL mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--league", default=fixtures.LEAGUE)
+    parser.add_argument("--out", help="save the summary as JSON")
+    args = parser.parse_args()
+
+    processes = []
+    workDir = tempfile.mkdtemp(prefix="loadtest_")
+    try:
+        if args.base_url:
+            baseUrl = args.base_url.rstrip("/")
+        else:
+            processes = start_servers(args, workDir)
+            baseUrl = f"http://127.0.0.1:{args.port}"
+
+        results = []
+        lock = threading.Lock()
+        start = time.time()
+        deadline = start + args.duration
+        with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+            for i in range(args.sessions):
+                franchise = f"{i % fixtures.nFranchises + 1:04d}"
+                executor.submit(session_worker, baseUrl, args.league, franchise, args.routes, deadline, results, lock)
+        seconds = time.time() - start
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    summary = summarize(results, seconds)
+    print(f"{args.sessions} sessions for {seconds:.1f}s")
+    print(f"{'route':<22}{'requests':>10}{'errors':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, stats in summary.items():
+        print(f"{route:<22}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput']:>8.1f}"
+            f"{stats['p50'] * 1000:>9.0f}{stats['p95'] * 1000:>9.0f}{stats['p99'] * 1000:>9.0f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"sessions": args.sessions, "seconds": seconds, "routes": summary}, f, indent=1)
@@ -0,0 +1,97 @@
+# Import dependencies
+# Standard python libraries
+import argparse
+import gzip
+import hashlib
+import os
+import random
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Third-party libraries
+from bs4 import BeautifulSoup
+
+# Internal imports
+import archive
+import fixtures
+
+# A stand-in for the MFL export API: serves recorded league, rosters, freeAgents and liveScoring XML (and the
+# players, playerRanks and adp exports) from an archive directory, with configurable latency, ETags and gzip.
+# Point the app at it with MFL_HOST=http://127.0.0.1:<port> (and MFL_API_HOST for the player exports).
+
+# Hosts the fixtures were recorded from (league exports, then league-independent ones)
+recordedHost = "https://www54.myfantasyleague.com"
+recordedApiHost = "https://api.myfantasyleague.com"
+
+# Find environment variables
+BENCH_FIXTURES_DIR = os.environ.get("BENCH_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+
+# Responses built from the archive, by request path
+bodies = {}
+
+# Read the recorded body for a request; single-franchise rosters are cut from the league-wide export if needed
+def lookup(path):
+    if path in bodies:
+        return bodies[path]
+    content = archive.load_content(recordedHost + path) or archive.load_content(recordedApiHost + path)
+    params = parse_qs(urlsplit(path).query)
+    if content is None and params.get('TYPE') == ['rosters'] and 'FRANCHISE' in params:
+        league = archive.load_content(f"{recordedHost}/2022/export?TYPE=rosters&L={params['L'][0]}")
+        if league is not None:
+            soup = BeautifulSoup(league, 'xml')
+            for franchise in soup.find_all('franchise'):
+                if franchise.get('id') != params['FRANCHISE'][0]:
+                    franchise.decompose()
+            content = str(soup).encode("utf-8")
+    bodies[path] = content
+    return content
+
+class Handler(BaseHTTPRequestHandler):
+    latency = 0.0
+    jitter = 0.0
+
+    def do_GET(self):
+        # Simulate MFL's response time
+        delay = max(0.0, random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        time.sleep(delay)
+        content = lookup(self.path)
+        if content is None:
+            self.send_error(404, f"No recorded response for {self.path}")
+            return
+        # Answer conditional and compressed requests the way a caching web server would
+        etag = '"' + hashlib.sha256(content).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("ETag", etag)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            content = gzip.compress(content)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded MFL export responses locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.15, help="mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="standard deviation of the delay in seconds")
+    parser.add_argument("--fixtures", default=BENCH_FIXTURES_DIR, help="archive directory with the recorded responses")
+    args = parser.parse_args()
+
+    archive.ARCHIVE_DIR = args.fixtures
+    fixtures.ensure(args.fixtures)
+    Handler.latency = args.latency
+    Handler.jitter = args.jitter
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    print(f"Serving {args.fixtures} on http://127.0.0.1:{args.port} (latency {args.latency}s ± {args.jitter}s)", flush=True)
+    server.serve_forever()
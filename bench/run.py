@@ -0,0 +1,258 @@
+# Import dependencies
+# Standard python libraries
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Find environment variables
+# Directory with the recorded fixtures (generated on first run); the benchmarks never touch the network
+BENCH_FIXTURES_DIR = os.environ.get("BENCH_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+BENCH_RESULTS_DIR = os.environ.get("BENCH_RESULTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+# Everything below reads the fixtures through archive replay, and builds feature slices in a scratch directory
+os.environ["ARCHIVE_DIR"] = BENCH_FIXTURES_DIR
+os.environ["ARCHIVE_REPLAY"] = "1"
+os.environ["FEATURE_STORE_DIR"] = os.path.join(tempfile.mkdtemp(prefix="bench_features_"), "features")
+os.environ["PARSE_CACHE_DIR"] = os.path.join(tempfile.mkdtemp(prefix="bench_exports_"), "exports")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Third-party libraries
+import numpy as np
+import pandas as pd
+
+# Internal imports
+import archive
+import depth_chart
+import feature_store
+import fixtures
+import lineups
+import live_odds
+import mfl
+import roster_store
+import simulate
+from db import get_df
+from features import posRanks, score_predictions, opponent_block, game_index, model_columns
+
+# Each benchmark is (setup, run): setup builds the inputs once and is not timed, run is timed
+# Parses the bodies directly: get_mfl_players and friends skip the parse when a body is unchanged
+def bench_mfl_players():
+    def setup():
+        return [archive.get_content(f"{mfl.MFL_API_HOST}/2022/export?TYPE={requestType}") for requestType in ['players', 'playerRanks', 'adp']]
+    def run(contents):
+        return mfl.parse_players(contents[0]), mfl.parse_playerRanks(contents[1]), mfl.parse_adp(contents[2])
+    return setup, run
+
+def bench_mfl_league():
+    def run(inputs):
+        league = fixtures.LEAGUE
+        return mfl.get_mfl_league(league), mfl.get_mfl_rosters(league), mfl.get_mfl_freeAgents(league), mfl.get_mfl_liveScoring(league)
+    return None, run
+
+def bench_depth_chart():
+    def run(chartHtml):
+        return depth_chart.clean(depth_chart.unpivot(pd.read_html(io.StringIO(chartHtml))[0]))
+    return lambda: archive.get_content("https://www.ourlads.com/nfldepthcharts/depthcharts.aspx").decode("utf-8"), run
+
+def bench_roster_builder():
+    def setup():
+        league = fixtures.LEAGUE
+        return get_df("predictions"), mfl.get_mfl_league(league), mfl.get_mfl_rosters(league), mfl.get_mfl_freeAgents(league)
+    def run(inputs):
+        complete = lineups.merge_rosters(*inputs)
+        return [lineups.build_lineups(complete, col, prefix) for col, prefix in [('adpAbsolute', 'adp'), ('sharkAbsolute', 'shark'), ('pred', 'pred')]]
+    return setup, run
+
+# Seed the roster store from the rosters export, then apply the fixture transactions on top of it
+def bench_roster_transactions():
+    league = fixtures.LEAGUE
+    def run(conn):
+        roster_store.reconcile(conn, league)
+        with conn:
+            conn.execute('UPDATE roster_sync SET lastTransaction = 0 WHERE league = ?', (league,))
+        roster_store.apply_transactions(conn, league, 0)
+    def setup():
+        roster_store.ROSTER_STORE_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_rosters_"), "rosters.sqlite")
+        conn = roster_store.connect()
+        # Check once that every transaction was applied the way MFL meant it
+        run(conn)
+        rosters = {(row[0], row[1]): row[2] for row in conn.execute('SELECT franchiseID, id_mfl, status FROM rosters WHERE league = ?', (league,))}
+        freeAgents = {row[0] for row in conn.execute('SELECT id_mfl FROM free_agents WHERE league = ?', (league,))}
+        for transaction in mfl.get_mfl_transactions(league).itertuples(index=False):
+            added, dropped = roster_store.transaction_parts(transaction)
+            if transaction.type == 'TRADE':
+                ok = ((transaction.franchise2, transaction.franchise1_gave_up.strip(",")) in rosters
+                    and (transaction.franchise, transaction.franchise2_gave_up.strip(",")) in rosters)
+            elif transaction.type == 'IR':
+                ok = rosters.get((transaction.franchise, dropped.strip(","))) == 'INJURED_RESERVE'
+            else:
+                ok = ((transaction.franchise, added.strip(",")) in rosters and dropped.strip(",") in freeAgents
+                    and (transaction.franchise, dropped.strip(",")) not in rosters)
+            if not ok:
+                raise RuntimeError(f"{transaction.type} transaction was not applied: {transaction.transaction}")
+        return conn
+    return setup, run
+
+def bench_live_scoring():
+    def setup():
+        league = fixtures.LEAGUE
+        return mfl.get_mfl_liveScoring(league), mfl.get_mfl_league(league), get_df("predictions")
+    def run(inputs):
+        return lineups.live_scores(*inputs)
+    return setup, run
+
+def bench_live_odds():
+    def setup():
+        league = fixtures.LEAGUE
+        liveScores, franchises, predictions = mfl.get_mfl_liveScoring(league), mfl.get_mfl_league(league), get_df("predictions")
+        # A later poll where a tenth of the starters have moved
+        later = liveScores.copy()
+        moved = np.flatnonzero(later['status'] == 'starter')[::10]
+        later.loc[moved, 'liveScore'] = (later.loc[moved, 'liveScore'].astype(float) + 6).astype(str)
+        later.loc[moved, 'secondsRemaining'] = (later.loc[moved, 'secondsRemaining'].astype(int) // 2).astype(str)
+        return live_odds.build_state(liveScores, franchises, predictions), liveScores, later
+    def run(inputs):
+        state, liveScores, later = inputs
+        live_odds.update_state(state, later)
+        live_odds.update_state(state, liveScores)
+        return live_odds.odds_table(state)
+    return setup, run
+
+def bench_feature_build():
+    def setup():
+        return get_df("bench_player_features"), get_df("schedule")
+    def run(inputs):
+        players, schedule = inputs
+        # Start from an empty store so every slice is rebuilt
+        shutil.rmtree(feature_store.FEATURE_STORE_DIR, ignore_errors=True)
+        oppKeys, opponents = opponent_block(players, schedule)
+        for pos in posRanks:
+            xl2 = players.loc[players.pos==pos].reset_index(drop=True)
+            games = game_index(xl2, schedule, oppKeys)
+            feature_store.get_slice(pos, xl2, opponents, games, pos)
+    return setup, run
+
+def bench_model_scoring():
+    def setup():
+        from sklearn.ensemble import RandomForestRegressor
+        players, schedule = get_df("bench_player_features"), get_df("schedule")
+        oppKeys, opponents = opponent_block(players, schedule)
+        wrs = players.loc[players.pos=='WR'].reset_index(drop=True)
+        X, header, rebuilt = feature_store.get_slice('WR', wrs, opponents, game_index(wrs, schedule, oppKeys), 'WR')
+        # A stand-in for the position model with the same inputs and outputs
+        rng = np.random.default_rng(fixtures.SEED)
+        regressor = RandomForestRegressor(n_estimators=50, max_depth=12, random_state=0, n_jobs=1)
+        regressor.fit(rng.random((2000, len(model_columns('WR')))), rng.gamma(1.5, 10, (2000, 30)))
+        return regressor, np.asarray(X)
+    def run(inputs):
+        regressor, X = inputs
+        return score_predictions(regressor.predict(X), np.full(len(X), 'WR'))
+    return setup, run
+
+def bench_season_sim():
+    def setup():
+        league = fixtures.LEAGUE
+        return (get_df("predictions"), mfl.get_mfl_league(league), mfl.get_mfl_rosters(league),
+            mfl.get_mfl_freeAgents(league), mfl.get_mfl_schedule(league))
+    def run(inputs):
+        return simulate.playoff_odds(*inputs, trials=10000, seed=fixtures.SEED)
+    return setup, run
+
+benchmarks = {
+    'mfl_players': bench_mfl_players,
+    'mfl_league': bench_mfl_league,
+    'depth_chart': bench_depth_chart,
+    'roster_builder': bench_roster_builder,
+    'roster_transactions': bench_roster_transactions,
+    'live_scoring': bench_live_scoring,
+    'live_odds': bench_live_odds,
+    'feature_build': bench_feature_build,
+    'model_scoring': bench_model_scoring,
+    'season_sim': bench_season_sim,
+}
+
+def git_commit():
+    # Ask about the repo this file is in, wherever the benchmarks are run from
+    repoRoot = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=repoRoot).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, cwd=repoRoot).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+# Time one benchmark: one untimed warmup run, then `repeat` timed runs
+def measure(name, repeat):
+    setup, run = benchmarks[name]()
+    inputs = setup() if setup else None
+    run(inputs)
+    runs = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        run(inputs)
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "mean": statistics.mean(runs), "runs": runs}
+
+# Compare medians against a baseline results file; returns the names that got slower than the threshold
+def compare(results, baselinePath, threshold):
+    with open(baselinePath) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline['commit']} ({os.path.basename(baselinePath)}), threshold {threshold:.0%}")
+    print(f"{'benchmark':<18}{'baseline s':>12}{'current s':>12}{'change':>10}")
+    regressions = []
+    for name, stats in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            print(f"{name:<18}{'-':>12}{stats['median']:>12.4f}{'new':>10}")
+            continue
+        change = stats["median"] / base["median"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<18}{base['median']:>12.4f}{stats['median']:>12.4f}{change:>+10.1%}{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite against the recorded fixtures")
+    parser.add_argument("--only", nargs="+", choices=list(benchmarks), help="benchmarks to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--out", help="results file (default: results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="slowdown of the median that counts as a regression")
+    parser.add_argument("--rebuild-fixtures", action="store_true", help="regenerate the synthetic fixtures")
+    args = parser.parse_args()
+
+    fixtures.ensure(BENCH_FIXTURES_DIR, rebuild=args.rebuild_fixtures)
+
+    results = {
+        "commit": git_commit(),
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "repeat": args.repeat,
+        "benchmarks": {}
+    }
+    print(f"{'benchmark':<18}{'min s':>10}{'median s':>10}")
+    for name in args.only or list(benchmarks):
+        results["benchmarks"][name] = measure(name, args.repeat)
+        print(f"{name:<18}{results['benchmarks'][name]['min']:>10.4f}{results['benchmarks'][name]['median']:>10.4f}")
+
+    outPath = args.out or os.path.join(BENCH_RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(outPath) or ".", exist_ok=True)
+    with open(outPath, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"Saved {outPath}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,163 @@
+# Import dependencies
+# Standard python libraries
+import os
+import threading
+import time
+from collections import OrderedDict
+# Third-party libraries
+import numpy as np
+import pandas as pd
+
+# Internal imports
+import metrics
+from batch_compare import stored_lineups, valuations
+from db import get_cached_df
+from lineups import merge_rosters, build_lineups, waiver_table
+from mfl import get_mfl_league, get_mfl_schedule
+from roster_store import get_rosters, get_free_agents
+from serving import offload, gather
+from simulate import playoff_odds
+
+# Find environment variables
+# Seconds a league's comparison charts and waiver tables are served from memory
+PAGE_CACHE_SECONDS = float(os.environ.get("PAGE_CACHE_SECONDS", "300"))
+# Most pages kept in memory per worker; the least recently used go first
+PAGE_CACHE_ENTRIES = int(os.environ.get("PAGE_CACHE_ENTRIES", "256"))
+
+# Built pages by key, least recently used first: key -> (built at, value)
+pageCache = OrderedDict()
+pageCacheLock = threading.Lock()
+
+# Serve a page's data from memory while it is fresh, otherwise build it.
+# refresh=True rebuilds regardless (cache warm-up); the old entry is served until the new one replaces it.
+def cached(key, build, *args, refresh=False):
+    with pageCacheLock:
+        entry = pageCache.get(key)
+        if not refresh and entry is not None and time.time() - entry[0] < PAGE_CACHE_SECONDS:
+            pageCache.move_to_end(key)
+            metrics.cache_lookup("page", True)
+            return entry[1]
+    metrics.cache_lookup("page", False)
+    value = build(*args)
+    with pageCacheLock:
+        pageCache[key] = (time.time(), value)
+        pageCache.move_to_end(key)
+        sweep()
+    return value
+
+# Drop expired pages, then the least recently used ones beyond PAGE_CACHE_ENTRIES (called holding pageCacheLock)
+def sweep():
+    cutoff = time.time() - PAGE_CACHE_SECONDS
+    for key in [key for key, entry in pageCache.items() if entry[0] < cutoff]:
+        del pageCache[key]
+    while len(pageCache) > PAGE_CACHE_ENTRIES:
+        pageCache.popitem(last=False)
+
+# Positions in stacking order and the colours the lineup charts use for them
+posColors = {
+    "QB": "hsla(210, 60%, 25%, 1)", #blue #1033a6 #0c2987 1033a6 062647 #293745
+    "RB": "hsla(12, 50%, 45%, 1)", #gold #f5d000 ffa524 a23419 a34e39
+    "WR": "hsla(267, 40%, 45%, 1)", #purple #4f22bc #643fc1 643fc1 621B74 675280
+    "TE": "hsla(177, 68%, 36%, 1)", #teal #02687b #038097 1295ad 43B3AE
+    "PK": "hsla(14, 30%, 40%, 1)", #gold #f5d000 ffa524 664e47
+    "DF": "hsla(35, 70%, 65%, 1)"} #gold #f5d000 ffa524 a49375 ffb54d
+
+chartTitles = {"pred": "ChopBlock Predictions", "shark": "FantasySharks Predictions", "adp": "ADP-Based Predictions"}
+
+# float32 precision, then one decimal, so the JSON numbers stay short
+def compact_values(series):
+    return np.round(np.nan_to_num(series.to_numpy(dtype=np.float32)).astype(np.float64), 1).tolist()
+
+# Every valuation's lineups as compact columns for compareFranchises2.html, which draws the charts in the browser.
+# Each player on the field appears once, with positions and franchises as codes into small lists; each chart
+# lists only its rows into the players and their value over the positional low bar.
+def lineup_data(lineups):
+    cols = ['FranchiseID', 'FranchiseName', 'id_mfl', 'player', 'pos', 'pred', 'sharkAbsolute', 'adpAbsolute']
+    players = pd.concat([frame[cols] for frame in lineups.values()], ignore_index=True)
+    players['FranchiseName'] = players['FranchiseName'].astype(str)
+    players = players.drop_duplicates(subset=['FranchiseID', 'id_mfl'], ignore_index=True)
+    playerKeys = pd.Index(players['FranchiseID'] + "|" + players['id_mfl'].astype(str))
+    franchiseCodes, franchises = pd.factorize(players['FranchiseName'])
+    data = {
+        'franchises': franchises.tolist(),
+        'positions': list(posColors),
+        'colors': list(posColors.values()),
+        'players': {
+            'name': players['player'].tolist(),
+            'pos': pd.Categorical(players['pos'], categories=list(posColors)).codes.tolist(),
+            'franchise': franchiseCodes.tolist(),
+            'pred': compact_values(players['pred']),
+            'shark': compact_values(players['sharkAbsolute']),
+            'adp': compact_values(players['adpAbsolute']),
+        },
+        'charts': [],
+    }
+    for prefix in chartTitles:
+        frame = lineups[prefix]
+        rows = playerKeys.get_indexer(frame['FranchiseID'] + "|" + frame['id_mfl'].astype(str))
+        data['charts'].append({'key': prefix, 'title': chartTitles[prefix], 'row': rows.tolist(), 'value': compact_values(frame[f'{prefix}Relative'])})
+    return data
+
+# Each valuation's players on the field for a league: {prefix: lineup frame}
+def build_league_lineups(user_league):
+    # Serve the lineups stored by batch_compare.py when they are fresh
+    metrics.phase("get_df")
+    stored = offload(stored_lineups, user_league)
+    if stored is not None:
+        return stored
+
+    # Get Franchises, rosters and free agents in the league
+    metrics.phase("mfl_fetch")
+    franchises, rosters, freeAgents = gather(
+        (get_mfl_league, user_league), (get_rosters, user_league), (get_free_agents, user_league))
+    # Get all players, sharkRank, and ADP
+    metrics.phase("get_df")
+    predictions = offload(get_cached_df, "predictions")
+    metrics.phase("pandas")
+    complete = offload(merge_rosters, predictions, franchises, rosters, freeAgents)
+    # Roster Builder logic
+    return {prefix: offload(build_lineups, complete, valueCol, prefix) for prefix, valueCol in valuations.items()}
+
+# The compareFranchises2 chart data for a league (see lineup_data)
+def build_lineup_data(user_league):
+    lineups = build_league_lineups(user_league)
+    metrics.phase("pandas")
+    return offload(lineup_data, lineups)
+
+# The waiverWire table for one franchise: (table html, column titles)
+def build_waiver_page(user_league, user_franchise):
+    # Get Franchises, the user's roster and free agents in the league
+    metrics.phase("mfl_fetch")
+    franchises, rosters, freeAgents = gather(
+        (get_mfl_league, user_league), (get_rosters, user_league, user_franchise), (get_free_agents, user_league))
+    # Get all players, sharkRank, and ADP
+    metrics.phase("get_df")
+    predictions = offload(get_cached_df, "predictions")
+    # Merge all dfs, keeping only the user's players and free agents
+    metrics.phase("pandas")
+    complete = offload(waiver_table, predictions, franchises, rosters, freeAgents)
+    table = offload(complete.to_html, classes='data')
+    return table, complete.columns.values
+
+# The playoffOdds table for a league: (table html, column titles)
+def build_playoff_page(user_league, seed):
+    # Get Franchises, rosters, free agents and the head-to-head schedule
+    metrics.phase("mfl_fetch")
+    franchises, rosters, freeAgents, schedule = gather(
+        (get_mfl_league, user_league), (get_rosters, user_league), (get_free_agents, user_league), (get_mfl_schedule, user_league))
+    metrics.phase("get_df")
+    predictions = offload(get_cached_df, "predictions")
+    # Simulate the season
+    metrics.phase("simulate")
+    odds = offload(playoff_odds, predictions, franchises, rosters, freeAgents, schedule, seed=seed)
+    table = offload(odds.to_html, classes='data')
+    return table, odds.columns.values
+
+def lineup_chart_data(user_league, refresh=False):
+    return cached(('compareFranchises2', user_league), build_lineup_data, user_league, refresh=refresh)
+
+def waiver_page(user_league, user_franchise, refresh=False):
+    return cached(('waiverWire', user_league, user_franchise), build_waiver_page, user_league, user_franchise, refresh=refresh)
+
+def playoff_page(user_league, seed=None, refresh=False):
+    return cached(('playoffOdds', user_league, seed), build_playoff_page, user_league, seed, refresh=refresh)
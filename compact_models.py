@@ -0,0 +1,170 @@
+# Import dependencies
+# Standard python libraries
+import argparse
+import json
+import os
+import shutil
+import time
+# Third-party libraries
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+# Internal imports
+from features import labels, posRanks, model_matrix, score_predictions
+from train import TRAIN_SEED, MODELS_DIR, model_path, split, training_path
+
+# Builds smaller variants of the position models and reports disk size, load time, inference time and
+# validation error for each against the current models, so a production setting can be picked:
+#   compressed  the current forest in a compressed joblib file
+#   limited     a forest retrained with fewer trees and depth/leaf limits
+#   packed      the current forest as flat float32 arrays (PackedForest), predicted with NumPy
+#   packed_limited  the limited forest, packed
+#   distilled   one multi-output decision tree fitted to the current forest's predictions
+# Variants go to models/compact/<variant>/; --apply <variant> copies one over the files the scheduler loads.
+# python compact_models.py --trees 40 --max-depth 16 --min-samples-leaf 5
+
+# Find environment variables
+COMPACT_DIR = os.environ.get("COMPACT_DIR", os.path.join(MODELS_DIR, "compact"))
+
+variants = ['baseline', 'compressed', 'limited', 'packed', 'packed_limited', 'distilled']
+
+# A fitted forest flattened into arrays: every tree's nodes end to end, float32 thresholds and leaf values.
+# Leaves point to themselves, so every row walks the same number of steps and the walk is vectorized.
+class PackedForest:
+    def __init__(self, forest):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.roots = offsets.astype(np.int32)
+        self.feature = np.concatenate([np.maximum(tree.feature, 0) for tree in trees]).astype(np.int16)
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        # Round down so float32 inputs split exactly as they did against the float64 thresholds
+        threshold32 = threshold.astype(np.float32)
+        tooHigh = threshold32.astype(np.float64) > threshold
+        threshold32[tooHigh] = np.nextafter(threshold32[tooHigh], np.float32(-np.inf))
+        self.threshold = threshold32
+        nodes = np.arange(sizes.sum(), dtype=np.int32)
+        left = np.concatenate([np.where(tree.children_left >= 0, tree.children_left + offset, -1) for tree, offset in zip(trees, offsets)])
+        right = np.concatenate([np.where(tree.children_right >= 0, tree.children_right + offset, -1) for tree, offset in zip(trees, offsets)])
+        self.left = np.where(left >= 0, left, nodes).astype(np.int32)
+        self.right = np.where(right >= 0, right, nodes).astype(np.int32)
+        self.value = np.concatenate([tree.value[:, :, 0] for tree in trees]).astype(np.float32)
+        self.depth = max(tree.max_depth for tree in trees)
+
+    def predict(self, X, batchRows=512):
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty((len(X), self.value.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), batchRows):
+            batch = X[start:start + batchRows]
+            rows = np.arange(len(batch))[:, None]
+            nodes = np.broadcast_to(self.roots, (len(batch), len(self.roots))).copy()
+            for step in range(self.depth):
+                goLeft = batch[rows, self.feature[nodes]] <= self.threshold[nodes]
+                nodes = np.where(goLeft, self.left[nodes], self.right[nodes])
+            out[start:start + batchRows] = self.value[nodes].mean(axis=1)
+        return out
+
+def variant_path(variant, pos):
+    return os.path.join(COMPACT_DIR, variant, os.path.basename(model_path(pos)))
+
+def save(model, path, compress=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    dump(model, path + ".tmp", compress=compress)
+    os.replace(path + ".tmp", path)
+
+# Build every variant for one position from its current model and training table
+def build_variants(pos, params, distillDepth, nJobs, seed):
+    df = pd.read_parquet(training_path(pos))
+    df = df.loc[df['posRank'].isin(posRanks.get(pos))].reset_index(drop=True)
+    train, validation = split(df, seed)
+    X_train = model_matrix(train, pos)
+
+    baseline = load(model_path(pos))
+    save(baseline, variant_path('baseline', pos))
+    save(baseline, variant_path('compressed', pos), compress=3)
+    limited = RandomForestRegressor(random_state=seed, n_jobs=nJobs, **params)
+    limited.fit(X_train, train[labels].to_numpy(dtype='float32'))
+    save(limited, variant_path('limited', pos))
+    save(PackedForest(baseline), variant_path('packed', pos))
+    save(PackedForest(limited), variant_path('packed_limited', pos))
+    # The student learns the forest's outputs, not the raw stat lines
+    distilled = DecisionTreeRegressor(max_depth=distillDepth, min_samples_leaf=params.get('min_samples_leaf') or 1, random_state=seed)
+    distilled.fit(X_train, baseline.predict(X_train))
+    save(distilled, variant_path('distilled', pos))
+    return validation
+
+# Disk size, load time, inference time and validation points error of one variant
+def measure(variant, pos, validation, repeat):
+    path = variant_path(variant, pos)
+    loadSeconds = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        model = load(path)
+        loadSeconds.append(time.perf_counter() - start)
+    X = model_matrix(validation, pos)
+    predictSeconds = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        y_pred = model.predict(X)
+        predictSeconds.append(time.perf_counter() - start)
+    posArray = np.full(len(validation), pos)
+    points = score_predictions(y_pred, posArray)
+    actual = score_predictions(validation[labels].to_numpy(dtype='float64'), posArray)
+    return {
+        'pos': pos,
+        'variant': variant,
+        'bytes': os.path.getsize(path),
+        'loadSeconds': float(np.median(loadSeconds)),
+        'predictSeconds': float(np.median(predictSeconds)),
+        'rows': len(validation),
+        'pointsMAE': float(np.abs(points - actual).mean()),
+    }
+
+def report(positions, params, distillDepth, nJobs, seed, repeat):
+    results = []
+    for pos in positions:
+        validation = build_variants(pos, params, distillDepth, nJobs, seed)
+        results += [measure(variant, pos, validation, repeat) for variant in variants]
+    results = pd.DataFrame(results)
+    # Relative to the current model of the same position
+    baseline = results.loc[results.variant == 'baseline'].set_index('pos')
+    results['sizeRatio'] = results['bytes'] / results['pos'].map(baseline['bytes'])
+    results['loadSpeedup'] = results['pos'].map(baseline['loadSeconds']) / results['loadSeconds']
+    results['predictSpeedup'] = results['pos'].map(baseline['predictSeconds']) / results['predictSeconds']
+    results['maeChange'] = results['pointsMAE'] - results['pos'].map(baseline['pointsMAE'])
+    return results
+
+def apply_variant(variant, positions):
+    for pos in positions:
+        shutil.copyfile(variant_path(variant, pos), model_path(pos) + ".tmp")
+        os.replace(model_path(pos) + ".tmp", model_path(pos))
+        print(f"{pos}: {variant} -> {model_path(pos)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build compact variants of the position models and compare them")
+    parser.add_argument("--positions", nargs="+", default=list(posRanks), choices=list(posRanks))
+    parser.add_argument("--trees", type=int, default=40, help="trees in the limited forest")
+    parser.add_argument("--max-depth", type=int, default=16)
+    parser.add_argument("--min-samples-leaf", type=int, default=5)
+    parser.add_argument("--distill-depth", type=int, default=14)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="n_jobs for the limited forest")
+    parser.add_argument("--seed", type=int, default=TRAIN_SEED)
+    parser.add_argument("--repeat", type=int, default=3, help="timed loads and predictions per variant")
+    parser.add_argument("--apply", choices=variants[1:], help="install an already built variant as the production models")
+    args = parser.parse_args()
+
+    # Pickle PackedForest as compact_models.PackedForest, not __main__.PackedForest, so the scheduler can load it
+    import compact_models
+    if args.apply:
+        compact_models.apply_variant(args.apply, args.positions)
+    else:
+        params = {'n_estimators': args.trees, 'max_depth': args.max_depth, 'min_samples_leaf': args.min_samples_leaf}
+        results = compact_models.report(args.positions, params, args.distill_depth, args.jobs, args.seed, args.repeat)
+        pd.set_option('display.width', 160)
+        print(results[['pos', 'variant', 'bytes', 'sizeRatio', 'loadSeconds', 'loadSpeedup', 'predictSeconds', 'predictSpeedup', 'pointsMAE', 'maeChange']].round(4).to_string(index=False))
+        os.makedirs(COMPACT_DIR, exist_ok=True)
+        with open(os.path.join(COMPACT_DIR, "report.json"), "w") as f:
+            json.dump({'params': params, 'distillDepth': args.distill_depth, 'seed': args.seed, 'results': results.to_dict(orient='records')}, f, indent=1)
@@ -1,28 +1,84 @@
 # Import dependencies
+import io
 import os
+import time
 import pandas as pd
-import psycopg2
-from psycopg2 import OperationalError, errorcodes, errors
+from sqlalchemy import create_engine
+
+# Internal imports
+import archive
+import metrics
 
 # Find environment variables
 DATABASE_URL = os.environ.get("DATABASE_URL", None)
 # sqlalchemy deprecated urls which begin with "postgres://"; now it needs to start with "postgresql://"
-if DATABASE_URL.startswith("postgres://"):
+if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+# Seconds the web app keeps a table in memory before reading it again
+TABLE_CACHE_SECONDS = float(os.environ.get("TABLE_CACHE_SECONDS", "300"))
+
+# One engine (and connection pool) per process; Postgres requires ssl, a local sqlite file (e.g. for load tests) does not
+engine = None
+def get_engine():
+    global engine
+    if engine is None:
+        connectArgs = {} if DATABASE_URL.startswith("sqlite") else {"sslmode": "require"}
+        engine = create_engine(DATABASE_URL, connect_args=connectArgs)
+    return engine
 
 # query the database, return a dataframe
+# Archived tables are stored as parquet bytes
+def frame_bytes(df):
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+def read_frame(content):
+    return pd.read_parquet(io.BytesIO(content))
+
 def get_df(df):
-    connection = False
+    # Table reads are archived alongside the raw http responses so replay mode needs no database
+    archiveKey = f"db:{df}"
+    if archive.ARCHIVE_REPLAY:
+        content = archive.load_content(archiveKey, archive.ARCHIVE_REPLAY_AT)
+        if content is None:
+            raise LookupError(f"No archived table for {df}")
+        return read_frame(content)
     try:
-        conn = psycopg2.connect(DATABASE_URL, sslmode='require')
-        cursor = conn.cursor()
         query = f'SELECT * FROM {df}'
-        cursor.execute(query)
-        result = pd.read_sql(query, conn)
+        result = pd.read_sql(query, get_engine())
+        if archive.ARCHIVE_RECORD:
+            archive.save_content(archiveKey, frame_bytes(result))
         return result
-    except (Exception, Error) as error:
+    except Exception as error:
         print(error)
-    finally:
-        if connection:
-            cursor.close()
-            connection.close()
+
+# Tables the web app reads on every request, kept in memory: name -> (loaded at, df)
+tableCache = {}
+
+# get_df for the web app: serve a table from memory for TABLE_CACHE_SECONDS.
+# The frame is shared between requests, so callers must not modify it in place.
+def get_cached_df(df):
+    entry = tableCache.get(df)
+    if entry is not None and time.time() - entry[0] < TABLE_CACHE_SECONDS:
+        metrics.cache_lookup("table", True)
+        return entry[1]
+    metrics.cache_lookup("table", False)
+    # Read the version first, so a publish during the load makes the copy look older rather than newer
+    published = get_predictions_version() if df == "predictions" else None
+    result = get_df(df)
+    if result is not None:
+        tableCache[df] = (time.time(), result)
+        # The table's age is measured from when the scheduler published it, when that is known
+        metrics.table_published(df, pd.Timestamp(published).tz_localize('UTC').timestamp() if pd.notna(published) else tableCache[df][0])
+    return result
+
+# When the scheduler last published predictions (see the publish stage), or None if it is unknown.
+# Polled by every worker, so a missing table (nothing published yet) is not reported.
+def get_predictions_version():
+    if archive.ARCHIVE_REPLAY or not DATABASE_URL:
+        return None
+    try:
+        return pd.read_sql('SELECT MAX(published) AS published FROM predictions_version', get_engine())['published'][0]
+    except Exception:
+        return None
@@ -0,0 +1,86 @@
+# Import dependencies
+# Standard python libraries
+import os
+# Third-party libraries
+import numpy as np
+import pandas as pd
+
+# Find environment variables
+# The previous run's cleaned depth chart, kept to work out what moved
+DEPTH_CHART_FILE = os.environ.get("DEPTH_CHART_FILE", os.path.join("data", "depth_chart.parquet"))
+
+# Select only relevant positions
+posList = ['LWR', 'RWR', 'SWR', 'TE', 'QB', 'RB', 'PK', 'PR', 'KR', 'RES']
+# Deepest posRank the models know about; deeper players are treated as the 3rd string
+maxRank = 3
+
+# Rename team abbreviations from ourlads to MFL
+teamDict = {
+    'ARZ':'ARI', 'ATL':'ATL', 'BAL':'BAL', 'BUF':'BUF', 'CAR':'CAR', 'CHI':'CHI', 'CIN':'CIN', 'CLE':'CLE',
+    'DAL':'DAL', 'DEN':'DEN', 'DET':'DET', 'GB':'GBP', 'HOU':'HOU', 'IND':'IND', 'JAX':'JAC', 'KC':'KCC',
+    'LAC':'LAC', 'LAR':'LAR', 'LV':'LVR', 'MIA':'MIA', 'MIN':'MIN', 'NE':'NEP', 'NO':'NOS', 'NYG':'NYG',
+    'NYJ':'NYJ', 'PHI':'PHI', 'PIT':'PIT', 'SEA':'SEA', 'SF':'SFO', 'TB':'TBB', 'TEN':'TEN', 'WAS':'WAS'
+    }
+
+# Columns that identify a depth chart slot and who is in it
+slotColumns = ['team', 'pos_ol', 'posRank', 'player', 'KR', 'PR']
+
+# Turn the ourlads table (one row per team/position, one column per depth) into one row per player
+def unpivot(scrape2):
+    chart = scrape2.melt(
+        id_vars=['Team', 'Pos'],
+        value_vars=['Player 1', 'Player 2', 'Player 3', 'Player 4', 'Player 5'],
+        var_name='rank',
+        value_name='Player')
+    chart['rank'] = chart['rank'].str[-1].astype('int8')
+    chart = chart.loc[chart['Pos'].isin(posList)].dropna(subset=['Player'])
+    # Convert WR roles to "WR"
+    chart['Pos'] = chart['Pos'].replace(["LWR", "RWR", "SWR"], "WR")
+    # melt keeps every depth-1 row ahead of every depth-2 row, so this keeps each player's best rank
+    chart = chart.drop_duplicates(subset=['Player', 'Team', 'Pos'])
+    chart.reset_index(inplace=True, drop=True)
+    return chart
+
+# Clean the unpivoted chart into the columns the scheduler merges: player, team, pos_ol, posRank, KR, PR
+def clean(chart):
+    # Create columns for KRs and PRs
+    players = chart.loc[~chart['Pos'].isin(['KR', 'PR'])].copy()
+    playerKeys = pd.MultiIndex.from_frame(players[['Team', 'Player']])
+    for role in ['KR', 'PR']:
+        returners = chart.loc[chart['Pos']==role].set_index(['Team', 'Player'])['rank']
+        ranks = returners.reindex(playerKeys).to_numpy(dtype='float64')
+        missing = np.isnan(ranks)
+        players[role] = np.where(missing, "NO", np.char.add(role, np.where(missing, 0, ranks).astype(int).astype(str)))
+    # Reserves are flagged as RES; everyone else is capped at the deepest rank the models know
+    players['posRank'] = np.where(
+        players['Pos']=='RES',
+        "RES",
+        players['Pos'] + players['rank'].clip(upper=maxRank).astype(str))
+    # Clean name column ("Last, First" to "First Last"); the player index handles case and punctuation
+    names = players['Player'].str.split(" ", n=2, expand=True)
+    players['Player'] = names[1] + " " + names[0].str.replace(",", "")
+    players['Team'] = players['Team'].map(teamDict)
+    players = players[['Player', 'Team', 'Pos', 'posRank', 'KR', 'PR']]
+    players.columns = ['player', 'team', 'pos_ol', 'posRank', 'KR', 'PR']
+    players.reset_index(inplace=True, drop=True)
+    return players
+
+# Rows that are in one chart but not the other, marked 'added' (new chart) or 'removed' (old chart)
+def diff(previous, current):
+    merged = previous[slotColumns].merge(current[slotColumns], how='outer', on=slotColumns, indicator=True)
+    changed = merged.loc[merged['_merge']!='both'].copy()
+    changed['change'] = np.where(changed['_merge']=='right_only', 'added', 'removed')
+    return changed.drop(columns=['_merge']).reset_index(drop=True)
+
+# Clean this run's chart, compare it to the last one and store it; returns (chart, changed slots)
+def ingest(scrape2):
+    current = clean(unpivot(scrape2))
+    if os.path.exists(DEPTH_CHART_FILE):
+        previous = pd.read_parquet(DEPTH_CHART_FILE)
+    else:
+        previous = pd.DataFrame(columns=slotColumns)
+    changed = diff(previous, current)
+    os.makedirs(os.path.dirname(DEPTH_CHART_FILE) or ".", exist_ok=True)
+    current.to_parquet(DEPTH_CHART_FILE + ".tmp", index=False)
+    os.replace(DEPTH_CHART_FILE + ".tmp", DEPTH_CHART_FILE)
+    return current, changed
@@ -0,0 +1,140 @@
+# Import dependencies
+# Standard python libraries
+import hashlib
+import json
+import os
+from datetime import datetime
+# Third-party libraries
+import numpy as np
+import pandas as pd
+
+# Internal imports
+from features import gather, model_columns, static_matrix
+
+# Find environment variables
+FEATURE_STORE_DIR = os.environ.get("FEATURE_STORE_DIR", os.path.join("data", "features"))
+# Rows of the model matrix assembled per batch when a slice is (re)built
+BATCH_ROWS = int(os.environ.get("FEATURE_BATCH_ROWS", "4096"))
+
+# The store is laid out as:
+#   columns.json          the column dictionary: for each slice its columns, row count and inputs hash
+#   <slice>.npy           the slice's model matrix as one contiguous float32 array
+#   <slice>_header.parquet one row per matrix row: playerRow, week, opponent, oppRow, any columns the caller
+#                         added (the scheduler adds id_mfl) and the row's input hash
+# Matrices are read back with mmap_mode='r', so inference and experiments read them without copying.
+# A slice is built from three small pieces instead of a player x schedule frame: a static block (one row
+# per player), an opponent block (one row per defense-week) and a game index pointing into both.
+
+def _columns_path():
+    return os.path.join(FEATURE_STORE_DIR, "columns.json")
+
+def _matrix_path(name):
+    return os.path.join(FEATURE_STORE_DIR, f"{name}.npy")
+
+def _header_path(name):
+    return os.path.join(FEATURE_STORE_DIR, f"{name}_header.parquet")
+
+# Read the column dictionary
+def read_columns():
+    if not os.path.exists(_columns_path()):
+        return {}
+    with open(_columns_path()) as f:
+        return json.load(f)
+
+def _write_columns(columns):
+    tmpPath = _columns_path() + ".tmp"
+    with open(tmpPath, "w") as f:
+        json.dump(columns, f, indent=1)
+    os.replace(tmpPath, _columns_path())
+
+# Fingerprint the blocks a slice is built from
+def inputs_hash(static, opponents, games):
+    digest = hashlib.sha256(np.ascontiguousarray(static).tobytes())
+    digest.update(np.ascontiguousarray(opponents).tobytes())
+    digest.update(games[['playerRow', 'week', 'oppRow']].to_numpy().tobytes())
+    return digest.hexdigest()
+
+# One hash per matrix row, so single player-weeks can be matched between runs
+def row_hashes(static, opponents, games):
+    staticHash = pd.util.hash_pandas_object(pd.DataFrame(static), index=False).to_numpy()
+    oppHash = pd.util.hash_pandas_object(pd.DataFrame(opponents), index=False).to_numpy()
+    return pd.util.hash_pandas_object(pd.DataFrame({
+        'static': staticHash[games['playerRow'].to_numpy()],
+        'opponent': oppHash[games['oppRow'].to_numpy()],
+        'week': games['week'].to_numpy()
+    }), index=False).to_numpy()
+
+# Save one slice of the feature matrix and record it in the column dictionary.
+# The matrix is written batch by batch into the memory-mapped file, so the full matrix is never held in memory.
+def write_slice(name, static, opponents, games, columns, inputsHash):
+    os.makedirs(FEATURE_STORE_DIR, exist_ok=True)
+    # Write to temp files first so a crash never leaves a slice that disagrees with columns.json
+    X = np.lib.format.open_memmap(_matrix_path(name) + ".tmp", mode='w+', dtype='float32', shape=(len(games), len(columns)))
+    for start in range(0, len(games), BATCH_ROWS):
+        stop = min(start + BATCH_ROWS, len(games))
+        X[start:stop] = gather(static, opponents, games, start, stop)
+    X.flush()
+    del X
+    os.replace(_matrix_path(name) + ".tmp", _matrix_path(name))
+    headerDf = games.assign(hash=row_hashes(static, opponents, games)).reset_index(drop=True)
+    headerDf.to_parquet(_header_path(name) + ".tmp", index=False)
+    os.replace(_header_path(name) + ".tmp", _header_path(name))
+    dictionary = read_columns()
+    dictionary[name] = {
+        "columns": list(columns),
+        "rows": int(len(games)),
+        "dtype": "float32",
+        "inputs": inputsHash,
+        "header": list(games.columns),
+        "built": datetime.utcnow().isoformat(timespec="seconds")
+    }
+    _write_columns(dictionary)
+
+# Memory-map one slice of the feature matrix; returns (X, header, columns)
+def read_slice(name):
+    entry = read_columns().get(name)
+    if entry is None:
+        raise KeyError(f"No feature slice named {name}")
+    X = np.load(_matrix_path(name), mmap_mode='r')
+    headerDf = pd.read_parquet(_header_path(name))
+    return X, headerDf, entry["columns"]
+
+# Return a position's model matrix, rebuilding it only when its inputs changed; returns (X, header, rebuilt)
+def get_slice(name, players, opponents, games, pos):
+    static = static_matrix(players, pos)
+    inputsHash = inputs_hash(static, opponents, games)
+    entry = read_columns().get(name)
+    rebuilt = False
+    # Also rebuild when the header carries different columns than the stored one (e.g. after adding id_mfl)
+    if entry is None or entry["inputs"] != inputsHash or entry.get("header") != list(games.columns) or not os.path.exists(_matrix_path(name)):
+        write_slice(name, static, opponents, games, model_columns(pos), inputsHash)
+        rebuilt = True
+    X, headerDf, columns = read_slice(name)
+    return X, headerDf, rebuilt
+
+def _points_path(name):
+    return os.path.join(FEATURE_STORE_DIR, f"{name}_points.npz")
+
+# Identify the model a set of cached points came from
+def model_signature(modelPath):
+    stat = os.stat(modelPath)
+    return f"{stat.st_size}-{int(stat.st_mtime)}"
+
+# Points from the last run for rows whose input hash (and model) are unchanged; NaN for rows that need predicting
+def cached_points(name, rowHashes, modelPath):
+    points = np.full(len(rowHashes), np.nan)
+    if not os.path.exists(_points_path(name)):
+        return points
+    cached = np.load(_points_path(name))
+    if str(cached["model"]) != model_signature(modelPath):
+        return points
+    previous = pd.Series(cached["points"], index=cached["rows"])
+    previous = previous[~previous.index.duplicated()]
+    return previous.reindex(rowHashes).to_numpy()
+
+# Remember this run's points for each input row
+def save_points(name, rowHashes, points, modelPath):
+    os.makedirs(FEATURE_STORE_DIR, exist_ok=True)
+    with open(_points_path(name) + ".tmp", "wb") as f:
+        np.savez(f, rows=np.asarray(rowHashes), points=np.asarray(points, dtype='float64'), model=model_signature(modelPath))
+    os.replace(_points_path(name) + ".tmp", _points_path(name))
@@ -0,0 +1,161 @@
+# Import dependencies
+import numpy as np
+import pandas as pd
+
+# Stat lines predicted by the position models
+labels = [
+    'passA', 'passC', 'passY', 'passT', 'passI', 'pass2',
+    'rushA', 'rushY', 'rushT', 'rush2',
+    'recC', 'recY', 'recT', 'rec2', 'fum',
+    'XPA', 'XPM', 'FGA', 'FGM', 'FG50',
+    'defSack', 'defI', 'defSaf', 'defFum', 'defBlk', 'defT',
+    'defPtsAgainst', 'defPassYAgainst', 'defRushYAgainst', 'defYdsAgainst'
+]
+
+# Numeric model inputs, in the order the models were trained on
+features = [
+    'week', 'age',
+    'passA_curr', 'passC_curr', 'passY_curr', 'passT_curr', 'passI_curr', 'pass2_curr',
+    'rushA_curr', 'rushY_curr', 'rushT_curr', 'rush2_curr',
+    'recC_curr', 'recY_curr', 'recT_curr', 'rec2_curr', 'fum_curr',
+    'XPA_curr', 'XPM_curr', 'FGA_curr', 'FGM_curr', 'FG50_curr',
+    'defSack_curr', 'defI_curr', 'defSaf_curr', 'defFum_curr', 'defBlk_curr', 'defT_curr',
+    'defPtsAgainst_curr', 'defPassYAgainst_curr', 'defRushYAgainst_curr', 'defYdsAgainst_curr',
+    'gamesPlayed_curr',
+    'gamesPlayed_prior1',
+    'passA_prior1', 'passC_prior1', 'passY_prior1', 'passT_prior1', 'passI_prior1', 'pass2_prior1',
+    'rushA_prior1', 'rushY_prior1', 'rushT_prior1', 'rush2_prior1',
+    'recC_prior1', 'recY_prior1', 'recT_prior1', 'rec2_prior1', 'fum_prior1',
+    'XPA_prior1', 'XPM_prior1', 'FGA_prior1', 'FGM_prior1', 'FG50_prior1',
+    'defSack_prior1', 'defI_prior1', 'defSaf_prior1', 'defFum_prior1', 'defBlk_prior1', 'defT_prior1',
+    'defPtsAgainst_prior1', 'defPassYAgainst_prior1', 'defRushYAgainst_prior1', 'defYdsAgainst_prior1',
+    'gamesPlayed_prior2',
+    'passA_prior2', 'passC_prior2', 'passY_prior2', 'passT_prior2', 'passI_prior2', 'pass2_prior2',
+    'rushA_prior2', 'rushY_prior2', 'rushT_prior2', 'rush2_prior2',
+    'recC_prior2', 'recY_prior2', 'recT_prior2', 'rec2_prior2', 'fum_prior2',
+    'XPA_prior2', 'XPM_prior2', 'FGA_prior2', 'FGM_prior2', 'FG50_prior2',
+    'defSack_prior2', 'defI_prior2', 'defSaf_prior2', 'defFum_prior2', 'defBlk_prior2', 'defT_prior2',
+    'defPtsAgainst_prior2', 'defPassYAgainst_prior2', 'defRushYAgainst_prior2', 'defYdsAgainst_prior2',
+    'defSack_curr_opp', 'defI_curr_opp', 'defSaf_curr_opp', 'defFum_curr_opp', 'defBlk_curr_opp', 'defT_curr_opp',
+    'defPtsAgainst_curr_opp', 'defPassYAgainst_curr_opp', 'defRushYAgainst_curr_opp', 'defYdsAgainst_curr_opp',
+    'defSack_prior1_opp', 'defI_prior1_opp', 'defSaf_prior1_opp', 'defFum_prior1_opp', 'defBlk_prior1_opp', 'defT_prior1_opp',
+    'defPtsAgainst_prior1_opp', 'defPassYAgainst_prior1_opp', 'defRushYAgainst_prior1_opp', 'defYdsAgainst_prior1_opp'
+]
+
+# Identifying columns carried alongside each model row
+header = [
+    'id_mfl', 'season', 'week', 'team', 'player', 'age', 'sharkRank', 'adp',
+    'KR', 'PR', 'RES', 'pos', 'posRank', 'opponent'
+]
+
+# posRanks each position model was trained on
+posRanks = {
+    'WR': ['WR1', 'WR2', 'WR3'],
+    'RB': ['RB1', 'RB2', 'RB3'],
+    'QB': ['QB1', 'QB2', 'QB3'],
+    'TE': ['TE1', 'TE2', 'TE3'],
+    'PK': ['PK1', 'PK2', 'PK3'],
+    'DF': ['DF1']
+}
+
+# Full model input layout for a position: numeric features, then the one-hot pos/posRank columns
+def model_columns(pos):
+    return features + [f'pos_{pos}'] + [f'posRank_{rank}' for rank in posRanks.get(pos)]
+
+# Build the float32 model matrix for one position's rows
+def model_matrix(df, pos):
+    X = np.empty((len(df), len(features) + 1 + len(posRanks.get(pos))), dtype='float32')
+    X[:, :len(features)] = df[features].to_numpy(dtype='float32')
+    X[:, len(features)] = 1
+    for i, rank in enumerate(posRanks.get(pos)):
+        X[:, len(features) + 1 + i] = (df['posRank'] == rank).to_numpy()
+    return X
+
+# Calculate FANTASY scores
+# Define scoring multiplier based on league settings
+multiplier = [
+    0,0,.04,4,-2,2,.1,.1,6,2,.25,.1,6,2,-2,0,1,0,3,5,1,2,2,2,1.5,6,0,0,0,0,1,1
+]
+# Define bins for defensive PointsAgainst and YardsAgainst based on MFL scoring categories
+binList_defPts = [-5,0,6,13,17,21,27,34,45,59,99]
+binList_defYds = [0,274,324,375,425,999]
+# Define correlating scores for defensive PointsAgainst and YardsAgainst based on league settings
+ptList_defPts = [10,8,7,5,3,2,0,-1,-3,-5]
+ptList_defYds = [5,2,0,-2,-5]
+
+# Convert model output (one row per player-week, one column per label) to fantasy points
+def score_predictions(y_pred, pos):
+    y_pred = pd.DataFrame(np.asarray(y_pred), columns=labels)
+    # Bin and cut the defensive predictions
+    defPtsBin = pd.cut(y_pred['defPtsAgainst'], bins=binList_defPts, include_lowest=True, labels=ptList_defPts).astype('float64')
+    defYdsBin = pd.cut(y_pred['defYdsAgainst'], bins=binList_defYds, include_lowest=True, labels=ptList_defYds).astype('float64')
+    # Assign value of zero to all non-defensive players' bins (and to predictions outside the bins)
+    isDef = np.asarray(pos) == 'DF'
+    defPtsBin = np.where(isDef, defPtsBin.fillna(0), 0)
+    defYdsBin = np.where(isDef, defYdsBin.fillna(0), 0)
+    # Apply scoring multiplier to predictions
+    points = y_pred.to_numpy() @ np.asarray(multiplier[:len(labels)], dtype='float64')
+    points += defPtsBin * multiplier[len(labels)] + defYdsBin * multiplier[len(labels) + 1]
+    return points
+
+# Columns that only ever hold a handful of distinct strings
+categoricals = ['team', 'pos', 'pos_mfl', 'posRank', 'KR', 'PR', 'RES', 'opponent']
+
+# Shrink a frame in place: categoricals for the repeated strings, float32 for stats, int16 for small integers
+def compact_frame(df):
+    for col in df.columns:
+        if col in categoricals:
+            df[col] = df[col].astype('category')
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype('float32')
+        elif pd.api.types.is_integer_dtype(df[col]) and df[col].abs().max() < 2**15:
+            df[col] = df[col].astype('int16')
+    return df
+
+# Opponent-defense features, and the defense's own columns they are read from
+oppFeatures = [f for f in features if f.endswith('_opp')]
+oppSources = [f[:-len('_opp')] for f in oppFeatures]
+# Features that only depend on the player (everything but the week and the opponent block)
+staticFeatures = [f for f in features if f != 'week' and f not in oppFeatures]
+
+# One row per player: static features followed by the one-hot pos/posRank columns
+def static_matrix(players, pos):
+    X = np.empty((len(players), len(staticFeatures) + 1 + len(posRanks.get(pos))), dtype='float32')
+    X[:, :len(staticFeatures)] = players[staticFeatures].to_numpy(dtype='float32')
+    X[:, len(staticFeatures)] = 1
+    for i, rank in enumerate(posRanks.get(pos)):
+        X[:, len(staticFeatures) + 1 + i] = (players['posRank'] == rank).to_numpy()
+    return X
+
+# One row per (defense team, week) with that defense's stats; returns (keys, block)
+def opponent_block(players, schedule):
+    defs = players.loc[players['pos']=='DF', ['team'] + oppSources].drop_duplicates(subset=['team'])
+    defs['team'] = defs['team'].astype(str)
+    games = schedule[['team', 'week']].drop_duplicates().astype({'team': str, 'week': 'int64'})
+    games = games.merge(defs, how='inner', on='team')
+    return games[['team', 'week']].reset_index(drop=True), games[oppSources].to_numpy(dtype='float32')
+
+# One row per player-week: the player's row, the week, the opponent and the opponent's row in the opponent block.
+# Player-weeks without a known opponent defense are left out, as the dropna after the old cross-join did.
+def game_index(players, schedule, oppKeys):
+    games = pd.DataFrame({'team': players['team'].astype(str).to_numpy(), 'playerRow': np.arange(len(players), dtype='int32')})
+    games = games.merge(schedule[['team', 'week', 'opponent']].astype({'team': str, 'week': 'int64', 'opponent': str}), how='inner', on='team')
+    oppLookup = pd.Series(np.arange(len(oppKeys)), index=pd.MultiIndex.from_frame(oppKeys))
+    oppRow = oppLookup.reindex(pd.MultiIndex.from_arrays([games['opponent'], games['week']])).to_numpy()
+    keep = ~pd.isna(oppRow)
+    games = games.loc[keep, ['playerRow', 'week', 'opponent']].reset_index(drop=True)
+    games['week'] = games['week'].astype('int16')
+    games['oppRow'] = oppRow[keep].astype('int32')
+    return games
+
+# Assemble rows [start, stop) of the model matrix from the static and opponent blocks
+def gather(static, opponents, games, start, stop):
+    playerRow = games['playerRow'].to_numpy()[start:stop]
+    oppRow = games['oppRow'].to_numpy()[start:stop]
+    nStatic = len(staticFeatures)
+    X = np.empty((len(playerRow), len(features) + static.shape[1] - nStatic), dtype='float32')
+    X[:, 0] = games['week'].to_numpy()[start:stop]
+    X[:, 1:1 + nStatic] = static[playerRow, :nStatic]
+    X[:, 1 + nStatic:len(features)] = opponents[oppRow]
+    X[:, len(features):] = static[playerRow, nStatic:]
+    return X
@@ -0,0 +1,22 @@
+# Gunicorn settings, loaded automatically by `gunicorn app:app` from the repo root
+import os
+from prometheus_client import multiprocess
+
+# In multiprocess metrics mode, drop a dead worker's live gauges from /metrics
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
+
+# Set WEB_ASYNC=1 to serve with gevent workers: MFL requests yield while they wait, so one worker holds up to
+# WEB_CONNECTIONS clients, and pandas work runs on a small thread pool (see serving.py)
+if os.environ.get("WEB_ASYNC", "0") == "1":
+    worker_class = "gevent"
+    worker_connections = int(os.environ.get("WEB_CONNECTIONS", "500"))
+
+# Warm each worker's page cache for recently active leagues (see warmup.py); WARMUP=0 turns it off.
+# With LIVE_ODDS=1 one worker also keeps the active leagues' live win probabilities current (see live_odds.py)
+def post_worker_init(worker):
+    import live_odds
+    import warmup
+    warmup.start()
+    live_odds.start()
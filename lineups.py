@@ -0,0 +1,107 @@
+# Import dependencies
+import numpy as np
+import pandas as pd
+
+# Roster Builder settings
+# Starters taken at each position before the flex spots
+starterCounts = {"QB":1, "RB":2, "WR":3, "TE":2, "PK":2, "DF":2}
+# Bench depth at each position that competes for the flex spots
+flexCounts = {"QB":1, "RB":3, "WR":3, "TE":3}
+flexSpots = 3
+posList = ["QB", "RB", "WR", "TE", "PK", "DF"]
+
+# Merge predictions with the rosters and the free agent pool.
+# Players on no roster are counted as free agents, or dropped with keepUnrostered=False
+def merge_rosters(predictions, franchises, rosters, freeAgents, keepUnrostered=True):
+    franchise_df = franchises.rename(columns={'franchiseID':'FranchiseID', 'franchiseName':'FranchiseName'})
+    franchise_df = pd.concat([franchise_df, pd.DataFrame([{"FranchiseID":"FA", "FranchiseName":"Free Agent"}])], ignore_index=True)
+    fa_df = pd.DataFrame({'franchiseID':"FA", 'week':"", 'id_mfl':freeAgents['id_mfl'], 'status':"Free Agent"})
+    rosters_df = pd.concat([rosters, fa_df], ignore_index=True)
+    rosters_df.columns = ['FranchiseID','Week','PlayerID','RosterStatus']
+
+    # Merge all dfs
+    complete = predictions.merge(rosters_df, left_on='id_mfl', right_on='PlayerID', how='left').merge(franchise_df[['FranchiseID', 'FranchiseName']], on='FranchiseID', how='left')
+    if not keepUnrostered:
+        complete = complete[complete['FranchiseID'].notna()].copy()
+    complete['FranchiseID'] = complete['FranchiseID'].fillna("FA")
+    complete['FranchiseName'] = complete['FranchiseName'].fillna("Free Agent")
+    complete['RosterStatus'] = complete['RosterStatus'].fillna("Free Agent")
+    return complete
+
+# The waiver wire table: the user's players and free agents, best prediction first
+def waiver_table(predictions, franchises, rosters, freeAgents):
+    complete = merge_rosters(predictions, franchises, rosters, freeAgents, keepUnrostered=False)
+    complete = complete.sort_values(by=['pred'], ascending=False)
+    complete.reset_index(inplace=True, drop=True)
+    complete = complete[['player', 'age', 'team', 'FranchiseName', 'pos', 'posRank', 'KR', 'PR', 'RES', 'pred', 'sharkAbsolute', 'adpAbsolute']]
+    complete = complete.rename(columns={
+        'player':'Player',
+        'age':'Age',
+        'team':'Team',
+        'pos':'Position',
+        'posRank': 'Rank',
+        'pred': 'ChopBlock Prediction',
+        'sharkAbsolute': 'FantasySharks Prediction',
+        'adpAbsolute': 'ADP-Based Prediction'
+    })
+    complete.set_index('Player', drop=True, inplace=True)
+    return complete
+
+# Pick each franchise's best lineup by one projection column; adds <prefix>Comp and <prefix>Relative
+def build_lineups(complete, valueCol, prefix):
+    # Split complete df by player pos
+    byPos = {x: complete[complete['pos'] == x].reset_index(drop=True) for x in posList}
+
+    # Roster Builder logic
+    tops = {x: byPos[x].sort_values(by=valueCol, ascending=False, ignore_index=True).groupby('FranchiseName').head(starterCounts[x]) for x in posList}
+    remainder = pd.concat([byPos[x][~byPos[x]['PlayerID'].isin(tops[x]['PlayerID'])].groupby('FranchiseName').head(flexCounts[x]) for x in flexCounts])
+    top_remainders = remainder.sort_values(by=valueCol, ascending=False, ignore_index=True).groupby('FranchiseName').head(flexSpots)
+
+    players_onthefield = pd.concat([tops[x] for x in posList] + [top_remainders])
+    players_onthefield = players_onthefield.sort_values(by=valueCol, ascending=False, ignore_index=True)
+
+    # Order franchises by their lineup total
+    sorter = players_onthefield.groupby('FranchiseName')[valueCol].sum().sort_values(ascending=False).index
+    players_onthefield['FranchiseName'] = pd.Categorical(players_onthefield['FranchiseName'], categories=sorter)
+    players_onthefield = players_onthefield.sort_values(["FranchiseName"])
+
+    # remove Free Agents
+    players_onthefield = players_onthefield.loc[players_onthefield.FranchiseID!="FA"].copy()
+
+    # Find the lowest scoring player on the field and set them as the low bar
+    players_onthefield[f'{prefix}Comp'] = players_onthefield.groupby('pos')[valueCol].transform('min')
+    players_onthefield[f'{prefix}Relative'] = players_onthefield[valueCol] - players_onthefield[f'{prefix}Comp']
+    return players_onthefield
+
+# Project each live player's final score and color them by how far they are above/below their projection
+def live_scores(liveScores, franchises, predictions):
+    # merge predictions, franchises, and liveScores
+    merged = liveScores.merge(franchises, how='left', on='franchiseID').merge(predictions, how='left', on='id_mfl')
+    # Clean
+    merged['liveScore'] = merged.liveScore.astype('float64')
+    merged['secondsRemaining'] = merged.secondsRemaining.astype('float64')
+
+    # calculate scoreRemaining
+    merged['weeklyPred'] = merged['pred'] / 17
+    merged['scoreRemaining'] = (merged['weeklyPred'] * (merged['secondsRemaining'] / 3600)) + merged['liveScore']
+    # Claculate difference between projection/actual
+    merged['diff'] = merged.scoreRemaining - merged.weeklyPred
+    # Normalize difference
+    merged['diff'] = merged['diff'].clip(-20, 20)
+    merged['scaled'] = round(merged['diff'] * 255 / 20, 0)
+    merged.dropna(inplace=True)
+    merged['scaled'] = merged['scaled'].astype('int')
+    # Set colors for chart: green above projection, red below
+    scalar = merged['scaled'].to_numpy()
+    red = np.where(scalar >= 0, 255 - scalar, 255).astype(str)
+    green = np.where(scalar >= 0, 255, 255 + scalar).astype(str)
+    blue = (255 - np.abs(scalar)).astype(str)
+    merged['color'] = "rgb(" + pd.Series(red, index=merged.index) + "," + green + "," + blue + ")"
+
+    # Starters, grouped by franchise and ordered by franchise total
+    players_onthefield = merged.loc[merged.status=="starter"]
+    players_onthefield = players_onthefield.sort_values(by='scoreRemaining', ascending=False, ignore_index=True)
+    sorter = players_onthefield.groupby('franchiseName')['scoreRemaining'].sum().sort_values(ascending=False).index
+    players_onthefield['franchiseName'] = pd.Categorical(players_onthefield['franchiseName'], categories=sorter)
+    players_onthefield = players_onthefield.sort_values(["franchiseName"])
+    return players_onthefield
@@ -0,0 +1,265 @@
+# Import dependencies
+# Standard python libraries
+import fcntl
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+# Third-party libraries
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+# Internal imports
+import db
+import warmup
+from db import get_cached_df
+from mfl import get_mfl_league, get_mfl_liveScoring
+from simulate import posCV, seasonGames
+
+# In-game win probability for every liveScoring matchup. Each league's starters are kept in arrays between
+# polls along with running per-franchise totals; a poll only touches the starters whose score or clock moved.
+# A starter's remaining points are normal with mean weeklyPred * (secondsRemaining / 3600) and the same
+# per-position spread the season simulator uses, so each franchise's final score is normal too and a matchup's
+# win probability is one normal CDF.
+# With LIVE_ODDS=1 only one worker on the machine (whichever holds LIVE_ODDS_DIR/poller.lock) polls MFL in the
+# background. It polls the active leagues and those any worker served /liveScoring for recently (marked with a
+# <league>.viewed file) and writes each league's odds to <league>.parquet, which every worker serves while fresh.
+
+# Find environment variables
+# Set LIVE_ODDS=1 to refresh the active leagues in the background on game days
+LIVE_ODDS = os.environ.get("LIVE_ODDS", "0") == "1"
+LIVE_ODDS_POLL_SECONDS = float(os.environ.get("LIVE_ODDS_POLL_SECONDS", "30"))
+# MFL requests in flight at once while refreshing
+LIVE_ODDS_FETCH_THREADS = int(os.environ.get("LIVE_ODDS_FETCH_THREADS", "8"))
+# A league that is no longer active and nobody has viewed for this long stops being polled and its state is dropped
+LIVE_ODDS_IDLE_SECONDS = float(os.environ.get("LIVE_ODDS_IDLE_SECONDS", "900"))
+# Shared between the workers: the poller lock, viewed markers and the poller's odds tables
+LIVE_ODDS_DIR = os.environ.get("LIVE_ODDS_DIR", os.path.join("data", "live_odds"))
+
+# League -> state dict (see build_state), and league -> lock guarding that league's state
+liveStates = {}
+leagueLocks = {}
+# Guards the two dicts themselves; never held while fetching or computing
+stateLock = threading.Lock()
+# The open poller lock file, once this worker holds it
+pollerLock = None
+# The predictions version the states are built from, checked at most every LIVE_ODDS_POLL_SECONDS: [checked, version]
+versionCheck = [0, None]
+
+# Starters of the franchises in franchiseIndex; one MFL lists in liveScoring but not in the league is left out
+def starter_rows(liveScores, franchiseIndex):
+    starters = liveScores.loc[(liveScores.status=="starter") & liveScores['franchiseID'].isin(franchiseIndex)]
+    keys = pd.Index(starters['franchiseID'] + "|" + starters['id_mfl'])
+    score = pd.to_numeric(starters['liveScore'], errors='coerce').fillna(0).to_numpy(dtype=np.float64, copy=True)
+    remaining = pd.to_numeric(starters['secondsRemaining'], errors='coerce').fillna(0).to_numpy(dtype=np.float64) / 3600
+    return starters, keys, score, remaining
+
+# Arrays for one league's starters plus each franchise's running score, remaining mean and remaining variance
+def build_state(liveScores, franchises, predictions, version=None):
+    franchiseIndex = pd.Index(franchises['franchiseID'])
+    starters, keys, score, remaining = starter_rows(liveScores, franchiseIndex)
+    merged = starters[['id_mfl']].merge(predictions[['id_mfl', 'pos', 'pred']], how='left', on='id_mfl')
+    weekly = (merged['pred'] / seasonGames).fillna(0).to_numpy()
+    variance = (weekly * merged['pos'].map(posCV).fillna(max(posCV.values())).to_numpy()) ** 2
+
+    franchise = franchiseIndex.get_indexer(starters['franchiseID'])
+    nFranchises = len(franchiseIndex)
+    # Pair each matchup's two franchises
+    sides = liveScores.loc[(liveScores['matchup'] >= 0) & liveScores['franchiseID'].isin(franchiseIndex), ['matchup', 'franchiseID']].drop_duplicates()
+    pairs = sides.groupby('matchup')['franchiseID'].agg(list)
+    pairs = pairs[pairs.str.len() == 2]
+    state = {
+        'keys': keys,
+        'franchiseIndex': franchiseIndex,
+        'franchiseNames': franchises['franchiseName'].to_numpy(),
+        'franchise': franchise,
+        'weekly': weekly,
+        'variance': variance,
+        'score': score,
+        'remaining': remaining,
+        'total': np.bincount(franchise, score + weekly * remaining, minlength=nFranchises),
+        'totalVariance': np.bincount(franchise, variance * remaining, minlength=nFranchises),
+        'home': franchiseIndex.get_indexer(pairs.str[0]),
+        'away': franchiseIndex.get_indexer(pairs.str[1]),
+        'updated': time.time(),
+        'viewed': 0,
+        'version': version,
+    }
+    return state
+
+# Apply a new poll to the state in place; returns how many starters changed, or None if the lineups changed
+def update_state(state, liveScores):
+    starters, keys, score, remaining = starter_rows(liveScores, state['franchiseIndex'])
+    if not keys.equals(state['keys']):
+        return None
+    changed = np.flatnonzero((score != state['score']) | (remaining != state['remaining']))
+    if len(changed):
+        franchise = state['franchise'][changed]
+        deltaRemaining = remaining[changed] - state['remaining'][changed]
+        np.add.at(state['total'], franchise, score[changed] - state['score'][changed] + state['weekly'][changed] * deltaRemaining)
+        np.add.at(state['totalVariance'], franchise, state['variance'][changed] * deltaRemaining)
+        state['score'][changed] = score[changed]
+        state['remaining'][changed] = remaining[changed]
+    state['updated'] = time.time()
+    return len(changed)
+
+def win_probabilities(state):
+    home, away = state['home'], state['away']
+    margin = state['total'][home] - state['total'][away]
+    spread = np.sqrt(np.maximum(state['totalVariance'][home] + state['totalVariance'][away], 0))
+    # Once every game is over the result is known
+    settled = np.where(margin > 0, 1.0, np.where(margin < 0, 0.0, 0.5))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        homeWin = np.where(spread > 1e-9, ndtr(margin / spread), settled)
+    return homeWin
+
+# The matchup table: each side's current and projected score and win probability
+def odds_table(state):
+    home, away = state['home'], state['away']
+    names = state['franchiseNames']
+    homeWin = win_probabilities(state)
+    current = np.bincount(state['franchise'], state['score'], minlength=len(names))
+    odds = pd.DataFrame({
+        'Home': names[home],
+        'Home Score': current[home].round(1),
+        'Home Projected': state['total'][home].round(1),
+        'Home Win %': (homeWin * 100).round(1),
+        'Away Win %': ((1 - homeWin) * 100).round(1),
+        'Away Projected': state['total'][away].round(1),
+        'Away Score': current[away].round(1),
+        'Away': names[away],
+    })
+    return odds
+
+def league_lock(league):
+    with stateLock:
+        return leagueLocks.setdefault(league, threading.Lock())
+
+def predictions_version():
+    if time.time() - versionCheck[0] >= LIVE_ODDS_POLL_SECONDS:
+        versionCheck[:] = [time.time(), db.get_predictions_version()]
+    return versionCheck[1]
+
+def shared_path(league, suffix):
+    return os.path.join(LIVE_ODDS_DIR, f"{league}{suffix}")
+
+# Ask the poller to keep a league current
+def mark_viewed(league):
+    os.makedirs(LIVE_ODDS_DIR, exist_ok=True)
+    with open(shared_path(league, ".viewed"), "a"):
+        os.utime(shared_path(league, ".viewed"))
+
+# The poller's odds for a league if it wrote them within the last two polls, else None
+def shared_odds(league):
+    try:
+        if time.time() - os.path.getmtime(shared_path(league, ".parquet")) > 2 * LIVE_ODDS_POLL_SECONDS:
+            return None
+        return pd.read_parquet(shared_path(league, ".parquet"))
+    except (OSError, ValueError):
+        return None
+
+# Update a league's state from a liveScoring poll (rebuilding it when lineups changed or new predictions were
+# published) and return its odds. Only the league's own lock is held, and never while its franchises or the
+# predictions are fetched. viewed=False for background polls, which do not keep an inactive league alive.
+def matchup_odds(league, liveScores, franchises=None, predictions=None, viewed=True):
+    version = predictions_version()
+    lock = league_lock(league)
+    with lock:
+        state = liveStates.get(league)
+        if state is not None and state['version'] == version and update_state(state, liveScores) is not None:
+            if viewed:
+                state['viewed'] = time.time()
+            return odds_table(state)
+    if state is not None and state['version'] != version:
+        # Read the newly published predictions, not the table cache's older copy
+        db.tableCache.pop("predictions", None)
+        predictions = None
+    if franchises is None:
+        franchises = get_mfl_league(league)
+    if predictions is None:
+        predictions = get_cached_df("predictions")
+    state = build_state(liveScores, franchises, predictions, version)
+    with lock:
+        previous = liveStates.get(league)
+        state['viewed'] = time.time() if viewed else previous['viewed'] if previous is not None else 0
+        liveStates[league] = state
+        return odds_table(state)
+
+# The odds for a /liveScoring request: the poller's when fresh, else computed from the request's own poll
+def league_odds(league, liveScores, franchises, predictions):
+    if LIVE_ODDS:
+        mark_viewed(league)
+        odds = shared_odds(league)
+        if odds is not None:
+            return odds
+    return matchup_odds(league, liveScores, franchises, predictions)
+
+def refresh(league):
+    try:
+        odds = matchup_odds(league, get_mfl_liveScoring(league), viewed=False)
+        odds.to_parquet(shared_path(league, ".parquet.tmp"))
+        os.replace(shared_path(league, ".parquet.tmp"), shared_path(league, ".parquet"))
+    except Exception as error:
+        print(f"Live odds for {league} failed: {error}")
+
+# Poll every given league's liveScoring concurrently and update its odds
+def refresh_all(leagues):
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=LIVE_ODDS_FETCH_THREADS) as executor:
+        list(executor.map(refresh, leagues))
+    return time.time() - start
+
+# Drop this worker's state for leagues that are not active and have not been viewed for LIVE_ODDS_IDLE_SECONDS
+def prune(active):
+    cutoff = time.time() - LIVE_ODDS_IDLE_SECONDS
+    with stateLock:
+        for league in [league for league, state in liveStates.items() if league not in active and state['viewed'] < cutoff]:
+            del liveStates[league]
+            leagueLocks.pop(league, None)
+
+# Leagues any worker served recently; markers (and odds) of leagues idle for LIVE_ODDS_IDLE_SECONDS are removed
+def viewed_leagues(active):
+    cutoff = time.time() - LIVE_ODDS_IDLE_SECONDS
+    leagues = set()
+    for name in os.listdir(LIVE_ODDS_DIR):
+        league, suffix = os.path.splitext(name)
+        if suffix != ".viewed":
+            continue
+        if os.path.getmtime(os.path.join(LIVE_ODDS_DIR, name)) >= cutoff:
+            leagues.add(league)
+        elif league not in active:
+            for path in [shared_path(league, ".viewed"), shared_path(league, ".parquet")]:
+                if os.path.exists(path):
+                    os.remove(path)
+    return leagues
+
+# Take the poller lock if no other worker holds it; returns whether this worker is the poller
+def acquire_poller():
+    global pollerLock
+    if pollerLock is None:
+        os.makedirs(LIVE_ODDS_DIR, exist_ok=True)
+        lockFile = open(os.path.join(LIVE_ODDS_DIR, "poller.lock"), "w")
+        try:
+            fcntl.flock(lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lockFile.close()
+            return False
+        pollerLock = lockFile
+    return True
+
+# Every worker prunes its own state; only the lock holder polls MFL (another worker takes over if it exits)
+def run():
+    while True:
+        active = {league for league, franchise in warmup.active_leagues()}
+        prune(active)
+        seconds = 0
+        if acquire_poller():
+            leagues = sorted(active | viewed_leagues(active))
+            seconds = refresh_all(leagues) if leagues else 0
+        time.sleep(max(0, LIVE_ODDS_POLL_SECONDS - seconds))
+
+# Called from gunicorn's post_worker_init hook, once per worker
+def start():
+    if LIVE_ODDS:
+        threading.Thread(target=run, name="live_odds", daemon=True).start()
@@ -0,0 +1,83 @@
+# Import dependencies
+# Standard python libraries
+import os
+import time
+# Third-party libraries
+from flask import g, has_app_context
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+
+# Find environment variables
+# With several gunicorn workers, point PROMETHEUS_MULTIPROC_DIR at an empty shared directory so /metrics covers every worker
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR", None)
+
+buckets = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+routeSeconds = Histogram('ff_route_seconds', 'Time to serve a request', ['route'], buckets=buckets)
+phaseSeconds = Histogram('ff_route_phase_seconds', 'Time a request spent in each phase of its route', ['route', 'phase'], buckets=buckets)
+cacheRequests = Counter('ff_cache_requests', 'Cache lookups by result', ['cache', 'result'])
+cacheHitRatio = Gauge('ff_cache_hit_ratio', 'Share of cache lookups served from memory', ['cache'], multiprocess_mode='liveall')
+fetchWaitSeconds = Counter('ff_fetch_wait_seconds', 'Time outgoing fetches spent waiting on the rate limiter', ['host'])
+fetchResults = Counter('ff_fetch_results', 'Outgoing fetch attempts by result (ok, retry, failed, refused, stale)', ['host', 'result'])
+tableAge = Gauge('ff_table_age_seconds', 'Seconds since the scheduler published the in-memory copy of a table', ['table'], multiprocess_mode='livemax')
+
+# Hits and misses per cache in this process, for the hit ratio gauge
+cacheCounts = {}
+# When the scheduler published each cached table this process holds (its load time if unknown)
+tablePublished = {}
+
+# Phases are marked like scheduler stages: phase(name) closes the running phase and starts the next.
+# Time in a phase that is entered several times in one request (e.g. one figure per chart) is added up.
+def start_request():
+    g.phaseTimes = {}
+    g.requestStart = g.phaseStart = time.perf_counter()
+    g.phaseName = "other"
+
+# Outside a request (e.g. cache warm-up threads) phases are not recorded
+def phase(name):
+    if not has_app_context() or 'phaseTimes' not in g:
+        return
+    now = time.perf_counter()
+    g.phaseTimes[g.phaseName] = g.phaseTimes.get(g.phaseName, 0) + now - g.phaseStart
+    g.phaseName = name
+    g.phaseStart = now
+
+# Close the running phase and observe the request's phase totals
+def finish_request(route):
+    if not has_app_context() or 'phaseTimes' not in g:
+        return
+    phase(None)
+    for name, seconds in g.phaseTimes.items():
+        if name is not None:
+            phaseSeconds.labels(route, name).observe(seconds)
+    routeSeconds.labels(route).observe(time.perf_counter() - g.requestStart)
+    refresh_ages()
+
+def cache_lookup(cache, hit):
+    counts = cacheCounts.setdefault(cache, [0, 0])
+    counts[0 if hit else 1] += 1
+    cacheRequests.labels(cache, "hit" if hit else "miss").inc()
+    cacheHitRatio.labels(cache).set(counts[0] / (counts[0] + counts[1]))
+
+def fetch_wait(host, seconds):
+    if seconds > 0:
+        fetchWaitSeconds.labels(host).inc(seconds)
+
+def fetch_result(host, result):
+    fetchResults.labels(host, result).inc()
+
+def table_published(table, publishedAt):
+    tablePublished[table] = publishedAt
+    refresh_ages()
+
+def refresh_ages():
+    now = time.time()
+    for table, publishedAt in tablePublished.items():
+        tableAge.labels(table).set(now - publishedAt)
+
+# Body, status and headers for the /metrics endpoint
+def export():
+    refresh_ages()
+    registry = REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
@@ -4,11 +4,19 @@ import json
 import os
 from bs4 import BeautifulSoup, ProcessingInstruction
 from oauthlib.oauth2 import WebApplicationClient
-import requests
 import pandas as pd
 
+# Internal imports
+from archive import get_content
+from parse_cache import get_parsed
+
+# Find environment variables
+# MFL hosts for league exports and for league-independent exports; point these at bench/mock_mfl.py for load tests
+MFL_HOST = os.environ.get("MFL_HOST", "https://www54.myfantasyleague.com")
+MFL_API_HOST = os.environ.get("MFL_API_HOST", "https://api.myfantasyleague.com")
+
 def get_mfl(requestType, user_league):
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE={requestType}&L={user_league}"
+    urlString = f"{MFL_HOST}/2022/export?TYPE={requestType}&L={user_league}"
     parseDict = {
         "league": {"findRows":"franchise", "findCols":{"id", "name"}, "colNames":{"id":"FranchiseID", "name":"FranchiseName"}},
         "liveScoring": {"findRows":"player", "findCols":{"id", "score", "gameSecondsRemaining", "status"}, "colNames":{"id":"id_mfl", "score":"liveScore"}},
@@ -16,8 +24,8 @@ def get_mfl(requestType, user_league):
         }
     parseBuilder = parseDict.get(requestType)
     # Get xml from MyFantasyLeague
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
+    content = get_content(urlString)
+    soup = BeautifulSoup(content,'xml')
     data = []
     # Create df: Get all rows
     df = soup.find_all(parseBuilder.get("findRows"))
@@ -37,9 +45,9 @@ def get_mfl(requestType, user_league):
     return df
 
 def get_mfl_league(user_league):
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=league&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
+    urlString = f"{MFL_HOST}/2022/export?TYPE=league&L={user_league}"
+    content = get_content(urlString)
+    soup = BeautifulSoup(content,'xml')
     data = []
     elems = soup.find_all('franchise')
     for i in range(len(elems)):
@@ -50,24 +58,27 @@ def get_mfl_league(user_league):
     return df
 
 def get_mfl_liveScoring(user_league):
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=liveScoring&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
+    urlString = f"{MFL_HOST}/2022/export?TYPE=liveScoring&L={user_league}"
+    content = get_content(urlString)
+    soup = BeautifulSoup(content,'xml')
     data = []
     franchises = soup.find_all('franchise')
+    # Matchups are numbered in listing order so each franchise's opponent can be found
+    matchupIDs = {}
     for i in range(0,len(franchises)):
+        matchup = franchises[i].find_parent('matchup')
+        matchupID = matchupIDs.setdefault(id(matchup), len(matchupIDs)) if matchup is not None else -1
         current_franchise = franchises[i].find_all('player')
         for j in range(0,len(current_franchise)):
-            rows = [franchises[i].get("id"), current_franchise[j].get("id"), current_franchise[j].get("score"), current_franchise[j].get("gameSecondsRemaining"), current_franchise[j].get("status")]
+            rows = [franchises[i].get("id"), current_franchise[j].get("id"), current_franchise[j].get("score"), current_franchise[j].get("gameSecondsRemaining"), current_franchise[j].get("status"), matchupID]
             data.append(rows)
-    df = pd.DataFrame(data)
-    df.columns = ["franchiseID", "id_mfl", "liveScore", "secondsRemaining", "status"]
+    df = pd.DataFrame(data, columns=["franchiseID", "id_mfl", "liveScore", "secondsRemaining", "status", "matchup"])
     return df
 
 def get_mfl_projectedScores(user_league, week):
-    urlString = f"https://www54.myfantasyleague.com/2022/export?TYPE=projectedScores&W={week}&L={user_league}"
-    response = requests.get(urlString)
-    soup = BeautifulSoup(response.content,'xml')
+    urlString = f"{MFL_HOST}/2022/export?TYPE=projectedScores&W={week}&L={user_league}"
+    content = get_content(urlString)
+    soup = BeautifulSoup(content,'xml')
     data = []
     elems = soup.find_all('playerScore')
     for i in range(len(elems)):
@@ -75,4 +86,122 @@ def get_mfl_projectedScores(user_league, week):
         data.append(rows)
     df = pd.DataFrame(data)
     df.columns=['id_mfl','sharkProjection']
-    return df
\ No newline at end of file
+    return df
+
+def get_mfl_rosters(user_league, franchise=None):
+    urlString = f"{MFL_HOST}/2022/export?TYPE=rosters&L={user_league}"
+    if franchise:
+        urlString = urlString + f"&FRANCHISE={franchise}"
+    content = get_content(urlString)
+    soup = BeautifulSoup(content,'xml')
+    data = []
+    franchises = soup.find_all('franchise')
+    for i in range(0,len(franchises)):
+        current_franchise = franchises[i].find_all('player')
+        for j in range(0,len(current_franchise)):
+            rows = [franchises[i].get("id"), franchises[i].get("week"), current_franchise[j].get("id"), current_franchise[j].get("status")]
+            data.append(rows)
+    df = pd.DataFrame(data, columns=["franchiseID", "week", "id_mfl", "status"])
+    return df
+
+# Head-to-head schedule: one row per matchup, with scores for weeks already played (NaN before then)
+def get_mfl_schedule(user_league):
+    urlString = f"{MFL_HOST}/2022/export?TYPE=schedule&L={user_league}"
+    content = get_content(urlString)
+    soup = BeautifulSoup(content,'xml')
+    data = []
+    weeks = soup.find_all('weeklySchedule')
+    for i in range(len(weeks)):
+        matchups = weeks[i].find_all('matchup')
+        for j in range(len(matchups)):
+            franchises = matchups[j].find_all('franchise')
+            if len(franchises) != 2:
+                continue
+            # MFL marks the home side; fall back to listing order
+            if franchises[1].get("isHome") == "1":
+                franchises = franchises[::-1]
+            rows = [weeks[i].get("week"), franchises[0].get("id"), franchises[1].get("id"), franchises[0].get("score"), franchises[1].get("score")]
+            data.append(rows)
+    df = pd.DataFrame(data, columns=["week", "homeID", "awayID", "homeScore", "awayScore"])
+    df['week'] = df['week'].astype('int16')
+    df['homeScore'] = pd.to_numeric(df['homeScore'], errors='coerce')
+    df['awayScore'] = pd.to_numeric(df['awayScore'], errors='coerce')
+    return df
+
+def get_mfl_freeAgents(user_league):
+    urlString = f"{MFL_HOST}/2022/export?TYPE=freeAgents&L={user_league}"
+    content = get_content(urlString)
+    soup = BeautifulSoup(content,'xml')
+    data = []
+    elems = soup.find_all('player')
+    for i in range(len(elems)):
+        rows = [elems[i].get("id")]
+        data.append(rows)
+    df = pd.DataFrame(data, columns=["id_mfl"])
+    return df
+
+# League transactions, oldest first. `transaction` holds the added and dropped player ids ("added,|dropped,"),
+# trades list each side's players in franchise1_gave_up / franchise2_gave_up
+def get_mfl_transactions(user_league):
+    urlString = f"{MFL_HOST}/2022/export?TYPE=transactions&L={user_league}"
+    content = get_content(urlString)
+    soup = BeautifulSoup(content,'xml')
+    data = []
+    elems = soup.find_all('transaction')
+    for i in range(len(elems)):
+        rows = [elems[i].get("type"), elems[i].get("timestamp"), elems[i].get("franchise"), elems[i].get("franchise2"),
+            elems[i].get("transaction"), elems[i].get("franchise1_gave_up"), elems[i].get("franchise2_gave_up")]
+        data.append(rows)
+    df = pd.DataFrame(data, columns=["type", "timestamp", "franchise", "franchise2", "transaction", "franchise1_gave_up", "franchise2_gave_up"])
+    df['timestamp'] = pd.to_numeric(df['timestamp'], errors='coerce').fillna(0).astype('int64')
+    df = df.fillna("")
+    df = df.sort_values(by='timestamp', kind='stable', ignore_index=True)
+    return df
+
+# Player universe: name, position and team of every player MFL knows.
+# These three large exports are fetched compressed and conditionally, and only parsed when their body changed.
+def parse_players(content):
+    soup = BeautifulSoup(content,'xml')
+    data = []
+    elems = soup.find_all('player')
+    for i in range(len(elems)):
+        rows = [elems[i].get("id"), elems[i].get("name"), elems[i].get("position"), elems[i].get("team")]
+        data.append(rows)
+    df = pd.DataFrame(data, columns=['PlayerID','Name', 'Position', 'Team'])
+    return df
+
+def get_mfl_players():
+    return get_parsed("players", f"{MFL_API_HOST}/2022/export?TYPE=players", parse_players)
+
+# Only the players added or changed since a unix timestamp (see player_store.py)
+def get_mfl_players_since(since):
+    content = get_content(f"{MFL_API_HOST}/2022/export?TYPE=players&SINCE={int(since)}")
+    return parse_players(content)
+
+def parse_playerRanks(content):
+    soup = BeautifulSoup(content,'xml')
+    data = []
+    elems = soup.find_all('player')
+    for i in range(len(elems)):
+        rows = [elems[i].get("id"), elems[i].get("rank")]
+        data.append(rows)
+    df = pd.DataFrame(data, columns=['PlayerID','SharkRank'])
+    df['SharkRank'] = df['SharkRank'].astype('int32')
+    return df
+
+def get_mfl_playerRanks():
+    return get_parsed("playerRanks", f"{MFL_API_HOST}/2022/export?TYPE=playerRanks", parse_playerRanks)
+
+def parse_adp(content):
+    soup = BeautifulSoup(content,'xml')
+    data = []
+    elems = soup.find_all('player')
+    for i in range(len(elems)):
+        rows = [elems[i].get("id"), elems[i].get("averagePick")]
+        data.append(rows)
+    df = pd.DataFrame(data, columns=['PlayerID','ADP'])
+    df['ADP'] = df['ADP'].astype('float32')
+    return df
+
+def get_mfl_adp():
+    return get_parsed("adp", f"{MFL_API_HOST}/2022/export?TYPE=adp", parse_adp)
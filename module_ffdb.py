@@ -1,6 +1,7 @@
 # import data analysis tools
 import pandas as pd
 import os
+import re
 
 # import scraping tools
 from selenium import webdriver
@@ -12,73 +13,131 @@ from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException
 
-# scrape FF DB
-def scrape_ffdb(seasonStart, seasonEnd, weekStart, weekEnd):
-    # Initialize overall df
-    #####
-    # loop through positions
-    posList = ['QB', 'RB', 'WR', 'TE', 'K', 'DST']
-    for position in posList:
-        # Set column names
-        colsOffense = [
-            'Unnamed: 0_level_0_Player', 'Unnamed: 1_level_0_Game', 'Unnamed: 2_level_0_Pts*', 
-            'Passing_Att', 'Passing_Cmp', 'Passing_Yds', 'Passing_TD', 'Passing_Int', 'Passing_2Pt', 
-            'Rushing_Att', 'Rushing_Yds', 'Rushing_TD', 'Rushing_2Pt', 
-            'Receiving_Rec', 'Receiving_Yds', 'Receiving_TD', 'Receiving_2Pt', 
-            'Fumbles_FL', 'Fumbles_TD'] 
-        colsK = ['Player', 'Game', 'Pts*', 'XPA', 'XPM', 'FGA', 'FGM', '50+'] 
-        colsDST = ['Team', 'Game', 'Pts*', 'Sack', 'Int', 'Saf', 'FR', 'Blk', 'TD', 'PA', 'PassYds', 'RushYds', 'TotYds']
-    
-        colMap = {"QB":colsOffense, "RB":colsOffense, "WR":colsOffense, "TE":colsOffense, "K":colsK, "DST":colsDST}
-        colNamesInit = colMap.get(position)
-        # Initialize empty df
-        df=pd.DataFrame(columns=colNamesInit)
+# Internal imports
+import archive
 
-        # Set Selenium/Chrome settings
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.binary_location = os.environ.get("GOOGLE_CHROME_BIN")
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--no-sandbox")
-        capa = DesiredCapabilities.CHROME
-        capa["pageLoadStrategy"] = "none"
+# footballdb position codes and the MFL codes the rest of the repo uses
+posMap = {"QB":"QB", "RB":"RB", "WR":"WR", "TE":"TE", "K":"PK", "DST":"DF"}
 
-        # Loop through seasons
-        for i in range(seasonStart, seasonEnd):
-            # Loop through weeks
-            for j in range(weekStart, weekEnd):
-                season = i
-                week = j
+# Map footballdb columns onto the stat names used by the prior/curr tables
+statMap = {
+    'Passing_Att':'passA', 'Passing_Cmp':'passC', 'Passing_Yds':'passY', 'Passing_TD':'passT', 'Passing_Int':'passI', 'Passing_2Pt':'pass2',
+    'Rushing_Att':'rushA', 'Rushing_Yds':'rushY', 'Rushing_TD':'rushT', 'Rushing_2Pt':'rush2',
+    'Receiving_Rec':'recC', 'Receiving_Yds':'recY', 'Receiving_TD':'recT', 'Receiving_2Pt':'rec2',
+    'Fumbles_FL':'fum',
+    'XPA':'XPA', 'XPM':'XPM', 'FGA':'FGA', 'FGM':'FGM', '50+':'FG50',
+    'Sack':'defSack', 'Int':'defI', 'Saf':'defSaf', 'FR':'defFum', 'Blk':'defBlk', 'TD':'defT',
+    'PA':'defPtsAgainst', 'PassYds':'defPassYAgainst', 'RushYds':'defRushYAgainst', 'TotYds':'defYdsAgainst'
+}
+statList = [
+    'passA', 'passC', 'passY', 'passT', 'passI', 'pass2', 
+    'rushA', 'rushY', 'rushT', 'rush2', 
+    'recC', 'recY', 'recT', 'rec2', 'fum', 
+    'XPA', 'XPM', 'FGA', 'FGM', 'FG50', 
+    'defSack', 'defI', 'defSaf', 'defFum', 'defBlk', 'defT', 
+    'defPtsAgainst', 'defPassYAgainst', 'defRushYAgainst', 'defYdsAgainst'
+]
 
-                # Scrape web for stats
-                url = f"https://www.footballdb.com/fantasy-football/index.html?pos={position}&yr={season}&wk={week}&key=48ca46aa7d721af4d58dccc0c249a1c4"
+# Set Selenium/Chrome settings
+def chrome_settings():
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.binary_location = os.environ.get("GOOGLE_CHROME_BIN")
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--no-sandbox")
+    capa = DesiredCapabilities.CHROME
+    capa["pageLoadStrategy"] = "none"
+    return chrome_options, capa
 
-                driver = webdriver.Chrome(
-                            executable_path=os.environ.get("CHROMEDRIVER_PATH"), 
-                            chrome_options=chrome_options, 
-                            desired_capabilities=capa)
-                wait = WebDriverWait(driver, 20)
-                driver.get(url)
+# scrape one position/season/week table from FF DB
+def scrape_ffdb_week(position, season, week):
+    # Scrape web for stats
+    url = f"https://www.footballdb.com/fantasy-football/index.html?pos={position}&yr={season}&wk={week}&key=48ca46aa7d721af4d58dccc0c249a1c4"
 
-                wait.until(EC.presence_of_element_located((By.XPATH, "//div[@id='leftcol']/div[3]/table")))
-                driver.execute_script("window.stop();")
+    if archive.ARCHIVE_REPLAY:
+        # Read the stats table from the archive instead of launching Chrome
+        tableHtml = archive.load_content(url, archive.ARCHIVE_REPLAY_AT)
+        if tableHtml is None:
+            raise LookupError(f"No archived response for {url}")
+        tableHtml = tableHtml.decode("utf-8")
+    else:
+        chrome_options, capa = chrome_settings()
+        driver = webdriver.Chrome(
+                    executable_path=os.environ.get("CHROMEDRIVER_PATH"), 
+                    chrome_options=chrome_options, 
+                    desired_capabilities=capa)
+        try:
+            wait = WebDriverWait(driver, 20)
+            driver.get(url)
 
-                result = pd.read_html(driver.find_element(By.XPATH, value="//div[@id='leftcol']/div[3]/table").get_attribute("outerHTML"))
-                regex_result = driver.find_element(By.XPATH, value="//div[@id='leftcol']/div[3]/table/tbody").get_attribute("outerHTML")
+            wait.until(EC.presence_of_element_located((By.XPATH, "//div[@id='leftcol']/div[3]/table")))
+            driver.execute_script("window.stop();")
 
-                # find player's team based on which team is bolded
-                regex_teams = re.findall("<b>(.*?)</b>", regex_result)
+            tableHtml = driver.find_element(By.XPATH, value="//div[@id='leftcol']/div[3]/table").get_attribute("outerHTML")
+        finally:
+            driver.quit()
+        if archive.ARCHIVE_RECORD:
+            archive.save_content(url, tableHtml)
 
-                # flatten multiindex
-                result = result[0]
-                result.columns = result.columns.get_level_values(0) + '_' +  result.columns.get_level_values(1)
+    result = pd.read_html(tableHtml)
+    regex_result = tableHtml[tableHtml.find("<tbody"):]
 
-                # Set values for new columns
-                result['team'] = regex_teams
-                result['season'] = season
-                result['week'] = week
+    # find player's team based on which team is bolded
+    regex_teams = re.findall("<b>(.*?)</b>", regex_result)
 
-                # concatenate to master df
-                df = pd.concat([df, result], axis=0, ignore_index=True)
+    # flatten multiindex
+    result = result[0]
+    if result.columns.nlevels > 1:
+        result.columns = result.columns.get_level_values(0) + '_' +  result.columns.get_level_values(1)
+
+    # Set values for new columns
+    result['team'] = regex_teams
+    result['season'] = season
+    result['week'] = week
+    return result
 
+# Rename a scraped FF DB table to the stat names used by the prior/curr tables.
+# `position` is the footballdb code the table was scraped with ('K', 'DST', ...); pos holds the MFL code.
+def clean_ffdb(result, position):
+    df = pd.DataFrame()
+    # The first column is the player (or the team for DST)
+    df['player'] = result[result.columns[0]].astype(str)
+    # Change to Upper Case and drop punctuation, the same as the MFL names in the scheduler
+    df['player'] = df['player'].str.upper()
+    for char in [".", ",", "'"]:
+        df['player'] = df['player'].str.replace(char, "", regex=False)
+    df['team'] = result['team'].values
+    # The game column reads "KC@LV" with the player's team bolded; the other side is the opponent
+    gameCol = next((col for col in result.columns if col.split('_')[-1] == 'Game'), None)
+    if gameCol is not None:
+        sides = result[gameCol].astype(str).str.extract(r'(\w+)\s*@\s*(\w+)')
+        df['opponent'] = sides[1].where(sides[0] == df['team'], sides[0]).values
+    df['pos'] = posMap.get(position)
+    df['season'] = result['season'].astype('int16').values
+    df['week'] = result['week'].astype('int16').values
+    for col in result.columns:
+        # Kicker and defense tables may have a group prefix ("Kicking_XPA"); offense keys keep theirs
+        stat = statMap.get(col, statMap.get(col.split('_')[-1]) if position in ['K', 'DST'] else None)
+        if stat is not None:
+            df[stat] = pd.to_numeric(result[col], errors='coerce').values
+    for stat in statList:
+        if stat not in df.columns:
+            df[stat] = 0
+    df[statList] = df[statList].fillna(0).astype('float32')
+    return df
 
+# scrape FF DB
+def scrape_ffdb(seasonStart, seasonEnd, weekStart, weekEnd):
+    # Initialize overall df
+    dfList = []
+    # loop through positions
+    posList = ['QB', 'RB', 'WR', 'TE', 'K', 'DST']
+    for position in posList:
+        # Loop through seasons
+        for season in range(seasonStart, seasonEnd):
+            # Loop through weeks
+            for week in range(weekStart, weekEnd):
+                result = scrape_ffdb_week(position, season, week)
+                # concatenate to master df
+                dfList.append(clean_ffdb(result, position))
+    return pd.concat(dfList, axis=0, ignore_index=True)
@@ -0,0 +1,63 @@
+# Import dependencies
+# Standard python libraries
+import hashlib
+import json
+import os
+# Third-party libraries
+import pandas as pd
+
+# Internal imports
+from archive import get_export
+
+# Frames parsed or built from large exports, saved as parquet and keyed by a hash of what they were built from,
+# so an unchanged export is neither parsed nor merged again. Each name keeps only its newest frame:
+#   <name>.parquet  the frame
+#   <name>.json     {"key": ...} the inputs it was built from
+
+# Find environment variables
+PARSE_CACHE_DIR = os.environ.get("PARSE_CACHE_DIR", os.path.join("data", "exports"))
+
+# Runs skipped and done in this process, for the scheduler's log
+parseStats = {'skipped': 0, 'parsed': 0}
+
+def _frame_path(name):
+    return os.path.join(PARSE_CACHE_DIR, f"{name}.parquet")
+
+def _key_path(name):
+    return os.path.join(PARSE_CACHE_DIR, f"{name}.json")
+
+# Combine several input hashes (or any strings) into one key
+def combine(*parts):
+    return hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+# The saved frame for a name if it was built from the same key, else None
+def load_frame(name, key):
+    if not os.path.exists(_key_path(name)) or not os.path.exists(_frame_path(name)):
+        return None
+    with open(_key_path(name)) as f:
+        if json.load(f).get("key") != key:
+            return None
+    return pd.read_parquet(_frame_path(name))
+
+def save_frame(name, key, df):
+    os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+    df.to_parquet(_frame_path(name) + ".tmp", index=False)
+    os.replace(_frame_path(name) + ".tmp", _frame_path(name))
+    with open(_key_path(name) + ".tmp", "w") as f:
+        json.dump({"key": key}, f)
+    os.replace(_key_path(name) + ".tmp", _key_path(name))
+
+# Fetch an export and parse it with parse(content), reusing the last parse when the body is unchanged.
+# The frame's attrs['sha256'] carries the body hash so later stages can key their own caches on it.
+def get_parsed(name, url, parse):
+    content, digest, changed = get_export(url)
+    df = load_frame(name, digest)
+    if df is None:
+        df = parse(content)
+        save_frame(name, digest, df)
+        parseStats['parsed'] += 1
+    else:
+        parseStats['skipped'] += 1
+        print(f"{name}: unchanged, parse skipped")
+    df.attrs['sha256'] = digest
+    return df
@@ -0,0 +1,131 @@
+# Import dependencies
+# Standard python libraries
+import difflib
+import os
+import re
+# Third-party libraries
+import numpy as np
+import pandas as pd
+
+# Find environment variables
+PLAYER_INDEX_FILE = os.environ.get("PLAYER_INDEX_FILE", os.path.join("data", "player_index.parquet"))
+# Minimum difflib similarity for the fuzzy fallback to accept a match
+FUZZY_CUTOFF = float(os.environ.get("PLAYER_INDEX_FUZZY_CUTOFF", "0.88"))
+
+# The index has one row per (source, key, team) alias:
+#   pid     the MFL player id as an int32, the join key for every merge (-1 for a remembered fuzzy miss)
+#   source  'mfl' for the canonical MFL name, otherwise the site the alias was seen on ('ourlads', 'footballdb')
+#   key     the normalized name
+#   team    MFL team abbreviation ('' when the source has no team)
+#   fuzzy   whether the alias was found by the fuzzy matcher rather than an exact key
+indexColumns = ['pid', 'source', 'key', 'team', 'fuzzy']
+
+# Name suffixes that one site includes and another drops
+suffixes = r"\b(JR|SR|II|III|IV|V)\b"
+
+# Normalize names so the same player looks the same on every site
+def name_key(names):
+    keys = names.astype(str).str.upper()
+    keys = keys.str.replace(r"[.,'’]", "", regex=True)
+    keys = keys.str.replace("-", " ", regex=False)
+    keys = keys.str.replace(suffixes, "", regex=True)
+    keys = keys.str.replace(r"\s+", " ", regex=True).str.strip()
+    return keys
+
+# name_key for a single name, without the pandas overhead (search runs it on every keystroke)
+def name_key_one(name):
+    key = re.sub(r"[.,'’]", "", str(name).upper()).replace("-", " ")
+    key = re.sub(suffixes, "", key)
+    return re.sub(r"\s+", " ", key).strip()
+
+def load_index():
+    if not os.path.exists(PLAYER_INDEX_FILE):
+        return pd.DataFrame({
+            'pid': pd.Series(dtype='int32'), 'source': pd.Series(dtype='object'), 'key': pd.Series(dtype='object'),
+            'team': pd.Series(dtype='object'), 'fuzzy': pd.Series(dtype='bool')})
+    return pd.read_parquet(PLAYER_INDEX_FILE)
+
+def save_index(index):
+    os.makedirs(os.path.dirname(PLAYER_INDEX_FILE) or ".", exist_ok=True)
+    index.to_parquet(PLAYER_INDEX_FILE + ".tmp", index=False)
+    os.replace(PLAYER_INDEX_FILE + ".tmp", PLAYER_INDEX_FILE)
+
+# Refresh the canonical MFL names; players keep any aliases learned from other sites.
+# With `changed` (a set of MFL ids) only those players' names are replaced, and ids missing from `players` are
+# dropped; the full refresh still runs when the index has no MFL names yet.
+def update_mfl(players, nameCol='player', teamCol='team', changed=None):
+    index = load_index()
+    keep = index.source!='mfl'
+    if changed is not None and (index.source=='mfl').any():
+        changedPids = np.array([int(x) for x in changed], dtype='int32')
+        keep = keep | ~index.pid.isin(changedPids)
+        players = players.loc[players['id_mfl'].isin(changed)]
+    mfl = pd.DataFrame({
+        'pid': players['id_mfl'].astype('int32').values,
+        'source': 'mfl',
+        'key': name_key(players[nameCol]).values,
+        'team': players[teamCol].fillna('').astype(str).values,
+        'fuzzy': False
+    })
+    # New MFL names may be what a remembered miss was looking for, so let the fuzzy matcher try those again
+    if not set(mfl['key']) <= set(index.loc[index.source=='mfl', 'key']):
+        keep = keep & (index.pid != -1)
+    index = pd.concat([index.loc[keep], mfl], ignore_index=True)
+    save_index(index)
+    return index
+
+# Names to pids for the fuzzy matcher; a name several players share maps to -1 (ambiguous, left unresolved)
+def candidate_pool(names):
+    pairs = names.drop_duplicates(subset=['key', 'pid'])
+    pool = pairs.drop_duplicates('key').set_index('key')['pid']
+    pool[pairs.loc[pairs.key.duplicated(), 'key'].unique()] = -1
+    return pool
+
+# Look up the MFL id (as int32, -1 when unmatched) for every row of a frame from another site
+def resolve(df, source, nameCol='player', teamCol='team'):
+    index = load_index()
+    keys = name_key(df[nameCol]).values
+    teams = df[teamCol].fillna('').astype(str).values if teamCol else np.full(len(df), '')
+    lookup = index.loc[index.source.isin(['mfl', source]) & (index.pid != -1)]
+    pids = np.full(len(df), -1, dtype='int32')
+
+    # 1. Exact key and team
+    if teamCol:
+        byKeyTeam = lookup.drop_duplicates(subset=['key', 'team']).set_index(['key', 'team'])['pid']
+        found = byKeyTeam.reindex(pd.MultiIndex.from_arrays([keys, teams])).values
+        hit = ~pd.isna(found)
+        pids[hit] = found[hit]
+
+    # 2. Exact key alone, when only one player has that key
+    unmatched = pids == -1
+    uniqueKeys = lookup.drop_duplicates(subset=['key', 'pid'])
+    uniqueKeys = uniqueKeys.loc[~uniqueKeys.key.duplicated(keep=False)].set_index('key')['pid']
+    found = uniqueKeys.reindex(keys[unmatched]).values
+    hit = ~pd.isna(found)
+    pids[np.flatnonzero(unmatched)[hit]] = found[hit]
+
+    # 3. Fuzzy fallback, only for the rows still unmatched (and not already known to miss), only against the same
+    # team when we know it
+    misses = index.loc[(index.source==source) & (index.pid==-1)]
+    missed = pd.MultiIndex.from_arrays([keys, teams]).isin(pd.MultiIndex.from_arrays([misses.key, misses.team]))
+    unmatched = np.flatnonzero((pids == -1) & ~missed)
+    if len(unmatched) > 0:
+        mfl = lookup.loc[lookup.source=='mfl']
+        candidates = {team: candidate_pool(group) for team, group in mfl.groupby('team')}
+        candidates[''] = candidate_pool(mfl)
+        candidateKeys = {team: list(pool.index) for team, pool in candidates.items()}
+        aliases = []
+        for i in unmatched:
+            team = teams[i] if teams[i] in candidates else ''
+            match = difflib.get_close_matches(keys[i], candidateKeys[team], n=1, cutoff=FUZZY_CUTOFF)
+            pids[i] = candidates[team][match[0]] if match else -1
+            aliases.append({'pid': pids[i], 'source': source, 'key': keys[i], 'team': teams[i], 'fuzzy': True})
+        # Remember fuzzy matches as aliases so the next run resolves them exactly, and misses (including names
+        # several players share) so the next run does not fuzz them again
+        index = pd.concat([index, pd.DataFrame(aliases, columns=indexColumns)], ignore_index=True)
+        index = index.drop_duplicates(subset=['pid', 'source', 'key', 'team'], ignore_index=True)
+        index['pid'] = index['pid'].astype('int32')
+        save_index(index)
+        print(f"{source}: {len(unmatched)} rows needed fuzzy matching, {int((pids[unmatched] != -1).sum())} matched")
+
+    return pd.Series(pids, index=df.index, name='pid')
@@ -0,0 +1,116 @@
+# Import dependencies
+# Standard python libraries
+import os
+import sqlite3
+import time
+# Third-party libraries
+import pandas as pd
+
+# Internal imports
+from archive import ARCHIVE_REPLAY
+from mfl import get_mfl_players, get_mfl_players_since
+
+# Local copy of MFL's player universe, raw and normalized, so the scheduler does not rebuild it from the full
+# players export every run. Each run asks MFL only for the players changed since the last sync (TYPE=players
+# with SINCE) and re-normalizes just those rows; a full export every PLAYER_RECONCILE_SECONDS (and on the first
+# run, or in archive replay) catches players MFL removed. sync() returns the universe and the ids that changed;
+# the caller calls finish_sync() once it has used them. A sync that was never finished (the run died) makes the
+# next one a full refresh, so no change is lost.
+
+# Find environment variables
+PLAYER_STORE_PATH = os.environ.get("PLAYER_STORE_PATH", os.path.join("data", "players.sqlite"))
+PLAYER_RECONCILE_SECONDS = float(os.environ.get("PLAYER_RECONCILE_SECONDS", str(7 * 86400)))
+# Ask for a little more than the time since the last sync, in case MFL's clock and ours disagree
+PLAYER_SINCE_OVERLAP_SECONDS = int(os.environ.get("PLAYER_SINCE_OVERLAP_SECONDS", "600"))
+
+schema = [
+    'CREATE TABLE IF NOT EXISTS players(PlayerID TEXT PRIMARY KEY, rawName TEXT, rawPosition TEXT, rawTeam TEXT, player TEXT, pos_mfl TEXT, team TEXT, keep INTEGER)',
+    'CREATE TABLE IF NOT EXISTS player_sync(id INTEGER PRIMARY KEY, lastSync INTEGER, lastReconcile REAL, pending INTEGER)',
+]
+rawCols = ['PlayerID', 'Name', 'Position', 'Team']
+cleanCols = ['player', 'pos_mfl', 'team', 'keep']
+# MFL positions the models use
+keepPositions = ['QB', 'WR', 'RB', 'TE', 'PK', 'Def']
+
+def connect():
+    directory = os.path.dirname(PLAYER_STORE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(PLAYER_STORE_PATH, timeout=30)
+    for statement in schema:
+        conn.execute(statement)
+    return conn
+
+# Clean names, positions and teams the way the scheduler always has, for just the given raw rows
+def normalize(raw):
+    df = raw[rawCols].copy()
+    ## Clean Name column
+    to_join = df['Name'].str.split(", ", n=1, expand=True).reindex(columns=[0, 1])
+    to_join.columns = ['lname', 'fname']
+    df['player'] = to_join['fname'] + " " + to_join['lname']
+    # Change name to Title Case
+    df['player'] = df['player'].str.upper()
+    # Drop name punctuation
+    for char in [".", ",", "'"]:
+        df['player'] = df['player'].str.replace(char, "", regex=False)
+    ## Clean position column
+    df['pos_mfl'] = df['Position'].replace('Def', 'DF')
+    # Clean Team column
+    df['team'] = df['Team'].replace('FA*', 'FA')
+    df['keep'] = df['Position'].isin(keepPositions).astype('int64')
+    return df
+
+# Column names are case-insensitive in SQLite, so the raw columns are stored with a prefix
+def read_players(conn):
+    return pd.read_sql('SELECT PlayerID, rawName AS Name, rawPosition AS Position, rawTeam AS Team, player, pos_mfl, team, keep FROM players', conn)
+
+# Store the raw rows that differ from the stored ones, normalizing only those; with full=True players missing
+# from `raw` are removed. Returns the ids whose row was added, changed or removed.
+def apply_players(conn, raw, full):
+    stored = read_players(conn).set_index('PlayerID')
+    raw = raw[rawCols].drop_duplicates(subset=['PlayerID'], keep='last').set_index('PlayerID')
+    previous = stored.reindex(raw.index)[rawCols[1:]]
+    same = (previous.fillna("\0") == raw[rawCols[1:]].fillna("\0")).all(axis=1).to_numpy()
+    changed = normalize(raw.loc[~same].reset_index()) if not same.all() else pd.DataFrame(columns=rawCols + cleanCols)
+    removed = stored.index.difference(raw.index) if full else pd.Index([])
+    with conn:
+        conn.executemany('INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [tuple(None if pd.isna(value) else value for value in row) for row in changed[rawCols + cleanCols].itertuples(index=False)])
+        conn.executemany('DELETE FROM players WHERE PlayerID = ?', [(x,) for x in removed])
+    return set(changed['PlayerID']) | set(removed)
+
+# Bring the store up to date with MFL; returns (players, changedIds).
+# players has the raw columns plus the normalized player, pos_mfl, team and keep (1 for model positions).
+# changedIds is None after a full export, so callers refresh everything derived from the universe then.
+def sync():
+    conn = connect()
+    try:
+        state = conn.execute('SELECT lastSync, lastReconcile, pending FROM player_sync WHERE id = 0').fetchone()
+        started = int(time.time())
+        full = ARCHIVE_REPLAY or state is None or state[2] == 1 or started - state[1] > PLAYER_RECONCILE_SECONDS
+        try:
+            raw = get_mfl_players() if full else get_mfl_players_since(state[0] - PLAYER_SINCE_OVERLAP_SECONDS)
+        except Exception as error:
+            if state is None:
+                raise
+            # Keep using the stored universe; the next run asks for everything since the last good sync
+            print(f"Player sync failed, using the stored players: {error}")
+            return read_players(conn), set()
+        changedIds = apply_players(conn, raw, full)
+        with conn:
+            lastReconcile = started if full else state[1]
+            conn.execute('INSERT OR REPLACE INTO player_sync VALUES (0, ?, ?, 1)', (started, lastReconcile))
+        players = read_players(conn)
+        print(f"Players: {'full export' if full else 'changes since last sync'}, {len(raw)} rows received, {len(changedIds)} changed")
+        return players, None if full else changedIds
+    finally:
+        conn.close()
+
+# Mark the last sync's change set as used
+def finish_sync():
+    conn = connect()
+    try:
+        with conn:
+            conn.execute('UPDATE player_sync SET pending = 0 WHERE id = 0')
+    finally:
+        conn.close()
@@ -0,0 +1,207 @@
+# Import dependencies
+# Standard python libraries
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+# Third-party libraries
+import numpy as np
+import pandas as pd
+from joblib import load
+
+# Internal imports
+import feature_store
+from features import features, posRanks, model_matrix, score_predictions
+from serving import async_mode, offload
+
+# What-if predictions without rerunning the scheduler. The position models stay loaded in the worker and are
+# reloaded when their files change (a retrain or an applied compact variant). A request is either raw feature
+# rows or player ids with overrides, e.g. {"players": [{"id": "13604", "posRank": "WR1"}]}; a player's rows are
+# read from the scheduler's feature slice for that position, overridden, predicted and summed over the season.
+# Rows from concurrent requests for the same position are queued and sent to regressor.predict together.
+
+# Find environment variables
+MODELS_DIR = os.environ.get("MODELS_DIR", "models")
+# How long a batch waits for more requests after its first one, and the most rows it takes
+PREDICT_BATCH_WAIT_MS = float(os.environ.get("PREDICT_BATCH_WAIT_MS", "5"))
+PREDICT_BATCH_ROWS = int(os.environ.get("PREDICT_BATCH_ROWS", "8192"))
+# Most players or feature rows one request may ask for
+PREDICT_MAX_ITEMS = int(os.environ.get("PREDICT_MAX_ITEMS", "200"))
+
+# Position -> (model signature, regressor)
+models = {}
+# Position -> (columns.json build time, slice dict) for the player-id path
+slices = {}
+# Position -> request queue, and the lock guarding all three caches
+batchQueues = {}
+serviceLock = threading.Lock()
+
+# Raised for requests that cannot be answered; the route returns its message with a 400
+class PredictError(Exception):
+    pass
+
+def model_path(pos):
+    return os.path.join(MODELS_DIR, f"rfmodel_{pos}1.joblib")
+
+# The resident model for a position, reloaded if the file on disk changed
+def get_model(pos):
+    if not os.path.exists(model_path(pos)):
+        raise PredictError(f"No {pos} model; run train.py first")
+    signature = feature_store.model_signature(model_path(pos))
+    cached = models.get(pos)
+    if cached is None or cached[0] != signature:
+        with serviceLock:
+            cached = models.get(pos)
+            if cached is None or cached[0] != signature:
+                cached = models[pos] = (signature, load(model_path(pos)))
+    return cached[1]
+
+# The memory-mapped feature slice for a position with its rows grouped by player id
+def get_slice(pos):
+    entry = feature_store.read_columns().get(pos)
+    if entry is None:
+        raise PredictError(f"No {pos} features; run the scheduler first")
+    cached = slices.get(pos)
+    if cached is None or cached[0] != entry["built"]:
+        with serviceLock:
+            cached = slices.get(pos)
+            if cached is None or cached[0] != entry["built"]:
+                X, header, columns = feature_store.read_slice(pos)
+                if 'id_mfl' not in header.columns:
+                    raise PredictError(f"The {pos} features predate player lookups; run the scheduler again")
+                cached = slices[pos] = (entry["built"], {
+                    'X': X,
+                    'header': header,
+                    'columns': columns,
+                    'rows': header.groupby(header['id_mfl'].astype(str)).indices,
+                })
+    return cached[1]
+
+# Collect queued requests, predict them in one call and hand each its points. Only the gevent worker serves
+# concurrent requests, so only there does a batch wait up to PREDICT_BATCH_WAIT_MS for more; otherwise it takes
+# what is already queued (e.g. the rest of one request's players) and goes.
+def batch_worker(pos, requests):
+    while True:
+        batch = [requests.get()]
+        nRows = len(batch[0][0])
+        deadline = time.monotonic() + (PREDICT_BATCH_WAIT_MS / 1000 if async_mode() else 0)
+        while nRows < PREDICT_BATCH_ROWS:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(requests.get(timeout=remaining) if remaining > 0 else requests.get_nowait())
+            except queue.Empty:
+                break
+            nRows += len(batch[-1][0])
+        try:
+            X = np.concatenate([X for X, future in batch])
+            regressor = get_model(pos)
+            # CPU-bound, so it runs on the thread pool under the gevent worker
+            points = score_predictions(offload(regressor.predict, X), np.full(len(X), pos))
+            start = 0
+            for X, future in batch:
+                future.set_result(points[start:start + len(X)])
+                start += len(X)
+        except Exception as error:
+            for X, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+
+# Queue model rows for a position; the future resolves to their fantasy points
+def submit_rows(pos, X):
+    requests = batchQueues.get(pos)
+    if requests is None:
+        with serviceLock:
+            requests = batchQueues.get(pos)
+            if requests is None:
+                requests = batchQueues[pos] = queue.Queue()
+                threading.Thread(target=batch_worker, args=(pos, requests), name=f"predict_{pos}", daemon=True).start()
+    future = Future()
+    requests.put((X, future))
+    return future
+
+def check_pos(pos):
+    if pos not in posRanks:
+        raise PredictError(f"pos must be one of {', '.join(posRanks)}")
+
+def check_rank(pos, rank):
+    if rank not in posRanks.get(pos):
+        raise PredictError(f"{pos} posRank must be one of {', '.join(posRanks.get(pos))}")
+
+# Raw feature rows: every model feature plus posRank, all for one position
+def predict_features(pos, rows):
+    check_pos(pos)
+    if not all(isinstance(row, dict) for row in rows):
+        raise PredictError("Each feature row must be an object")
+    missing = sorted({f for row in rows for f in features if f not in row})
+    if missing:
+        raise PredictError(f"Feature rows are missing {', '.join(missing[:10])}")
+    for row in rows:
+        check_rank(pos, row.get('posRank'))
+    try:
+        X = model_matrix(pd.DataFrame(rows), pos)
+    except (TypeError, ValueError) as error:
+        raise PredictError(f"Feature rows must be numeric: {error}")
+    return [{'pos': pos, 'points': round(float(points), 2)} for points in submit_rows(pos, X).result()]
+
+# Overwrite feature columns (or the posRank one-hot) in a copy of a player's rows
+def apply_overrides(X, columns, pos, overrides):
+    for name, value in overrides.items():
+        if name == 'posRank':
+            check_rank(pos, value)
+            for rank in posRanks.get(pos):
+                X[:, columns.index(f'posRank_{rank}')] = rank == value
+        elif name in features and name != 'week':
+            try:
+                X[:, columns.index(name)] = float(value)
+            except (TypeError, ValueError):
+                raise PredictError(f"{name} must be a number")
+        else:
+            raise PredictError(f"Cannot override {name}")
+    return X
+
+# Player ids with optional overrides; returns each player's season points and weekly points.
+# All of a request's players are queued before waiting, so they share batches.
+def predict_players(players):
+    pending = []
+    for player in players:
+        if not isinstance(player, dict):
+            raise PredictError("Each player must be an object with an id")
+        id_mfl = str(player.get('id', ''))
+        overrides = {name: value for name, value in player.items() if name not in ('id', 'pos')}
+        positions = [player['pos']] if player.get('pos') else [pos for pos in posRanks if pos in feature_store.read_columns()]
+        for pos in positions:
+            check_pos(pos)
+            store = get_slice(pos)
+            rows = store['rows'].get(id_mfl)
+            if rows is not None:
+                break
+        else:
+            raise PredictError(f"No features for player {id_mfl}")
+        X = apply_overrides(np.array(store['X'][rows]), store['columns'], pos, overrides)
+        pending.append((id_mfl, pos, overrides, store['header'].iloc[rows], submit_rows(pos, X)))
+    results = []
+    for id_mfl, pos, overrides, header, future in pending:
+        points = future.result()
+        results.append({
+            'id': id_mfl,
+            'pos': pos,
+            'overrides': overrides,
+            'points': round(float(points.sum()), 2),
+            'weeks': [{'week': int(week), 'opponent': str(opponent), 'points': round(float(p), 2)}
+                for week, opponent, p in zip(header['week'], header['opponent'], points)],
+        })
+    return results
+
+# Answer one /api/predict body: {"players": [...]} or {"pos": "WR", "rows": [...]}
+def predict(body):
+    if not isinstance(body, dict):
+        raise PredictError("Expected a JSON object")
+    items = body.get('players') or body.get('rows') or []
+    if not isinstance(items, list) or not items:
+        raise PredictError("Send players (ids with overrides) or pos and rows (feature rows)")
+    if len(items) > PREDICT_MAX_ITEMS:
+        raise PredictError(f"At most {PREDICT_MAX_ITEMS} players or rows per request")
+    if 'players' in body:
+        return {'players': predict_players(items)}
+    return {'rows': predict_features(body.get('pos'), items)}
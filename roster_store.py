@@ -0,0 +1,180 @@
+# Import dependencies
+# Standard python libraries
+import os
+import sqlite3
+import threading
+import time
+# Third-party libraries
+import pandas as pd
+
+# Internal imports
+from mfl import get_mfl_rosters, get_mfl_freeAgents, get_mfl_transactions
+from serving import gather
+
+# Local copy of every league's rosters and free agents, so routes read roster state from disk instead of
+# downloading the full rosters and freeAgents exports on each view. A league is seeded from the full exports,
+# then kept current by applying transactions newer than the last one seen; a full reconcile every
+# ROSTER_RECONCILE_SECONDS (or on a transaction type it does not know how to apply) catches any drift.
+
+# Find environment variables
+# Set ROSTER_STORE=0 to read rosters straight from MFL
+ROSTER_STORE = os.environ.get("ROSTER_STORE", "1") == "1"
+ROSTER_STORE_PATH = os.environ.get("ROSTER_STORE_PATH", os.path.join("data", "rosters.sqlite"))
+# How often a league's transactions are polled
+ROSTER_SYNC_SECONDS = float(os.environ.get("ROSTER_SYNC_SECONDS", "60"))
+ROSTER_RECONCILE_SECONDS = float(os.environ.get("ROSTER_RECONCILE_SECONDS", "21600"))
+
+schema = [
+    'CREATE TABLE IF NOT EXISTS rosters(league TEXT, franchiseID TEXT, week TEXT, id_mfl TEXT, status TEXT)',
+    'CREATE INDEX IF NOT EXISTS rosters_league ON rosters(league, franchiseID)',
+    'CREATE TABLE IF NOT EXISTS free_agents(league TEXT, id_mfl TEXT, PRIMARY KEY(league, id_mfl))',
+    'CREATE TABLE IF NOT EXISTS roster_sync(league TEXT PRIMARY KEY, lastTransaction INTEGER, lastReconcile REAL, lastPoll REAL)',
+]
+# Transactions that add players (first part of "added,|dropped,"); the bid types put the bid between the two
+# ("added,|bid|dropped,")
+addTypes = {"FREE_AGENT", "WAIVER", "BBID_WAIVER", "AUCTION_WON"}
+bidTypes = {"BBID_WAIVER", "AUCTION_WON"}
+# Status moves: first part goes to the first status, second part to the second
+statusTypes = {"IR": ("ROSTER", "INJURED_RESERVE"), "TAXI": ("ROSTER", "TAXI_SQUAD")}
+# Transactions that do not change rosters
+ignoredTypes = {"LOCK_ALL_PLAYERS", "UNLOCK_ALL_PLAYERS", "SURVIVOR_PICK", "POOL_PICK"}
+
+# One sync at a time per league in this process
+leagueLocks = {}
+locksLock = threading.Lock()
+
+def connect():
+    directory = os.path.dirname(ROSTER_STORE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(ROSTER_STORE_PATH, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    for statement in schema:
+        conn.execute(statement)
+    return conn
+
+def league_lock(league):
+    with locksLock:
+        return leagueLocks.setdefault(league, threading.Lock())
+
+def player_ids(field):
+    return [x for x in (field or "").split(",") if x]
+
+# The added and dropped parts of a transaction, skipping the bid field of the bid types
+def transaction_parts(transaction):
+    fields = (transaction.transaction or "").split("|")
+    dropped = fields[2:3] if transaction.type in bidTypes else fields[1:2]
+    return fields[0], dropped[0] if dropped else ""
+
+# Replace a league's rows with the full exports
+def reconcile(conn, league):
+    rosters, freeAgents, transactions = gather(
+        (get_mfl_rosters, league), (get_mfl_freeAgents, league), (get_mfl_transactions, league))
+    lastTransaction = int(transactions['timestamp'].max()) if len(transactions) else 0
+    with conn:
+        conn.execute('DELETE FROM rosters WHERE league = ?', (league,))
+        conn.execute('DELETE FROM free_agents WHERE league = ?', (league,))
+        conn.executemany('INSERT INTO rosters VALUES (?, ?, ?, ?, ?)',
+            [(league,) + tuple(row) for row in rosters[["franchiseID", "week", "id_mfl", "status"]].itertuples(index=False)])
+        conn.executemany('INSERT OR IGNORE INTO free_agents VALUES (?, ?)', [(league, x) for x in freeAgents['id_mfl']])
+        now = time.time()
+        conn.execute('INSERT OR REPLACE INTO roster_sync VALUES (?, ?, ?, ?)', (league, lastTransaction, now, now))
+
+def add_player(conn, league, franchise, id_mfl):
+    week = conn.execute('SELECT MAX(week) FROM rosters WHERE league = ? AND franchiseID = ?', (league, franchise)).fetchone()[0]
+    conn.execute('DELETE FROM rosters WHERE league = ? AND id_mfl = ?', (league, id_mfl))
+    conn.execute('DELETE FROM free_agents WHERE league = ? AND id_mfl = ?', (league, id_mfl))
+    conn.execute('INSERT INTO rosters VALUES (?, ?, ?, ?, ?)', (league, franchise, week or "", id_mfl, "ROSTER"))
+
+def drop_player(conn, league, franchise, id_mfl):
+    conn.execute('DELETE FROM rosters WHERE league = ? AND franchiseID = ? AND id_mfl = ?', (league, franchise, id_mfl))
+    conn.execute('INSERT OR IGNORE INTO free_agents VALUES (?, ?)', (league, id_mfl))
+
+def move_player(conn, league, franchise, id_mfl):
+    conn.execute('UPDATE rosters SET franchiseID = ? WHERE league = ? AND id_mfl = ?', (franchise, league, id_mfl))
+
+def set_status(conn, league, franchise, id_mfl, status):
+    conn.execute('UPDATE rosters SET status = ? WHERE league = ? AND franchiseID = ? AND id_mfl = ?', (status, league, franchise, id_mfl))
+
+# Apply one transaction; returns False if its type is unknown and the league needs a full reconcile
+def apply_transaction(conn, league, transaction):
+    kind = transaction.type
+    added, dropped = transaction_parts(transaction)
+    if kind in addTypes:
+        for id_mfl in player_ids(added):
+            add_player(conn, league, transaction.franchise, id_mfl)
+        for id_mfl in player_ids(dropped):
+            drop_player(conn, league, transaction.franchise, id_mfl)
+    elif kind == "TRADE":
+        for id_mfl in player_ids(transaction.franchise1_gave_up):
+            move_player(conn, league, transaction.franchise2, id_mfl)
+        for id_mfl in player_ids(transaction.franchise2_gave_up):
+            move_player(conn, league, transaction.franchise, id_mfl)
+    elif kind in statusTypes:
+        firstStatus, secondStatus = statusTypes[kind]
+        for id_mfl in player_ids(added):
+            set_status(conn, league, transaction.franchise, id_mfl, firstStatus)
+        for id_mfl in player_ids(dropped):
+            set_status(conn, league, transaction.franchise, id_mfl, secondStatus)
+    elif kind not in ignoredTypes:
+        return False
+    return True
+
+# Apply the transactions posted since the last sync; reconciles instead if one cannot be applied
+def apply_transactions(conn, league, lastTransaction):
+    transactions = get_mfl_transactions(league)
+    transactions = transactions.loc[transactions['timestamp'] > lastTransaction]
+    with conn:
+        for transaction in transactions.itertuples(index=False):
+            if not apply_transaction(conn, league, transaction):
+                conn.rollback()
+                print(f"Unknown {transaction.type} transaction in league {league}; reconciling")
+                reconcile(conn, league)
+                return
+        if len(transactions):
+            lastTransaction = int(transactions['timestamp'].max())
+        conn.execute('UPDATE roster_sync SET lastTransaction = ?, lastPoll = ? WHERE league = ?', (lastTransaction, time.time(), league))
+
+# Bring a league up to date: seed or reconcile when due, otherwise poll transactions when due
+def sync(league):
+    with league_lock(league):
+        conn = connect()
+        try:
+            state = conn.execute('SELECT lastTransaction, lastReconcile, lastPoll FROM roster_sync WHERE league = ?', (league,)).fetchone()
+            now = time.time()
+            if state is None or now - state[1] > ROSTER_RECONCILE_SECONDS:
+                reconcile(conn, league)
+            elif now - state[2] > ROSTER_SYNC_SECONDS:
+                try:
+                    apply_transactions(conn, league, state[0])
+                except Exception as error:
+                    # Keep serving the stored rosters; the next poll tries again
+                    print(f"Transaction sync for league {league} failed: {error}")
+        finally:
+            conn.close()
+
+# Drop-in replacements for get_mfl_rosters and get_mfl_freeAgents that read the local store
+def get_rosters(league, franchise=None):
+    if not ROSTER_STORE:
+        return get_mfl_rosters(league, franchise)
+    sync(league)
+    conn = connect()
+    try:
+        query = 'SELECT franchiseID, week, id_mfl, status FROM rosters WHERE league = ?'
+        params = [league]
+        if franchise:
+            query += ' AND franchiseID = ?'
+            params.append(franchise)
+        return pd.read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+
+def get_free_agents(league):
+    if not ROSTER_STORE:
+        return get_mfl_freeAgents(league)
+    sync(league)
+    conn = connect()
+    try:
+        return pd.read_sql('SELECT id_mfl FROM free_agents WHERE league = ?', conn, params=[league])
+    finally:
+        conn.close()
@@ -0,0 +1,131 @@
+# Import dependencies
+# Standard python libraries
+import os
+import threading
+import time
+# Third-party libraries
+import numpy as np
+
+# Internal imports
+import db
+from player_index import name_key, name_key_one
+
+# In-memory player search for autocomplete. Players are numbered by descending pred, so every posting list
+# below is already in result order. A prefix trie over each name word (and the whole name) answers ordinary
+# typing; when it finds too few players, names sharing enough trigrams with the query are added, which
+# tolerates typos. The index is rebuilt once per predictions version the scheduler publishes.
+
+# Find environment variables
+SEARCH_LIMIT = int(os.environ.get("SEARCH_LIMIT", "10"))
+# Share of the query's trigrams a name must contain to count as a typo match
+TRIGRAM_MATCH = float(os.environ.get("SEARCH_TRIGRAM_MATCH", "0.5"))
+# Seconds between checks for newly published predictions
+SEARCH_VERSION_POLL_SECONDS = float(os.environ.get("SEARCH_VERSION_POLL_SECONDS", "30"))
+
+# The current index, the predictions version it was built from and when that version was last checked
+searchIndex = None
+indexVersion = None
+versionChecked = 0
+indexLock = threading.Lock()
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_index(predictions):
+    players = predictions.sort_values(by='pred', ascending=False, ignore_index=True)
+    keys = name_key(players['player']).tolist()
+    # Trie nodes are dicts of child characters; the "" entry holds the players under that prefix, best first
+    trie = {"": []}
+    gramPostings = {}
+    for row, key in enumerate(keys):
+        words = set(key.split(" ")) | {key}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {"": []})
+                if not node[""] or node[""][-1] != row:
+                    node[""].append(row)
+        for gram in trigrams(key):
+            gramPostings.setdefault(gram, []).append(row)
+    return {
+        'trie': trie,
+        'grams': {gram: np.array(rows, dtype=np.int32) for gram, rows in gramPostings.items()},
+        'ids': players['id_mfl'].astype(str).to_numpy(),
+        'names': players['player'].to_numpy(),
+        'pos': players['pos'].to_numpy(),
+        'team': players['team'].to_numpy(),
+        'pred': players['pred'].round(1).to_numpy(),
+        'size': len(players),
+    }
+
+def get_index():
+    global searchIndex, indexVersion, versionChecked
+    if searchIndex is not None and time.monotonic() - versionChecked < SEARCH_VERSION_POLL_SECONDS:
+        return searchIndex
+    with indexLock:
+        if searchIndex is None or time.monotonic() - versionChecked >= SEARCH_VERSION_POLL_SECONDS:
+            version = db.get_predictions_version()
+            versionChecked = time.monotonic()
+            if searchIndex is None or version != indexVersion:
+                if searchIndex is not None:
+                    # Read the newly published predictions, not the table cache's older copy
+                    db.tableCache.pop("predictions", None)
+                searchIndex = build_index(db.get_cached_df("predictions"))
+                indexVersion = version
+    return searchIndex
+
+def prefix_rows(index, word):
+    node = index['trie']
+    for char in word:
+        node = node.get(char)
+        if node is None:
+            return []
+    return node[""]
+
+# Rows whose names share at least TRIGRAM_MATCH of the query's trigrams, most shared first, then by pred
+def trigram_rows(index, key):
+    postings = [index['grams'][gram] for gram in trigrams(key) if gram in index['grams']]
+    if not postings:
+        return []
+    counts = np.bincount(np.concatenate(postings), minlength=index['size'])
+    needed = max(2, int(np.ceil(TRIGRAM_MATCH * len(trigrams(key)))))
+    rows = np.flatnonzero(counts >= needed)
+    # Ties keep pred order because rows are numbered by pred
+    return rows[np.argsort(-counts[rows], kind='stable')].tolist()
+
+# Up to `limit` players matching the query, best pred first; `positions` and `allowed` (a set of ids) filter
+def search(query, positions=None, allowed=None, limit=SEARCH_LIMIT, index=None):
+    index = index or get_index()
+    key = name_key_one(query)
+    if not key or limit < 1:
+        return []
+    ids, pos = index['ids'], index['pos']
+
+    def accept(row):
+        return (positions is None or pos[row] in positions) and (allowed is None or ids[row] in allowed)
+
+    words = key.split(" ")
+    # Every query word must prefix a word of the name (or the query prefixes the whole name)
+    first = prefix_rows(index, words[0])
+    others = [set(prefix_rows(index, word)) for word in words[1:]]
+    results = []
+    for row in first:
+        if all(row in rows for rows in others) and accept(row):
+            results.append(row)
+            if len(results) == limit:
+                break
+    if len(words) > 1:
+        for row in prefix_rows(index, key):
+            if len(results) == limit:
+                break
+            if row not in results and accept(row):
+                results.append(row)
+    if len(results) < limit:
+        for row in trigram_rows(index, key):
+            if row not in results and accept(row):
+                results.append(row)
+                if len(results) == limit:
+                    break
+    return [{'id': ids[row], 'player': index['names'][row], 'pos': pos[row], 'team': index['team'][row], 'pred': float(index['pred'][row])}
+        for row in results]
@@ -0,0 +1,36 @@
+# Import dependencies
+# Standard python libraries
+import os
+# Third-party libraries
+try:
+    import gevent
+    from gevent import monkey
+except ImportError:
+    gevent = None
+
+# Find environment variables
+# OS threads for CPU-bound work when serving under gevent (WEB_ASYNC=1, see gunicorn.conf.py)
+WEB_CPU_THREADS = int(os.environ.get("WEB_CPU_THREADS", "4"))
+
+# Under the gevent worker the socket module is patched, so MFL requests yield to other clients while they wait.
+# CPU-bound pandas work would still stall every client on the worker, so it is handed to a thread pool.
+# Under the sync worker both helpers just call the function.
+def async_mode():
+    return gevent is not None and monkey.is_module_patched("socket")
+
+# Run a blocking or CPU-bound call on the gevent thread pool
+def offload(func, *args, **kwargs):
+    if not async_mode():
+        return func(*args, **kwargs)
+    threadpool = gevent.get_hub().threadpool
+    if threadpool.maxsize != WEB_CPU_THREADS:
+        threadpool.maxsize = WEB_CPU_THREADS
+    return threadpool.apply(func, args, kwargs)
+
+# Run several I/O calls, given as (func, arg, ...) tuples, concurrently; returns their results in order
+def gather(*calls):
+    if not async_mode():
+        return [call[0](*call[1:]) for call in calls]
+    jobs = [gevent.spawn(call[0], *call[1:]) for call in calls]
+    gevent.joinall(jobs, raise_error=True)
+    return [job.value for job in jobs]
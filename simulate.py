@@ -0,0 +1,122 @@
+# Import dependencies
+# Standard python libraries
+import os
+# Third-party libraries
+import numpy as np
+import pandas as pd
+
+# Internal imports
+from lineups import merge_rosters, build_lineups
+
+# Monte Carlo playoff and title odds. Every franchise's weekly score is drawn from its best lineup by
+# predictions.pred (the compareFranchises2 ChopBlock lineup), for all trials and weeks in one NumPy batch;
+# weeks already played keep their real scores. Standings rank by wins then points, and the top
+# PLAYOFF_TEAMS play a seeded single-elimination bracket (top seeds get byes when it is not a power of two).
+
+# Find environment variables
+SIM_TRIALS = int(os.environ.get("SIM_TRIALS", "10000"))
+PLAYOFF_TEAMS = int(os.environ.get("PLAYOFF_TEAMS", "6"))
+
+# pred is a season total; weekly projections use the same 17 games as live scoring
+seasonGames = 17
+# Spread of a player's weekly score relative to their weekly projection, by position
+posCV = {"QB": 0.45, "RB": 0.6, "WR": 0.65, "TE": 0.7, "PK": 0.5, "DF": 0.7}
+
+# Weekly mean and standard deviation of each franchise's starting lineup, ordered like `franchises`
+def franchise_strength(predictions, franchises, rosters, freeAgents):
+    complete = merge_rosters(predictions, franchises, rosters, freeAgents, keepUnrostered=False)
+    players_onthefield = build_lineups(complete, 'pred', 'pred')
+    weekly = players_onthefield['pred'] / seasonGames
+    # Players' weeks are treated as independent, so lineup variance is the sum of player variances
+    variance = (weekly * players_onthefield['pos'].map(posCV)) ** 2
+    byFranchise = pd.DataFrame({'FranchiseID': players_onthefield['FranchiseID'], 'mean': weekly, 'variance': variance}).groupby('FranchiseID').sum()
+    byFranchise = byFranchise.reindex(franchises['franchiseID']).fillna(0)
+    return byFranchise['mean'].to_numpy(), np.sqrt(byFranchise['variance'].to_numpy())
+
+# Seed order of a single-elimination bracket where adjacent slots meet: 4 -> [0, 3, 1, 2]
+def bracket_order(size):
+    order = [0]
+    while len(order) < size:
+        order = [x for seed in order for x in (seed, 2 * len(order) - 1 - seed)]
+    return np.array(order)
+
+# Simulate `trials` seasons; returns each franchise's mean wins, playoff odds and title odds.
+# Schedule arrays are per matchup: week index, home and away franchise index, and scores (NaN if unplayed).
+def simulate_season(means, sds, week, home, away, homeScore, awayScore, trials=SIM_TRIALS, playoffTeams=PLAYOFF_TEAMS, seed=None):
+    rng = np.random.default_rng(seed)
+    nFranchises = len(means)
+    nWeeks = int(week.max()) + 1
+    means = means.astype(np.float32)
+    sds = sds.astype(np.float32)
+
+    # Scores for every trial, week and franchise
+    scores = rng.standard_normal((trials, nWeeks, nFranchises), dtype=np.float32) * sds + means
+    homeScores = scores[:, week, home]
+    awayScores = scores[:, week, away]
+    played = ~np.isnan(homeScore) & ~np.isnan(awayScore)
+    homeScores[:, played] = homeScore[played]
+    awayScores[:, played] = awayScore[played]
+
+    # Wins and points per franchise, summed over matchups with one-hot matrices
+    homeOnehot = np.eye(nFranchises, dtype=np.float32)[home]
+    awayOnehot = np.eye(nFranchises, dtype=np.float32)[away]
+    homeWins = (homeScores > awayScores).astype(np.float32)
+    wins = homeWins @ homeOnehot + (1 - homeWins) @ awayOnehot
+    points = homeScores @ homeOnehot + awayScores @ awayOnehot
+
+    # Standings: wins, then points
+    standings = np.argsort(-(wins * 1e5 + points), axis=1)
+    playoffTeams = min(playoffTeams, nFranchises)
+    seeds = standings[:, :playoffTeams]
+    playoffs = np.zeros((trials, nFranchises), dtype=bool)
+    np.put_along_axis(playoffs, seeds, True, axis=1)
+
+    # Bracket: empty slots (-1) are byes
+    size = 1 << (playoffTeams - 1).bit_length()
+    slots = np.full((trials, size), -1)
+    slots[:, :playoffTeams] = seeds
+    slots = slots[:, bracket_order(size)]
+    while slots.shape[1] > 1:
+        a = slots[:, 0::2]
+        b = slots[:, 1::2]
+        scoreA = np.where(a >= 0, rng.standard_normal(a.shape, dtype=np.float32) * sds[a] + means[a], -np.inf)
+        scoreB = np.where(b >= 0, rng.standard_normal(b.shape, dtype=np.float32) * sds[b] + means[b], -np.inf)
+        slots = np.where(scoreA >= scoreB, a, b)
+    titles = np.bincount(slots[:, 0], minlength=nFranchises)
+
+    return wins.mean(axis=0), playoffs.mean(axis=0), titles / trials
+
+# Playoff and title odds table for a league
+def playoff_odds(predictions, franchises, rosters, freeAgents, schedule, trials=SIM_TRIALS, playoffTeams=PLAYOFF_TEAMS, seed=None):
+    means, sds = franchise_strength(predictions, franchises, rosters, freeAgents)
+    franchiseIndex = pd.Index(franchises['franchiseID'])
+    # Games against a franchise the league export does not list cannot be credited to anyone
+    known = schedule['homeID'].isin(franchiseIndex) & schedule['awayID'].isin(franchiseIndex)
+    if not known.all():
+        print(f"Skipping {int((~known).sum())} scheduled games with unknown franchises")
+        schedule = schedule.loc[known]
+    # Nothing to simulate until the league has a head-to-head schedule; show the projections alone
+    if len(schedule) == 0:
+        odds = pd.DataFrame({
+            'Franchise': franchises['franchiseName'],
+            'Weekly Projection': means.round(1),
+            'Playoff Odds': "No schedule yet",
+        })
+        odds = odds.sort_values(by='Weekly Projection', ascending=False)
+        odds.set_index('Franchise', drop=True, inplace=True)
+        return odds
+    week = (schedule['week'] - schedule['week'].min()).to_numpy()
+    home = franchiseIndex.get_indexer(schedule['homeID'])
+    away = franchiseIndex.get_indexer(schedule['awayID'])
+    meanWins, playoffs, titles = simulate_season(means, sds, week, home, away,
+        schedule['homeScore'].to_numpy(np.float32), schedule['awayScore'].to_numpy(np.float32), trials, playoffTeams, seed)
+    odds = pd.DataFrame({
+        'Franchise': franchises['franchiseName'],
+        'Weekly Projection': means.round(1),
+        'Projected Wins': meanWins.round(1),
+        'Playoff Odds': (playoffs * 100).round(1),
+        'Title Odds': (titles * 100).round(1)
+    })
+    odds = odds.sort_values(by=['Title Odds', 'Playoff Odds'], ascending=False)
+    odds.set_index('Franchise', drop=True, inplace=True)
+    return odds
@@ -0,0 +1,112 @@
+# Import dependencies
+# Standard python libraries
+import cProfile
+import io
+import os
+import pstats
+import resource
+import time
+import tracemalloc
+# Third-party libraries
+import psutil
+
+# Find environment variables
+# Set SCHEDULER_MEMORY=1 to also trace python allocations per stage with tracemalloc (slows the run down)
+TRACE_MEMORY = os.environ.get("SCHEDULER_MEMORY", "0") == "1"
+# Set SCHEDULER_PROFILE=1 (or run scheduler.py --profile) to run cProfile and tracemalloc snapshots in every stage
+PROFILE = os.environ.get("SCHEDULER_PROFILE", "0") == "1"
+PROFILE_FILE = os.environ.get("SCHEDULER_PROFILE_FILE", os.path.join("data", "scheduler_profile.txt"))
+# Functions and allocation sites listed per stage
+PROFILE_TOP = int(os.environ.get("SCHEDULER_PROFILE_TOP", "15"))
+
+# Timing and memory for each finished stage, in run order
+stageStats = []
+currentStage = None
+
+def enable_profiling():
+    global PROFILE
+    PROFILE = True
+
+def _tracing():
+    return TRACE_MEMORY or PROFILE
+
+# Allocations still held at the end of the stage that were made during it, largest first
+def _allocation_sites(startSnapshot):
+    # Leave out the profiler's own bookkeeping
+    ignore = [tracemalloc.Filter(False, path) for path in [__file__, tracemalloc.__file__, cProfile.__file__, pstats.__file__]]
+    snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+    diff = snapshot.compare_to(startSnapshot.filter_traces(ignore), 'lineno')
+    return [str(entry) for entry in diff[:PROFILE_TOP] if entry.size_diff > 0]
+
+def _rss_mb():
+    return psutil.Process().memory_info().rss / 2**20
+
+# The process's RSS high-water mark since it started (not per stage; see peakRise in end())
+def _max_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+# Close the running stage (if any) and start measuring a new one
+def start(name):
+    global currentStage
+    end()
+    if _tracing():
+        # Restart tracing so the traced peak only covers this stage
+        tracemalloc.stop()
+        tracemalloc.start()
+    currentStage = {"stage": name, "start": time.perf_counter(), "rssStart": _rss_mb(), "maxRssStart": _max_rss_mb()}
+    if PROFILE:
+        currentStage["snapshot"] = tracemalloc.take_snapshot()
+        currentStage["profiler"] = cProfile.Profile()
+        currentStage["profiler"].enable()
+
+# Close the running stage and record its stats
+def end():
+    global currentStage
+    if currentStage is None:
+        return
+    if "profiler" in currentStage:
+        currentStage["profiler"].disable()
+    stats = {
+        "stage": currentStage["stage"],
+        "seconds": time.perf_counter() - currentStage["start"],
+        "rssStart": currentStage["rssStart"],
+        "rssEnd": _rss_mb(),
+        # Cumulative high-water mark, and how far this stage raised it (0 when an earlier stage peaked higher)
+        "maxRss": _max_rss_mb(),
+        "tracedPeak": None
+    }
+    stats["peakRise"] = stats["maxRss"] - currentStage["maxRssStart"]
+    if "profiler" in currentStage:
+        stats["allocations"] = _allocation_sites(currentStage["snapshot"])
+        stream = io.StringIO()
+        pstats.Stats(currentStage["profiler"], stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        stats["profile"] = stream.getvalue()
+    if _tracing():
+        stats["tracedPeak"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    stageStats.append(stats)
+    currentStage = None
+
+# Print one line per stage: time, RSS at the end of the stage, the process's peak RSS so far (cumulative), how
+# much the stage raised that peak, and the stage's own traced python peak
+def report():
+    end()
+    print(f"{'stage':<24}{'seconds':>10}{'rss MB':>10}{'peak so far MB':>16}{'peak rise MB':>14}{'traced peak MB':>16}")
+    for stats in stageStats:
+        tracedPeak = "-" if stats["tracedPeak"] is None else f"{stats['tracedPeak']:.1f}"
+        print(f"{stats['stage']:<24}{stats['seconds']:>10.2f}{stats['rssEnd']:>10.1f}{stats['maxRss']:>16.1f}{stats['peakRise']:>14.1f}{tracedPeak:>16}")
+    if PROFILE:
+        write_profile()
+
+# Write every stage's top functions by cumulative time and top allocation sites to one report
+def write_profile():
+    os.makedirs(os.path.dirname(PROFILE_FILE) or ".", exist_ok=True)
+    with open(PROFILE_FILE, "w") as f:
+        for stats in [stats for stats in stageStats if "profile" in stats]:
+            f.write(f"{'=' * 100}\n{stats['stage']}: {stats['seconds']:.2f}s, traced peak {stats['tracedPeak']:.1f} MB, rss {stats['rssEnd']:.1f} MB\n{'=' * 100}\n")
+            f.write(f"Top {PROFILE_TOP} functions by cumulative time\n")
+            f.write(stats["profile"].strip() + "\n\n")
+            f.write(f"Top {PROFILE_TOP} allocation sites still held at the end of the stage\n")
+            f.write("\n".join(stats["allocations"]) + "\n\n")
+    print(f"Profile written to {PROFILE_FILE}")
@@ -0,0 +1,179 @@
+# Import dependencies
+# Standard python libraries
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+# Third-party libraries
+import requests
+
+# Internal imports
+import metrics
+
+# Politeness and fault handling for every outgoing fetch (archive.get_content calls fetch below).
+# Each host gets a token bucket: FETCH_RATE requests a second on average with bursts of up to FETCH_BURST, and
+# callers wait their turn instead of hammering the server. Connection errors, timeouts, 429s and 5xx answers are
+# retried with jittered exponential backoff (or the server's Retry-After). After BREAKER_FAILURES fetches in a
+# row fail, the host's circuit opens and fetches fail at once for BREAKER_RESET_SECONDS, so callers can fall
+# back to archived data; then one trial fetch decides whether it closes again.
+# Raise FETCH_RATE until MFL starts answering 429s to find the highest rate it tolerates.
+
+# Find environment variables
+# Requests per second per host; 0 turns the limiter off (e.g. against bench/mock_mfl.py)
+FETCH_RATE = float(os.environ.get("FETCH_RATE", "8"))
+FETCH_BURST = float(os.environ.get("FETCH_BURST", "16"))
+FETCH_RETRIES = int(os.environ.get("FETCH_RETRIES", "4"))
+FETCH_BACKOFF_SECONDS = float(os.environ.get("FETCH_BACKOFF_SECONDS", "0.5"))
+FETCH_BACKOFF_MAX_SECONDS = float(os.environ.get("FETCH_BACKOFF_MAX_SECONDS", "30"))
+FETCH_TIMEOUT_SECONDS = float(os.environ.get("FETCH_TIMEOUT_SECONDS", "30"))
+# Requests the scheduler keeps in flight for chunked exports (the limiter still paces them)
+FETCH_THREADS = int(os.environ.get("FETCH_THREADS", "4"))
+BREAKER_FAILURES = int(os.environ.get("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.environ.get("BREAKER_RESET_SECONDS", "60"))
+
+# Answers worth trying again
+retryStatuses = {429, 500, 502, 503, 504}
+# Errors worth trying again; any other requests error (a bad url, a redirect loop) fails at once
+retryErrors = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError)
+
+# Host -> TokenBucket / CircuitBreaker / counters for this process
+buckets = {}
+breakers = {}
+fetchStats = {}
+hostsLock = threading.Lock()
+# fetch runs on many threads at once (profile chunks, warm-up, live odds)
+statsLock = threading.Lock()
+
+# Raised when a url could not be fetched after every retry, or its host's circuit is open
+class FetchError(Exception):
+    pass
+
+class CircuitOpen(FetchError):
+    pass
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Take a token, sleeping until it is due; returns the seconds waited.
+    # Tokens may go negative: each caller reserves the next free slot, so waiters are served in order.
+    def acquire(self):
+        if self.rate <= 0:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class CircuitBreaker:
+    def __init__(self, failures, resetSeconds):
+        self.failures = failures
+        self.resetSeconds = resetSeconds
+        self.failed = 0
+        self.openedAt = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    # Closed: let everything through. Open: refuse until resetSeconds pass, then let one trial through.
+    def allow(self):
+        with self.lock:
+            if self.openedAt is None:
+                return True
+            if not self.trial and time.monotonic() - self.openedAt >= self.resetSeconds:
+                self.trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failed = 0
+            self.openedAt = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failed += 1
+            if self.trial or self.failed >= self.failures:
+                self.openedAt = time.monotonic()
+            self.trial = False
+
+def host_state(url):
+    host = urlparse(url).netloc
+    with hostsLock:
+        if host not in buckets:
+            buckets[host] = TokenBucket(FETCH_RATE, FETCH_BURST)
+            breakers[host] = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+            fetchStats[host] = {'requests': 0, 'retries': 0, 'failures': 0, 'refused': 0, 'waitSeconds': 0.0}
+        return host, buckets[host], breakers[host], fetchStats[host]
+
+# Seconds before retry `attempt` (0-based): the server's Retry-After if it sent one, else full-jitter backoff
+def backoff(attempt, response=None):
+    retryAfter = response.headers.get("Retry-After") if response is not None else None
+    if retryAfter and retryAfter.isdigit():
+        return min(float(retryAfter), FETCH_BACKOFF_MAX_SECONDS)
+    return random.uniform(0, min(FETCH_BACKOFF_MAX_SECONDS, FETCH_BACKOFF_SECONDS * 2 ** attempt))
+
+def count(stats, name, amount=1):
+    with statsLock:
+        stats[name] += amount
+
+# GET a url through its host's limiter, retries and circuit breaker; returns the response
+def fetch(url, **kwargs):
+    host, bucket, breaker, stats = host_state(url)
+    if not breaker.allow():
+        count(stats, 'refused')
+        metrics.fetch_result(host, "refused")
+        raise CircuitOpen(f"Circuit open for {host}")
+    kwargs.setdefault("timeout", FETCH_TIMEOUT_SECONDS)
+    succeeded = False
+    try:
+        for attempt in range(FETCH_RETRIES + 1):
+            waited = bucket.acquire()
+            count(stats, 'waitSeconds', waited)
+            metrics.fetch_wait(host, waited)
+            count(stats, 'requests')
+            response = None
+            try:
+                response = requests.get(url, **kwargs)
+                if response.status_code not in retryStatuses:
+                    succeeded = True
+                    breaker.record_success()
+                    metrics.fetch_result(host, "ok")
+                    return response
+                failure = f"HTTP {response.status_code}"
+            except retryErrors as error:
+                failure = str(error)
+            except requests.RequestException as error:
+                raise FetchError(f"{url} failed: {error}")
+            finally:
+                # A streamed response holds its pooled connection until closed
+                if response is not None and not succeeded:
+                    response.close()
+            if attempt < FETCH_RETRIES:
+                count(stats, 'retries')
+                metrics.fetch_result(host, "retry")
+                time.sleep(backoff(attempt, response))
+        raise FetchError(f"{url} failed after {FETCH_RETRIES + 1} attempts: {failure}")
+    finally:
+        # Any way out but a response counts against the host, so a failed half-open trial reopens the circuit
+        if not succeeded:
+            count(stats, 'failures')
+            breaker.record_failure()
+            metrics.fetch_result(host, "failed")
+
+# One line per host: requests, retries, failures and time spent waiting on the limiter
+def summary():
+    return "\n".join(f"{host}: {stats['requests']} requests, {stats['retries']} retries, {stats['failures']} failed, "
+        f"{stats['refused']} refused by the breaker, {stats['waitSeconds']:.1f}s waiting on the rate limit"
+        for host, stats in fetchStats.items())
@@ -0,0 +1,116 @@
+# Import dependencies
+# Standard python libraries
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+# Third-party libraries
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import dump
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
+
+# Internal imports
+from features import labels, posRanks, model_columns, model_matrix, score_predictions
+
+# Trains the six position models the scheduler loads (models/rfmodel_{pos}1.joblib) from historical feature
+# tables: one parquet file per position with the model features, posRank, season and the actual stat lines
+# (labels), built from the backfilled stats by `python backfill.py --training`. Positions train in parallel processes and each forest uses the cores left over; everything is
+# seeded, so the same tables give the same models. Each model gets a .json beside it with its training time,
+# size and validation error.
+# python train.py --positions WR RB --trees 200
+
+# Find environment variables
+TRAINING_DIR = os.environ.get("TRAINING_DIR", os.path.join("data", "training"))
+MODELS_DIR = os.environ.get("MODELS_DIR", "models")
+TRAIN_SEED = int(os.environ.get("TRAIN_SEED", "2022"))
+
+def training_path(pos):
+    return os.path.join(TRAINING_DIR, f"{pos}.parquet")
+
+def model_path(pos):
+    return os.path.join(MODELS_DIR, f"rfmodel_{pos}1.joblib")
+
+# Hold out the latest season when there are several, otherwise a seeded 20% of rows
+def split(df, seed):
+    seasons = sorted(df['season'].unique()) if 'season' in df.columns else []
+    if len(seasons) > 1:
+        validation = df['season'] == seasons[-1]
+        return df.loc[~validation], df.loc[validation]
+    return train_test_split(df, test_size=0.2, random_state=seed)
+
+def train_position(pos, params, nJobs, seed):
+    if not os.path.exists(training_path(pos)):
+        raise FileNotFoundError(f"No training table at {training_path(pos)}; build it with `python backfill.py --training SEASON ...`")
+    df = pd.read_parquet(training_path(pos))
+    df = df.loc[df['posRank'].isin(posRanks.get(pos))].reset_index(drop=True)
+    train, validation = split(df, seed)
+
+    regressor = RandomForestRegressor(random_state=seed, n_jobs=nJobs, **params)
+    start = time.perf_counter()
+    regressor.fit(model_matrix(train, pos), train[labels].to_numpy(dtype='float32'))
+    trainSeconds = time.perf_counter() - start
+
+    # Validation error on the stat lines and on the fantasy points the scheduler sums
+    y_pred = regressor.predict(model_matrix(validation, pos))
+    y_true = validation[labels].to_numpy(dtype='float64')
+    posArray = np.full(len(validation), pos)
+    pointsError = np.abs(score_predictions(y_pred, posArray) - score_predictions(y_true, posArray))
+
+    # Write beside the old model, then swap, so the scheduler never loads a half-written file
+    path = model_path(pos)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    dump(regressor, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+    report = {
+        'pos': pos,
+        'seed': seed,
+        'params': params,
+        'n_jobs': nJobs,
+        'sklearn': sklearn.__version__,
+        'columns': model_columns(pos),
+        'labels': labels,
+        'trainRows': len(train),
+        'validationRows': len(validation),
+        'trainSeconds': round(trainSeconds, 3),
+        'modelBytes': os.path.getsize(path),
+        'pointsMAE': float(pointsError.mean()),
+        'labelMAE': dict(zip(labels, np.abs(y_pred - y_true).mean(axis=0).round(4).tolist())),
+        'trainedAt': pd.Timestamp.now('UTC').isoformat(),
+    }
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump(report, f, indent=1)
+    return report
+
+# Train the positions across `workers` processes, splitting the cores between their forests
+def train_all(positions, params, workers, seed=TRAIN_SEED):
+    workers = max(1, min(workers, len(positions)))
+    nJobs = max(1, (os.cpu_count() or 1) // workers)
+    reports = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(train_position, pos, params, nJobs, seed): pos for pos in positions}
+        for future in as_completed(futures):
+            report = future.result()
+            print(f"{report['pos']}: {report['trainRows']} rows in {report['trainSeconds']:.1f}s, "
+                f"{report['modelBytes'] / 1e6:.1f} MB, validation points MAE {report['pointsMAE']:.2f}")
+            reports.append(report)
+    return reports
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the position models from the historical feature tables")
+    parser.add_argument("--positions", nargs="+", default=list(posRanks), choices=list(posRanks))
+    parser.add_argument("--workers", type=int, default=min(len(posRanks), os.cpu_count() or 1), help="positions trained at once")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--min-samples-leaf", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=TRAIN_SEED)
+    args = parser.parse_args()
+
+    params = {'n_estimators': args.trees, 'max_depth': args.max_depth, 'min_samples_leaf': args.min_samples_leaf}
+    start = time.perf_counter()
+    train_all(args.positions, params, args.workers, args.seed)
+    print(f"Trained {len(args.positions)} positions in {time.perf_counter() - start:.1f}s")
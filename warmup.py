@@ -0,0 +1,113 @@
+# Import dependencies
+# Standard python libraries
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+# Third-party libraries
+import pandas as pd
+from sqlalchemy import text
+
+# Internal imports
+import archive
+import charts
+import db
+
+# Warms each worker's page cache (see charts.py) for leagues that were used recently, so their first visitor
+# does not pay for the MFL fetches, lineup builds and figures. Warm-up runs when a worker starts and again
+# whenever the scheduler publishes new predictions.
+
+# Find environment variables
+WARMUP = os.environ.get("WARMUP", "1") == "1"
+# Leagues built at once; each build makes three MFL requests and uses a CPU thread
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", "4"))
+# How often a worker checks for newly published predictions
+WARMUP_POLL_SECONDS = float(os.environ.get("WARMUP_POLL_SECONDS", "60"))
+# Leagues not visited for this many days are no longer warmed
+ACTIVE_LEAGUE_DAYS = float(os.environ.get("ACTIVE_LEAGUE_DAYS", "7"))
+# Each process writes a given league and franchise's visit at most this often
+RECORD_EVERY_SECONDS = float(os.environ.get("RECORD_EVERY_SECONDS", "900"))
+
+# When this process last recorded each (league, franchise)
+recorded = {}
+
+def registry_enabled():
+    return db.DATABASE_URL is not None and not archive.ARCHIVE_REPLAY
+
+# Both the writer and the readers create the table, so polling before the first visit finds it empty
+def create_registry(conn):
+    conn.execute(text('CREATE TABLE IF NOT EXISTS active_leagues(league VARCHAR(32), franchise VARCHAR(32), last_seen TIMESTAMP)'))
+
+# Remember that a league (and franchise) was used, in the shared active_leagues table
+def record_activity(league, franchise=None):
+    if league is None or not registry_enabled():
+        return
+    key = (league, franchise or '')
+    now = time.time()
+    if now - recorded.get(key, 0) < RECORD_EVERY_SECONDS:
+        return
+    recorded[key] = now
+    try:
+        with db.get_engine().begin() as conn:
+            create_registry(conn)
+            conn.execute(text('DELETE FROM active_leagues WHERE league = :league AND franchise = :franchise'),
+                {"league": key[0], "franchise": key[1]})
+            conn.execute(text('INSERT INTO active_leagues(league, franchise, last_seen) VALUES (:league, :franchise, :last_seen)'),
+                {"league": key[0], "franchise": key[1], "last_seen": pd.Timestamp.utcnow().tz_localize(None).to_pydatetime()})
+    except Exception as error:
+        print(error)
+
+# (league, franchise) pairs used within ACTIVE_LEAGUE_DAYS; older rows are dropped
+def active_leagues():
+    if not registry_enabled():
+        return []
+    cutoff = (pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=ACTIVE_LEAGUE_DAYS)).to_pydatetime()
+    try:
+        with db.get_engine().begin() as conn:
+            create_registry(conn)
+            conn.execute(text('DELETE FROM active_leagues WHERE last_seen < :cutoff'), {"cutoff": cutoff})
+            return [tuple(row) for row in conn.execute(text('SELECT league, franchise FROM active_leagues'))]
+    except Exception as error:
+        print(error)
+        return []
+
+def warm_one(build, *args):
+    try:
+        build(*args, refresh=True)
+    except Exception as error:
+        print(f"Warm-up of {build.__name__}{args} failed: {error}")
+
+# Rebuild the comparison chart data of every active league and the waiver table of every active franchise
+def warm():
+    start = time.time()
+    pairs = active_leagues()
+    if not pairs:
+        return
+    # Load predictions once up front rather than once per build
+    db.get_cached_df("predictions")
+    leagues = sorted({league for league, franchise in pairs})
+    franchises = sorted({(league, franchise) for league, franchise in pairs if franchise})
+    with ThreadPoolExecutor(max_workers=WARMUP_CONCURRENCY) as executor:
+        for league in leagues:
+            executor.submit(warm_one, charts.lineup_chart_data, league)
+        for league, franchise in franchises:
+            executor.submit(warm_one, charts.waiver_page, league, franchise)
+    print(f"Warmed {len(leagues)} leagues and {len(franchises)} franchises in {time.time() - start:.1f}s")
+
+# Warm at start, then re-warm each time the scheduler publishes
+def run():
+    version = db.get_predictions_version()
+    warm()
+    while True:
+        time.sleep(WARMUP_POLL_SECONDS)
+        latest = db.get_predictions_version()
+        if latest is not None and latest != version:
+            version = latest
+            # Drop the old predictions so the rebuilt pages use the new ones; pages are replaced as they are rebuilt
+            db.tableCache.pop("predictions", None)
+            warm()
+
+# Called from gunicorn's post_worker_init hook, once per worker
+def start():
+    if WARMUP and registry_enabled():
+        threading.Thread(target=run, name="warmup", daemon=True).start()